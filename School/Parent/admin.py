@@ -1,16 +1,49 @@
 from django.contrib import admin
+from api.admin_utils import EstimatedCountPaginator
 from .models import Parent
 
 
 @admin.register(Parent)
 class ParentAdmin(admin.ModelAdmin):
-    list_display = ("full_name", "phone_number", "verified", "is_primary", "created_at")
+    list_display = ("full_name", "phone_number", "verified", "is_primary", "total_children", "created_at")
     list_filter = ("verified", "is_primary", "created_at")
     search_fields = ("user__first_name", "user__last_name", "phone_number", "user__email")
     ordering = ("user__first_name", "user__last_name")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ("Parent Profile", {
             "fields": ("user", "phone_number", "is_primary", "verified"),
         }),
     )
+
+    def get_queryset(self, request):
+        """
+        Load the user with the profile (``__str__``, full_name). The
+        changelist also shows total_children; the ParentInline autocomplete
+        only shows ``__str__``, so it skips the child count subquery.
+        """
+        queryset = super().get_queryset(request)
+        match = getattr(request, "resolver_match", None)
+        if match is not None and match.url_name == "autocomplete":
+            return queryset.select_related("user")
+        return queryset.with_stats()
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Phone numbers and emails (what the ParentInline autocomplete is
+        usually given) are matched on their own column instead of an OR of
+        substring matches across four columns: phones by anchored prefix,
+        emails by substring so "@gmail.com" still works (trigram-indexed
+        on PostgreSQL).
+        """
+        term = search_term.strip()
+        digits = "".join(filter(str.isdigit, term))
+        if term and digits and len(digits) == len(term.lstrip("+")):
+            if digits.startswith("0"):
+                digits = "233" + digits[1:]
+            return queryset.filter(phone_number__startswith=f"+{digits}"), False
+        if "@" in term and " " not in term:
+            return queryset.filter(user__email__icontains=term), False
+        return super().get_search_results(request, queryset, search_term)
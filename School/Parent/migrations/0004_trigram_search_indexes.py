@@ -0,0 +1,41 @@
+from django.db import migrations, transaction
+
+# GIN trigram indexes on UPPER(col), which is what icontains compiles to on
+# PostgreSQL. The SQL is spelled out here rather than generated so later
+# changes to the app code cannot alter this migration.
+INDEXES = {
+    'parent_parent_phone_number_trgm': 'UPPER("phone_number")',
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        return  # pg_trgm unavailable; searches fall back to a LIKE scan
+    for name, expression in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "Parent_parent" USING gin ({expression} gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    """Trigram indexes for the admin's icontains searches (PostgreSQL only)."""
+
+    dependencies = [
+        ('Parent', '0003_alter_parent_is_primary_alter_parent_phone_number_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Parent', '0004_trigram_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parent',
+            index=models.Index(fields=['updated_at'], name='Parent_pare_updated_3ec696_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Parent', '0005_parent_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='parent',
+            name='Parent_pare_phone_n_c51d14_idx',
+        ),
+    ]
@@ -1,7 +1,40 @@
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
-from django.conf import settings
 from Users.models import User
+from Users.phone import format_phone, normalize_phone, phone_lookup_value
+
+
+class ParentQuerySet(models.QuerySet):
+    def with_stats(self):
+        """
+        Join the user and annotate ``active_children_count``, so
+        ``full_name``, ``__str__`` and ``total_children`` need no queries.
+        The count is a correlated subquery on the link table, not a JOIN
+        and GROUP BY, so it stays right whatever else the queryset joins.
+        """
+        links = (
+            self.model.students.through.objects
+            .filter(parent_id=OuterRef('pk'), student__is_active=True)
+            .order_by()
+            .values('parent_id')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return self.select_related('user').annotate(
+            active_children_count=Coalesce(Subquery(links), 0)
+        )
+
+    def find_by_phone(self, phone):
+        """The parent with ``phone`` (any Ghana format), or None. One unique-index probe."""
+        phone = phone_lookup_value(phone)
+        if not phone:
+            return None
+        try:
+            return self.get(phone_number=phone)
+        except self.model.DoesNotExist:
+            return None
 
 
 class Parent(models.Model):
@@ -27,61 +60,91 @@ class Parent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="Profile creation timestamp.")
     updated_at = models.DateTimeField(auto_now=True, help_text="Last update timestamp.")
 
+    objects = ParentQuerySet.as_manager()
+
+    # Fields save() validates. Saves that write none of them (verify_phone,
+    # narrow update_fields) or leave them as loaded skip validation.
+    VALIDATED_FIELDS = ('user', 'phone_number')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._validated_state = instance.validated_state()
+        return instance
+
+    def validated_state(self):
+        """Current (user_id, phone_number) (deferred fields read as None)."""
+        return (self.__dict__.get('user_id'), self.__dict__.get('phone_number'))
+
     def clean(self):
         """Custom validation."""
         super().clean()
 
-        # Ensure linked user has parent role
-        if self.user_id and self.user.role != 'parent':
+        # Ensure linked user has parent role; a user loaded with the row
+        # was checked when it was linked
+        loaded_user_id = getattr(self, '_validated_state', (None, None))[0]
+        if self.user_id and self.user_id != loaded_user_id and self.user.role != 'parent':
             raise ValidationError({'user': 'Linked user must have role "parent".'})
 
         if self.phone_number:
-            phone = self._format_phone_number(self.phone_number)
-
-            # Validate Ghana mobile prefixes
-            valid_prefixes = getattr(
-                settings,
-                "GHANA_MOBILE_PREFIXES",
-                ['024', '054', '055', '059', '020', '050', '026', '056', '027', '057', '028', '058']
-            )
-            local_prefix = "0" + phone[4:6]  # e.g. +23324xxxxxxx → 024
-            if local_prefix not in valid_prefixes:
-                raise ValidationError({
-                    'phone_number': 'Phone number must start with a valid Ghana mobile prefix.'
-                })
+            self.normalize_phone_number(self.phone_number)
 
     def save(self, *args, **kwargs):
-        """Normalize before saving."""
-        if self.phone_number:
+        """
+        Normalize and validate the fields being written, then save.
+        Uniqueness and check constraints are left to the database, and
+        violations are raised as ValidationError like full_clean's.
+        """
+        update_fields = kwargs.get('update_fields')
+        written = set(self.VALIDATED_FIELDS)
+        if update_fields is not None:
+            written &= {field.removesuffix('_id') for field in update_fields}
+        if written and self.validated_state() == getattr(self, '_validated_state', None):
+            written = set()  # unchanged since loaded (and validated then)
+
+        if not written:
+            super().save(*args, **kwargs)
+            return
+
+        if 'phone_number' in written and self.phone_number:
             self.phone_number = self._format_phone_number(self.phone_number)
-
-        # Validate
-        self.full_clean()
-        super().save(*args, **kwargs)
-
-    def _format_phone_number(self, phone):
+        # The user's existence is checked by its foreign key, its role by clean()
+        exclude = [field.name for field in self._meta.fields if field.name not in written or field.name == 'user']
+        self.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+        try:
+            # A savepoint keeps the caller's transaction usable after a violation
+            with transaction.atomic(using=router.db_for_write(Parent, instance=self), savepoint=True):
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            error = self._constraint_error(e)
+            if error is None:
+                raise
+            raise error from e
+        self._validated_state = self.validated_state()
+
+    def _constraint_error(self, exc):
+        """Map a unique or check constraint violation to a ValidationError, or None."""
+        from api.utils import unique_violation_fields
+
+        columns = unique_violation_fields(exc, ['phone_number', 'user_id'])
+        if columns:
+            return ValidationError({
+                column.removesuffix('_id'): self.unique_error_message(Parent, [column.removesuffix('_id')])
+                for column in columns
+            })
+        if 'parent_phone_not_empty' in str(exc):
+            return ValidationError({'phone_number': 'Phone number is required.'})
+        return None
+
+    @staticmethod
+    def normalize_phone_number(phone):
+        """E.164 form of a Ghana mobile number, or ValidationError (see Users/phone.py)."""
+        return normalize_phone(phone)
+
+    @staticmethod
+    def _format_phone_number(phone):
         """Convert phone number to E.164 (+233xxxxxxxxx)."""
-        if not phone:
-            return phone
-
-        phone = ''.join(filter(str.isdigit, phone))
-
-        # Local format: 0xxxxxxxxx → +233xxxxxxxxx
-        if phone.startswith('0') and len(phone) == 10:
-            return f"+233{phone[1:]}"
-
-        # Ghana format without plus: 233xxxxxxxxx → +233xxxxxxxxx
-        if phone.startswith('233') and len(phone) == 12:
-            return f"+{phone}"
-
-        # Already correct E.164 format
-        if phone.startswith('233') and len(phone) == 12:
-            return f"+{phone}"
-
-        if phone.startswith('+233') and len(phone) == 13:
-            return phone
-
-        raise ValidationError({'phone_number': 'Invalid Ghana phone number format.'})
+        return format_phone(phone)
 
     @property
     def full_name(self):
@@ -96,6 +159,12 @@ class Parent(models.Model):
 
     @property
     def total_children(self):
+        # Annotated by ParentQuerySet.with_stats(), or counted from prefetched students
+        if hasattr(self, 'active_children_count'):
+            return self.active_children_count
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('students')
+        if prefetched is not None:
+            return sum(1 for student in prefetched if student.is_active)
         return self.students.filter(is_active=True).count()
 
     @property
@@ -123,10 +192,11 @@ class Parent(models.Model):
         verbose_name = "Parent"
         verbose_name_plural = "Parents"
         ordering = ['user__first_name', 'user__last_name']
+        # phone_number is served by its unique index
         indexes = [
-            models.Index(fields=['phone_number']),
             models.Index(fields=['verified']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),  # /sync/ deltas
             models.Index(fields=['user']),
         ]
         constraints = [
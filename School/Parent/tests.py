@@ -1,3 +1,97 @@
-from django.test import TestCase
+from django.contrib.admin.sites import site
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from api.testing import QueryBudgetMixin, SampleData
+from Parent.admin import ParentAdmin
+from Parent.models import Parent
+from Users.models import User
+
+
+class ParentAdminSearchTests(TestCase):
+    def setUp(self):
+        self.admin = ParentAdmin(Parent, site)
+        self.request = RequestFactory().get("/admin/Parent/parent/")
+        for email, phone in (("ama@gmail.com", "0241234567"), ("kofi@school.dev", "0551234567")):
+            User.objects.create_user(email, "Test-Passw0rd!", "Ama", "Mensah", phone_number=phone)
+
+    def search(self, term):
+        queryset, _ = self.admin.get_search_results(self.request, Parent.objects.all(), term)
+        return sorted(parent.user.email for parent in queryset.select_related("user"))
+
+    def test_email_suffix(self):
+        self.assertEqual(self.search("@gmail.com"), ["ama@gmail.com"])
+
+    def test_local_phone_prefix(self):
+        self.assertEqual(self.search("055"), ["kofi@school.dev"])
+
+    def test_inline_autocomplete_skips_the_child_count(self):
+        admin_user = User.objects.create_superuser("admin@example.com", "Test-Passw0rd!", "Ad", "Min")
+        self.client.force_login(admin_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/admin/autocomplete/", {
+                "term": "055", "app_label": "Student", "model_name": "student_parents", "field_name": "parent",
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertFalse(any("active_children_count" in query["sql"] for query in queries))
+
+
+class ParentSaveTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "parent_create": 3,
+        "parent_save": 1,  # validated fields unchanged
+        "parent_verify": 1,
+    }
+
+    def setUp(self):
+        self.data = SampleData()
+
+    def test_duplicate_phone_is_a_field_error(self):
+        taken = self.data.make_parent().phone_number
+        user = self.data.make_parent(phone_number=None)
+        with self.assertRaises(ValidationError) as caught:
+            Parent.objects.create(user=user, phone_number=taken)
+        self.assertIn("phone_number", caught.exception.message_dict)
+        self.assertIsInstance(caught.exception.__cause__, IntegrityError)
+
+    def test_unmapped_integrity_error_is_not_mapped(self):
+        self.assertIsNone(Parent()._constraint_error(IntegrityError("some other constraint")))
+
+    def test_parent_create(self):
+        user = self.data.make_parent(phone_number=None)
+        self.assertQueryBudget("parent_create", lambda: Parent.objects.create(user=user, phone_number="0241234567"))
+
+    def test_parent_save(self):
+        parent = Parent.objects.get(user=self.data.make_parent())
+        parent.is_primary = False
+        self.assertQueryBudget("parent_save", parent.save)
+
+    def test_parent_verify(self):
+        parent = Parent.objects.get(user=self.data.make_parent())
+        self.assertQueryBudget("parent_verify", parent.verify_phone)
+
+
+class FindByPhoneTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "parent_find_by_phone": 1,  # local format, one probe of the unique index
+    }
+
+    def setUp(self):
+        self.data = SampleData()
+
+    def test_any_ghana_format_finds_the_parent(self):
+        user = self.data.make_parent(phone_number="0241234567")
+        for phone in ("0241234567", "024 123 4567", "+233241234567", "233241234567"):
+            with self.subTest(phone):
+                self.assertEqual(Parent.objects.find_by_phone(phone).user_id, user.pk)
+        self.assertIsNone(Parent.objects.find_by_phone("0551234567"))
+        self.assertIsNone(Parent.objects.find_by_phone("not a phone"))
+
+    def test_query_budget(self):
+        user = self.data.make_parent()
+        self.assertQueryBudget("parent_find_by_phone", lambda: self.assertEqual(
+            Parent.objects.find_by_phone("0" + user.phone_number[4:]).user_id, user.pk
+        ))
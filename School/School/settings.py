@@ -83,6 +83,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.RateLimitHeadersMiddleware",
 ]
 
 ROOT_URLCONF = "School.urls"
@@ -139,12 +140,57 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# ============================
+# Cache
+# ============================
+# Local-memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. Redis or a file cache) so all workers see the same counters.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "steva-default"),
+    }
+}
+
+# ============================
+# Login Lockout
+# ============================
+LOGIN_LOCKOUT = {
+    "CACHE_ALIAS": "default",
+    "MAX_ATTEMPTS": 5,  # per email
+    "IP_MAX_ATTEMPTS": 20,  # per client IP, across emails
+    "WINDOW": 15 * 60,  # sliding window (seconds)
+    "LOCK_DURATION": 15 * 60,  # seconds
+}
+
+# ============================
+# Login State
+# ============================
+# Successful logins write last_login (and clear lock columns) in one UPDATE.
+# With buffering, last_login is flushed in bulk every FLUSH_INTERVAL seconds.
+LOGIN_STATE = {
+    "BUFFER_LAST_LOGIN": os.environ.get("BUFFER_LAST_LOGIN", "False") == "True",
+    "FLUSH_INTERVAL": 30,  # seconds
+    "FLUSH_SIZE": 500,
+}
+
+# ============================
+# Password Hashing Pool
+# ============================
+# Hashing runs on a small process pool; requests get a 503 once it is full.
+# Set PASSWORD_HASHING_WORKERS=0 to hash inline (tests, management commands).
+PASSWORD_HASHING_POOL = {
+    "WORKERS": int(os.environ.get("PASSWORD_HASHING_WORKERS", "2")),
+    "QUEUE_SIZE": int(os.environ.get("PASSWORD_HASHING_QUEUE_SIZE", "16")),
+    "TIMEOUT": float(os.environ.get("PASSWORD_HASHING_TIMEOUT", "5")),
+}
+
 # ============================
 # REST Framework
 # ============================
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",  # change to IsAuthenticated later if needed
@@ -162,10 +208,25 @@ REST_FRAMEWORK = {
         "rest_framework.parsers.MultiPartParser",
         "rest_framework.parsers.FormParser",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # Page numbers by default; ?pagination=cursor switches to keyset pages
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.OptInCursorPagination",
     "PAGE_SIZE": 20,
 }
 
+# ============================
+# Throttling
+# ============================
+# Token buckets shared by every worker on the host through a SQLite file.
+# Use api.throttling.LocalBucketStore for per-process buckets (tests).
+THROTTLE_STORE = {
+    "BACKEND": os.environ.get("THROTTLE_STORE_BACKEND", "api.throttling.SQLiteBucketStore"),
+    "OPTIONS": {},
+}
+if THROTTLE_STORE["BACKEND"].endswith("SQLiteBucketStore"):
+    THROTTLE_STORE["OPTIONS"]["path"] = os.environ.get(
+        "THROTTLE_DB_PATH", str(BASE_DIR / "throttle.sqlite3")
+    )
+
 # ============================
 # JWT Config
 # ============================
@@ -174,12 +235,25 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
-    "UPDATE_LAST_LOGIN": True,
+    "UPDATE_LAST_LOGIN": False,  # handled by Users.login_state.record_login
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Token table maintenance (manage.py purge_tokens)
+TOKEN_LIFECYCLE = {
+    "PURGE_BATCH_SIZE": 1000,
+    "PURGE_PAUSE": 0.05,  # seconds between batches
+    "JTI_INDEX": os.environ.get("TOKEN_JTI_INDEX", "False") == "True",
+}
+
+# Per-process cache used by ClaimsJWTAuthentication
+JWT_USER_CACHE = {
+    "MAX_SIZE": 1024,
+    "TTL": 60,  # seconds
+}
+
 # ============================
 # CORS
 # ============================
@@ -206,6 +280,51 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "noreply@school.dev"
 FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:5173/")
 
+# Outbox delivered by `manage.py send_outbox --every 5`, which production
+# must run as its own long-lived process (nothing else sends queued mail).
+# In DEBUG a daemon thread also drains it after each enqueue so runserver
+# needs no worker.
+EMAIL_OUTBOX = {
+    "BATCH_SIZE": 50,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_BASE": 30,  # seconds, doubles per attempt
+    "BACKOFF_MAX": 3600,
+    "LEASE": 300,
+    "RETENTION_DAYS": 30,  # sent and dead-lettered rows are then purged
+    "BACKGROUND_THREAD": DEBUG,
+}
+
+# ============================
+# Students
+# ============================
+# Numbers each process reserves from the StudentIdSequence counter at a time
+STUDENT_ID_BLOCK_SIZE = int(os.environ.get("STUDENT_ID_BLOCK_SIZE", 20))
+
+# Bulk student import (see api/bulk_import.py)
+STUDENT_IMPORT = {
+    "CHUNK_SIZE": 500,
+    "MAX_REPORTED_ERRORS": 1000,
+}
+
+# Student search (see api/search.py)
+STUDENT_SEARCH = {
+    "INDEX_TTL": 60,  # seconds; in-process index only (non-PostgreSQL)
+    "MIN_SCORE": 0.3,
+    "MAX_RESULTS": 50,
+}
+
+# Archival of long-inactive students (see Student/archive.py)
+STUDENT_ARCHIVE = {
+    "INACTIVE_DAYS": 365,
+    "BATCH_SIZE": 500,
+}
+
+# Mobile delta sync (see api/sync.py)
+SYNC = {
+    "OVERLAP": 5,  # seconds re-read before each sync token
+    "TOMBSTONE_DAYS": 30,
+}
+
 # ============================
 # Static & Media
 # ============================
@@ -273,6 +392,14 @@ SOCIAL_AUTH_GOOGLE_OAUTH2_SCOPE = [
 ]
 SOCIAL_AUTH_GOOGLE_OAUTH2_EXTRA_DATA = ["first_name", "last_name", "picture"]
 
+# ID-token verification for the login API (certs cached in-process).
+# Use api.google_auth.LocalIssuer as KEY_SOURCE to run without network.
+GOOGLE_ID_TOKEN = {
+    "KEY_SOURCE": "api.google_auth.GoogleCertsSource",
+    "OPTIONS": {},
+    "AUDIENCE": GOOGLE_CLIENT_ID,
+}
+
 # Facebook OAuth2
 SOCIAL_AUTH_FACEBOOK_KEY = os.getenv("FACEBOOK_APP_ID")
 SOCIAL_AUTH_FACEBOOK_SECRET = os.getenv("FACEBOOK_APP_SECRET")
@@ -1,7 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.core.exceptions import ValidationError
+from django.db.models import Count, Q
 from django import forms
-from .models import Student
+from api.admin_utils import EstimatedCountPaginator
+from .models import ArchivedStudent, Student
 from Parent.models import Parent
 
 
@@ -48,12 +50,13 @@ class StudentAdmin(admin.ModelAdmin):
         'is_active', 'linked_parents_count', 'created_at'
     )
     list_filter = ('is_active', 'current_class', 'created_at')
-    search_fields = (
-        'student_id', 'first_name', 'last_name', 'current_class',
-        'parents__user__first_name', 'parents__user__last_name'
-    )
+    # Parent names are searched too, through a semi-join in get_search_results
+    search_fields = ('student_id', 'first_name', 'last_name', 'current_class')
     readonly_fields = ('student_id', 'created_at', 'updated_at')
     inlines = [ParentInline]
+    actions = ['force_logout_parents']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Student Information', {
@@ -71,26 +74,61 @@ class StudentAdmin(admin.ModelAdmin):
 
     def linked_parents_count(self, obj):
         """Display number of linked parents."""
-        return obj.parents.count()
+        return obj.parents_count
     linked_parents_count.short_description = "No. of Parents"
+    linked_parents_count.admin_order_field = 'parents_count'
+
+    @admin.action(description="Force logout parents of selected students")
+    def force_logout_parents(self, request, queryset):
+        from api.tokens import revoke_tokens
+        from Users.models import User
 
-    def save_model(self, request, obj, form, change):
-        """Auto-generate student_id if missing."""
-        if not obj.student_id:
-            last_student = Student.objects.order_by('-id').first()
-            if last_student and last_student.student_id and last_student.student_id.startswith("SA"):
-                try:
-                    num = int(last_student.student_id.replace("SA", "")) + 1
-                except ValueError:
-                    num = Student.objects.count() + 1
-            else:
-                num = 1
-            obj.student_id = f"SA{num:03d}"
-        super().save_model(request, obj, form, change)
+        parents = User.objects.filter(parent_profile__students__in=queryset).distinct()
+        revoked = revoke_tokens(parents, bump_version=True)
+        self.message_user(request, f"Revoked {revoked} refresh token(s).", messages.SUCCESS)
 
     def get_queryset(self, request):
-        """Optimize queries with prefetch_related for parents and users."""
-        return super().get_queryset(request).prefetch_related('parents__user')
+        """Annotate the parent count instead of counting per row."""
+        return super().get_queryset(request).annotate(parents_count=Count('parents'))
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match each term against the student's own columns or its parents'
+        names. Parents are matched with a ``pk IN (subquery)`` semi-join, so
+        the result has no duplicate rows and needs no DISTINCT.
+        """
+        links = Student.parents.through.objects
+        for bit in search_term.split():
+            parent_match = links.filter(
+                Q(parent__user__first_name__icontains=bit) | Q(parent__user__last_name__icontains=bit)
+            ).values('student_id')
+            queryset = queryset.filter(
+                Q(student_id__icontains=bit)
+                | Q(first_name__icontains=bit)
+                | Q(last_name__icontains=bit)
+                | Q(current_class__icontains=bit)
+                | Q(pk__in=parent_match)
+            )
+        return queryset, False
+
+    def save_related(self, request, form, formsets, change):
+        """
+        The parent inline saves through rows directly, which sends no
+        m2m_changed, so apply its link changes to the roster and the sync
+        tombstones here.
+        """
+        from api.sync import record_tombstones
+        from .roster import add_links, apply_roster_deltas, new_deltas
+
+        student = form.instance
+        links = Student.parents.through.objects.filter(student_id=student.pk).values_list('parent_id', flat=True)
+        before = set(links)
+        super().save_related(request, form, formsets, change)
+        after = set(links)
+        deltas = new_deltas()
+        add_links(deltas, student.current_class, len(after) - len(before))
+        apply_roster_deltas(deltas)
+        record_tombstones((parent_id, student.pk) for parent_id in before - after)
 
     def get_readonly_fields(self, request, obj=None):
         """Keep student_id readonly for existing objects."""
@@ -98,3 +136,25 @@ class StudentAdmin(admin.ModelAdmin):
         if obj and 'student_id' not in readonly_fields:
             readonly_fields.append('student_id')
         return readonly_fields
+
+
+@admin.register(ArchivedStudent)
+class ArchivedStudentAdmin(admin.ModelAdmin):
+    """Read-only view of the archive; rows are moved by archive_students."""
+    list_display = ('student_id', 'first_name', 'last_name', 'current_class', 'archived_at')
+    list_filter = ('current_class', 'archived_at')
+    search_fields = ('student_id', 'first_name', 'last_name')
+    readonly_fields = [field.name for field in ArchivedStudent._meta.fields] + ['parents']
+    actions = ['restore']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Restore selected students")
+    def restore(self, request, queryset):
+        from .archive import restore_students
+
+        restored = restore_students(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f"Restored {restored} student(s).", messages.SUCCESS)
@@ -0,0 +1,127 @@
+"""
+Archival of long-inactive students.
+
+Graduated and withdrawn students stay in the Student table forever, which
+keeps every index on it growing. ``archive_students`` moves students that
+have been inactive for INACTIVE_DAYS (going by ``updated_at``), with their
+parent links, into ``ArchivedStudent`` in batches. ``restore_students`` moves
+them back with the same primary key, number and ID. Archived students stay
+queryable through ``ArchivedStudent.objects``.
+
+Rows are moved with bulk writes, which send no signals, and deleted
+inside ``batch_deletes()``, which mutes the Student delete receivers, so
+each batch applies the class roster deltas, sync tombstones and search
+index updates itself. Run ``manage.py archive_students``, optionally with ``--every``.
+
+Configure through ``settings.STUDENT_ARCHIVE``:
+    INACTIVE_DAYS  days a student must have been inactive to be archived
+    BATCH_SIZE     students moved per transaction
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from api.search import get_student_index
+from api.sync import record_tombstones
+
+from . import roster
+from .models import ArchivedStudent, Student
+from .signals import batch_deletes
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    "INACTIVE_DAYS": 365,
+    "BATCH_SIZE": 500,
+}
+
+
+def archive_setting(name):
+    return {**DEFAULT_ARCHIVE_SETTINGS, **getattr(settings, "STUDENT_ARCHIVE", {})}[name]
+
+
+def archive_candidates(days=None):
+    """Inactive students last updated more than ``days`` ago."""
+    cutoff = timezone.now() - timedelta(days=days or archive_setting("INACTIVE_DAYS"))
+    return Student.objects.filter(is_active=False, updated_at__lt=cutoff).order_by('pk')
+
+
+def _copy(source, model):
+    return model(**{field: getattr(source, field) for field in ArchivedStudent.COPIED_FIELDS})
+
+
+def archive_students(days=None, batch_size=None):
+    """Archive all current candidates in batches; returns the number moved."""
+    batch_size = batch_size or archive_setting("BATCH_SIZE")
+    candidates = archive_candidates(days)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            students = list(candidates.select_for_update()[:batch_size])
+            if not students:
+                return moved
+            _archive_batch(students)
+        moved += len(students)
+
+
+def _archive_batch(students):
+    pks = [student.pk for student in students]
+    through = Student.parents.through
+    links = list(through.objects.filter(student_id__in=pks).values_list('student_id', 'parent_id'))
+
+    ArchivedStudent.objects.bulk_create([_copy(student, ArchivedStudent) for student in students])
+    ArchivedStudent.parents.through.objects.bulk_create([
+        ArchivedStudent.parents.through(archivedstudent_id=student_id, parent_id=parent_id)
+        for student_id, parent_id in links
+    ])
+    # Takes the parent links with it. The per-row delete receivers would
+    # each update the roster, tombstones and index; this batch does it below
+    with batch_deletes():
+        Student.objects.filter(pk__in=pks).delete()
+
+    link_counts = Counter(student_id for student_id, _ in links)
+    deltas = roster.new_deltas()
+    for student in students:
+        roster.add_student(deltas, student.roster_state(), -1, link_counts[student.pk])
+    roster.apply_roster_deltas(deltas)
+    record_tombstones((parent_id, student_id) for student_id, parent_id in links)
+    index = get_student_index()
+    transaction.on_commit(lambda: [index.delete(pk) for pk in pks])
+
+
+def restore_students(pks):
+    """Move archived students ``pks`` back into Student, inactive; returns the count."""
+    with transaction.atomic():
+        archived = list(ArchivedStudent.objects.filter(pk__in=pks).select_for_update())
+        if not archived:
+            return 0
+        pks = [student.pk for student in archived]
+        links = list(
+            ArchivedStudent.parents.through.objects.filter(archivedstudent_id__in=pks)
+            .values_list('archivedstudent_id', 'parent_id')
+        )
+        students = [_copy(student, Student) for student in archived]
+        for student in students:
+            student.is_active = False
+        Student.objects.bulk_create(students)
+        # bulk_create stamps created_at (auto_now_add); put the originals back
+        Student.objects.filter(pk__in=pks).update(created_at=Case(
+            *[When(pk=student.pk, then=Value(student.created_at)) for student in archived]
+        ))
+        through = Student.parents.through
+        through.objects.bulk_create([
+            through(student_id=student_id, parent_id=parent_id) for student_id, parent_id in links
+        ])
+        ArchivedStudent.parents.through.objects.filter(archivedstudent_id__in=pks).delete()
+        ArchivedStudent.objects.filter(pk__in=pks).delete()
+
+        link_counts = Counter(student_id for student_id, _ in links)
+        deltas = roster.new_deltas()
+        for student in students:
+            roster.add_student(deltas, student.roster_state(), links=link_counts[student.pk])
+        roster.apply_roster_deltas(deltas)
+        # search_text is generated by the database; rebuild rather than guess
+        transaction.on_commit(get_student_index().invalidate)
+    return len(students)
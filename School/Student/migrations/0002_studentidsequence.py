@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentIdSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.PositiveBigIntegerField(default=1, help_text='First number not yet handed out to any process.')),
+            ],
+            options={
+                'verbose_name': 'Student ID sequence',
+                'verbose_name_plural': 'Student ID sequences',
+            },
+        ),
+    ]
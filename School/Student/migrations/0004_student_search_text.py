@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:52
+
+import django.db.models.functions.text
+from django.db import migrations, models, transaction
+
+# search_text is already lower-case, so the trigram index is on the bare
+# column. SQL spelled out so later app changes cannot alter this migration.
+INDEX = 'student_student_search_text_trgm'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        return  # pg_trgm unavailable; search falls back to the in-process index
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{INDEX}" ON "Student_student" USING gin ("search_text" gin_trgm_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{INDEX}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0003_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat('student_id', models.Value(' '), 'first_name', models.Value(' '), 'last_name', models.Value(' '), 'current_class')), output_field=models.CharField(max_length=400)),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
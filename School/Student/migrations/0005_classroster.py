@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:55
+
+from django.db import migrations, models
+
+
+def populate_roster(apps, schema_editor):
+    ClassRoster = apps.get_model('Student', 'ClassRoster')
+    Student = apps.get_model('Student', 'Student')
+    rosters = {}
+    rows = (
+        Student.objects.order_by()
+        .values('current_class', 'is_active')
+        .annotate(students=models.Count('pk', distinct=True), links=models.Count('parents'))
+    )
+    for row in rows:
+        name = " ".join((row['current_class'] or "").split()).upper()
+        roster = rosters.setdefault(name, ClassRoster(name=name))
+        if row['is_active']:
+            roster.active_students += row['students']
+        else:
+            roster.inactive_students += row['students']
+        roster.parent_links += row['links']
+    ClassRoster.objects.bulk_create(rosters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0004_student_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassRoster',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('active_students', models.IntegerField(default=0)),
+                ('inactive_students', models.IntegerField(default=0)),
+                ('parent_links', models.IntegerField(default=0, help_text='Student-parent links for students in this class.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Class roster',
+                'verbose_name_plural': 'Class rosters',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(populate_roster, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Parent', '0005_parent_updated_at_index'),
+        ('Student', '0005_classroster'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['updated_at'], name='Student_stu_updated_103cc4_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Parent', '0005_parent_updated_at_index'),
+        ('Student', '0006_student_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStudent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('student_number', models.PositiveIntegerField(blank=True, null=True, unique=True)),
+                ('student_id', models.CharField(blank=True, max_length=10, null=True, unique=True)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('current_class', models.CharField(db_index=True, max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(help_text='Last update before archiving.')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Archived student',
+                'verbose_name_plural': 'Archived students',
+                'ordering': ['student_number'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='Student_stu_is_acti_2d87d5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='Student_stu_current_326635_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='Student_stu_created_8d6278_idx',
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['current_class'], name='student_active_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='student_active_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedstudent',
+            name='parents',
+            field=models.ManyToManyField(blank=True, related_name='archived_students', to='Parent.parent'),
+        ),
+    ]
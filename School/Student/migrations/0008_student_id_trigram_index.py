@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Same as 0003: a GIN trigram index on UPPER(student_id) for the admin's
+# icontains search ("001" finds "SA001"). Needs pg_trgm, which 0003 enables
+# when the role allows it.
+NAME = 'student_student_student_id_trgm'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return  # searches fall back to a LIKE scan
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{NAME}" ON "Student_student" USING gin (UPPER("student_id") gin_trgm_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{NAME}"')
+
+
+class Migration(migrations.Migration):
+    """Trigram index for the admin's student_id search (PostgreSQL only)."""
+
+    dependencies = [
+        ('Student', '0007_partial_indexes_archivedstudent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
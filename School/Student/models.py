@@ -1,17 +1,65 @@
 import re
-from django.db import models, transaction
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Lower
 from django.core.validators import MinLengthValidator
 from Parent.models import Parent
 
 
+class StudentIdSequence(models.Model):
+    """
+    Counter table for student numbers. Processes reserve blocks of numbers
+    from it (see Student/sequences.py) instead of locking the highest
+    student row on every insert.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.PositiveBigIntegerField(
+        default=1,
+        help_text="First number not yet handed out to any process."
+    )
+
+    class Meta:
+        verbose_name = "Student ID sequence"
+        verbose_name_plural = "Student ID sequences"
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class ClassRoster(models.Model):
+    """
+    Per-class enrolment summary, maintained incrementally from Student and
+    parent-link changes (see Student/roster.py). ``name`` is the normalised
+    class (whitespace collapsed, upper-case).
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    active_students = models.IntegerField(default=0)
+    inactive_students = models.IntegerField(default=0)
+    parent_links = models.IntegerField(
+        default=0,
+        help_text="Student-parent links for students in this class."
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Class roster"
+        verbose_name_plural = "Class rosters"
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name}: {self.active_students} active"
+
+
 class StudentManager(models.Manager):
     """Custom manager for Student model with common queries."""
 
     def active(self):
         return self.filter(is_active=True)
 
-    def by_class(self, class_name):
-        return self.filter(current_class=class_name)
+    def by_class(self, class_name, active_only=False):
+        # active_only lets the query use the partial class index
+        queryset = self.active() if active_only else self
+        return queryset.filter(current_class=class_name)
 
     def with_parents(self):
         return self.prefetch_related('parents')
@@ -70,6 +118,15 @@ class Student(models.Model):
         help_text="Parents associated with this student."
     )
 
+    # Normalised text for /students/search/, maintained by the database
+    search_text = models.GeneratedField(
+        expression=Lower(Concat(
+            'student_id', Value(' '), 'first_name', Value(' '), 'last_name', Value(' '), 'current_class'
+        )),
+        output_field=models.CharField(max_length=400),
+        db_persist=True,
+    )
+
     # Audit fields
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -84,27 +141,33 @@ class Student(models.Model):
     # Custom manager
     objects = StudentManager()
 
+    # Fields the class roster depends on (see Student/roster.py)
+    ROSTER_FIELDS = ('current_class', 'is_active')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._roster_state = instance.roster_state()
+        return instance
+
+    def roster_state(self):
+        """Current values of ROSTER_FIELDS (deferred fields read as None)."""
+        return tuple(self.__dict__.get(field) for field in self.ROSTER_FIELDS)
+
     def save(self, *args, **kwargs):
         """
         Override save to auto-generate student_number and student_id if not provided.
-        Uses database-level locking to prevent race conditions.
+        Numbers come from the block allocator, so no row lock is taken here.
         """
         if not self.student_number or not self.student_id:
-            with transaction.atomic():
-                last_student = (
-                    Student.objects.select_for_update()
-                    .exclude(student_number__isnull=True)
-                    .order_by('-student_number')
-                    .first()
-                )
-
-                num = (last_student.student_number + 1) if last_student else 1
-                self.student_number = num
-                self.student_id = f"SA{num:03d}"
-
-                super().save(*args, **kwargs)
-        else:
-            super().save(*args, **kwargs)
+            from .sequences import assign_student_ids
+            assign_student_ids([self])
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def format_student_id(number):
+        """SA001-style identifier for a student number."""
+        return f"SA{number:03d}"
 
     def get_full_name(self):
         """Return the student's full name."""
@@ -131,9 +194,17 @@ class Student(models.Model):
         indexes = [
             models.Index(fields=['student_id']),
             models.Index(fields=['student_number']),
-            models.Index(fields=['is_active']),
-            models.Index(fields=['current_class']),
-            models.Index(fields=['-created_at']),
+            # Hot queries only look at current enrolment (is_active=True);
+            # long-inactive students are moved to ArchivedStudent
+            models.Index(
+                fields=['current_class'], condition=models.Q(is_active=True),
+                name='student_active_class_idx',
+            ),
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_active=True),
+                name='student_active_created_idx',
+            ),
+            models.Index(fields=['updated_at']),  # /sync/ deltas
         ]
         constraints = [
             models.UniqueConstraint(
@@ -153,3 +224,56 @@ class Student(models.Model):
                 name="student_current_class_not_empty"
             ),
         ]
+
+
+class ArchivedStudentManager(models.Manager):
+    """Queries over archived students, mirroring StudentManager."""
+
+    def by_class(self, class_name):
+        return self.filter(current_class=class_name)
+
+    def for_parent(self, parent):
+        return self.filter(parents=parent)
+
+    def with_parents(self):
+        return self.prefetch_related('parents')
+
+    def archived_before(self, moment):
+        return self.filter(archived_at__lt=moment)
+
+
+class ArchivedStudent(models.Model):
+    """
+    A long-inactive student moved out of the Student table, with its parent
+    links (see Student/archive.py). Keeps the original primary key, number
+    and ID, so a student can be restored unchanged.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student_number = models.PositiveIntegerField(unique=True, null=True, blank=True)
+    student_id = models.CharField(max_length=10, unique=True, null=True, blank=True)
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    current_class = models.CharField(max_length=100, db_index=True)
+    parents = models.ManyToManyField(Parent, related_name='archived_students', blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(help_text="Last update before archiving.")
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = ArchivedStudentManager()
+
+    # Columns copied to and from Student; everything else is recomputed
+    COPIED_FIELDS = (
+        'id', 'student_number', 'student_id', 'first_name', 'last_name',
+        'current_class', 'created_at', 'updated_at',
+    )
+
+    class Meta:
+        verbose_name = "Archived student"
+        verbose_name_plural = "Archived students"
+        ordering = ['student_number']
+
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def __str__(self):
+        return f"{self.student_id or self.pk} - {self.get_full_name()} (archived)"
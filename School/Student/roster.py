@@ -0,0 +1,136 @@
+"""
+Class roster summary.
+
+Dashboards read per-class counts from ``ClassRoster`` (O(classes)) instead
+of grouping the whole Student table. Rows are kept current with deltas:
+Student save/delete and ``parents`` m2m_changed signals (Student/signals.py),
+plus explicit calls from code that writes with bulk_create or through-table
+queries. Writes that bypass both, such as ``QuerySet.update()``, are fixed by
+``rebuild_roster``. Run ``manage.py check_class_roster --fix``, optionally
+with ``--every``.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ClassRoster, Student
+
+ROSTER_COUNTS = ('active_students', 'inactive_students', 'parent_links')
+
+
+def class_key(name):
+    """Normalised class name: whitespace collapsed, upper-case."""
+    return " ".join((name or "").split()).upper()
+
+
+def new_deltas():
+    return defaultdict(Counter)
+
+
+def add_student(deltas, state, sign=1, links=0):
+    """Record a student with roster ``state`` (class, is_active) joining (+1) or leaving (-1)."""
+    current_class, is_active = state
+    if not current_class:
+        return
+    delta = deltas[class_key(current_class)]
+    delta['active_students' if is_active else 'inactive_students'] += sign
+    delta['parent_links'] += sign * links
+
+
+def add_links(deltas, current_class, count):
+    if current_class and count:
+        deltas[class_key(current_class)]['parent_links'] += count
+
+
+def apply_roster_deltas(deltas):
+    """
+    Apply ``{class: Counter}`` deltas. On PostgreSQL and SQLite this is one
+    INSERT ... ON CONFLICT DO UPDATE for all touched classes, so a class
+    seen for the first time costs no extra queries; elsewhere one UPDATE
+    per class, plus an INSERT for new classes.
+    """
+    changes = {}
+    for name, delta in sorted(deltas.items()):  # fixed order: row locks in the same order
+        counts = {field: delta[field] for field in ROSTER_COUNTS}
+        if any(counts.values()):
+            changes[name] = counts
+    if not changes:
+        return
+    connection = connections[router.db_for_write(ClassRoster)]
+    if connection.vendor in ('postgresql', 'sqlite'):
+        _upsert_roster(connection, changes)
+        return
+
+    now = timezone.now()
+    for name, counts in changes.items():
+        updates = {field: F(field) + value for field, value in counts.items() if value}
+        if ClassRoster.objects.filter(name=name).update(**updates, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                ClassRoster.objects.create(name=name, **counts)
+        except IntegrityError:
+            # Created concurrently; apply the delta to that row
+            ClassRoster.objects.filter(name=name).update(**updates, updated_at=now)
+
+
+def _upsert_roster(connection, changes):
+    qn = connection.ops.quote_name
+    table = qn(ClassRoster._meta.db_table)
+    columns = ['name', *ROSTER_COUNTS, 'updated_at']
+    now = ClassRoster._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    params = []
+    for name, counts in changes.items():
+        params += [name, *(counts[field] for field in ROSTER_COUNTS), now]
+    row = f"({', '.join(['%s'] * len(columns))})"
+    increments = ', '.join(f"{qn(field)} = {table}.{qn(field)} + EXCLUDED.{qn(field)}" for field in ROSTER_COUNTS)
+    sql = (
+        f"INSERT INTO {table} ({', '.join(qn(column) for column in columns)}) "
+        f"VALUES {', '.join([row] * len(changes))} "
+        f"ON CONFLICT ({qn('name')}) DO UPDATE SET {increments}, {qn('updated_at')} = EXCLUDED.{qn('updated_at')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def compute_roster():
+    """Actual per-class counts, from one GROUP BY over Student."""
+    actual = defaultdict(lambda: dict.fromkeys(ROSTER_COUNTS, 0))
+    rows = (
+        Student.objects.order_by()
+        .values('current_class', 'is_active')
+        .annotate(students=Count('pk', distinct=True), links=Count('parents'))
+    )
+    for row in rows:
+        counts = actual[class_key(row['current_class'])]
+        counts['active_students' if row['is_active'] else 'inactive_students'] += row['students']
+        counts['parent_links'] += row['links']
+    return dict(actual)
+
+
+def check_roster():
+    """Return ``[(class, stored_counts, actual_counts)]`` for every mismatch."""
+    actual = compute_roster()
+    stored = {
+        row['name']: {field: row[field] for field in ROSTER_COUNTS}
+        for row in ClassRoster.objects.values('name', *ROSTER_COUNTS)
+    }
+    empty = dict.fromkeys(ROSTER_COUNTS, 0)
+    return [
+        (name, stored.get(name, empty), actual.get(name, empty))
+        for name in sorted(set(actual) | set(stored))
+        if stored.get(name, empty) != actual.get(name, empty)
+    ]
+
+
+def rebuild_roster():
+    """Replace the summary with freshly computed counts. Returns the class count."""
+    actual = compute_roster()
+    with transaction.atomic():
+        ClassRoster.objects.all().delete()
+        ClassRoster.objects.bulk_create([
+            ClassRoster(name=name, **counts) for name, counts in actual.items()
+        ])
+    return len(actual)
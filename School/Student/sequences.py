@@ -0,0 +1,122 @@
+"""
+Block allocation of student numbers.
+
+``Student.save`` used to lock the row with the highest ``student_number``
+(select_for_update) to compute the next SA-number, which serialised every
+student insert and ruled out ``bulk_create``. Numbers now come from the
+``StudentIdSequence`` counter table: each process reserves a block of
+STUDENT_ID_BLOCK_SIZE numbers with one UPDATE and hands them out from
+memory, so the counter row is touched once per block rather than per insert.
+
+Numbers are unique and increasing per process, but not gap-free: a block
+reserved by a process that exits is never reused. A new counter starts
+after the highest number in Student or ArchivedStudent, so restoring an
+archived student never collides with a number handed out since.
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+from .models import ArchivedStudent, Student, StudentIdSequence
+
+SEQUENCE_NAME = "student"
+
+
+class BlockAllocator:
+    def __init__(self, name, block_size):
+        self.name = name
+        self.block_size = max(int(block_size), 1)
+        self._blocks = deque()  # committed [start, end) ranges ready to hand out
+        self._lock = threading.Lock()
+        self.blocks_reserved = 0
+
+    def allocate(self, count=1):
+        """Return ``count`` unused numbers."""
+        numbers = []
+        with self._lock:
+            while self._blocks and len(numbers) < count:
+                start, end = self._blocks.popleft()
+                take = min(count - len(numbers), end - start)
+                numbers.extend(range(start, start + take))
+                if start + take < end:
+                    self._blocks.appendleft((start + take, end))
+        if len(numbers) < count:
+            needed = count - len(numbers)
+            start, end = self._reserve(max(self.block_size, needed))
+            numbers.extend(range(start, start + needed))
+            if start + needed < end:
+                surplus = (start + needed, end)
+                # A reservation made inside a transaction is only safe to reuse
+                # once that transaction commits; on rollback the counter reverts.
+                transaction.on_commit(lambda: self._adopt(surplus))
+        return numbers
+
+    def _adopt(self, block):
+        with self._lock:
+            self._blocks.append(block)
+
+    def _reserve(self, size):
+        """Advance the counter by ``size``; returns the reserved [start, end)."""
+        with transaction.atomic():
+            updated = StudentIdSequence.objects.filter(name=self.name).update(
+                next_value=F("next_value") + size
+            )
+            if not updated:
+                self._initialise()
+                return self._reserve(size)
+            end = StudentIdSequence.objects.values_list("next_value", flat=True).get(name=self.name)
+        self.blocks_reserved += 1
+        return end - size, end
+
+    def ensure_counter(self):
+        """
+        Create the counter row if it is missing (fresh databases, fixtures),
+        so the first allocation costs no more than any later one.
+        """
+        if not StudentIdSequence.objects.filter(name=self.name).exists():
+            self._initialise()
+
+    def _initialise(self):
+        """Create the counter, continuing after the highest existing number."""
+        # Archived students keep their numbers (restore_students puts them back)
+        highest = max(
+            Student.objects.aggregate(n=Max("student_number"))["n"] or 0,
+            ArchivedStudent.objects.aggregate(n=Max("student_number"))["n"] or 0,
+        )
+        try:
+            with transaction.atomic():
+                StudentIdSequence.objects.create(name=self.name, next_value=highest + 1)
+        except IntegrityError:
+            pass  # another process created it first
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = BlockAllocator(
+                    SEQUENCE_NAME, getattr(settings, "STUDENT_ID_BLOCK_SIZE", 20)
+                )
+    return _allocator
+
+
+def assign_student_ids(students):
+    """
+    Give every student without a number a student_number/student_id, with
+    one allocator call for the whole list (ready for bulk_create).
+    """
+    pending = [s for s in students if not s.student_number or not s.student_id]
+    if not pending:
+        return students
+    for student, number in zip(pending, get_allocator().allocate(len(pending))):
+        student.student_number = number
+        student.student_id = Student.format_student_id(number)
+    return students
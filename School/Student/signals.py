@@ -0,0 +1,123 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Student
+from .roster import add_links, add_student, apply_roster_deltas, new_deltas
+
+_batch = threading.local()
+
+
+@contextmanager
+def batch_deletes():
+    """
+    Make the Student delete receivers (here and in api/signals.py) no-ops
+    for deletes this thread runs inside the block. For callers that apply
+    the roster, tombstone and search index updates of a whole batch
+    themselves (Student/archive.py).
+    """
+    _batch.active = True
+    try:
+        yield
+    finally:
+        _batch.active = False
+
+
+def in_batch_delete():
+    return getattr(_batch, 'active', False)
+
+
+def _link_count(student):
+    """The student's parent links, from the prefetch cache when it holds them."""
+    cache = getattr(student, '_prefetched_objects_cache', {})
+    if 'parents' in cache:
+        return len(cache['parents'])
+    return Student.parents.through.objects.filter(student_id=student.pk).count()
+
+
+@receiver(post_save, sender=Student)
+def roster_student_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Move the student between roster counts when its class or status changes."""
+    if update_fields is not None and not set(update_fields) & set(Student.ROSTER_FIELDS):
+        return
+    state = instance.roster_state()
+    previous = None if created else getattr(instance, '_roster_state', None)
+    if previous == state:
+        return
+    instance._roster_state = state
+
+    deltas = new_deltas()
+    if created:
+        add_student(deltas, state)
+    else:
+        links = _link_count(instance)
+        if previous is not None:
+            add_student(deltas, previous, -1, links)
+        add_student(deltas, state, 1, links)
+    apply_roster_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Student)
+def roster_count_links(sender, instance, **kwargs):
+    if in_batch_delete():
+        return
+    # The through rows are gone by post_delete (api/signals.py reads these too)
+    instance._parent_ids = list(
+        Student.parents.through.objects.filter(student_id=instance.pk).values_list('parent_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Student)
+def roster_student_deleted(sender, instance, **kwargs):
+    if in_batch_delete():
+        return
+    deltas = new_deltas()
+    state = getattr(instance, '_roster_state', None) or instance.roster_state()
+    add_student(deltas, state, -1, len(getattr(instance, '_parent_ids', ())))
+    apply_roster_deltas(deltas)
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def roster_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Track parent links added or removed through the related managers, in
+    the roster and in the linked students' ``updated_at``.
+    """
+    if action == 'pre_clear':
+        # Remember what is about to be cleared, as (student, class, parent)
+        # rows; post_clear has no pk_set. api/signals.py reads this too.
+        links = Student.parents.through.objects.filter(**{'parent_id' if reverse else 'student_id': instance.pk})
+        instance._cleared_links = list(links.values_list('student_id', 'student__current_class', 'parent_id'))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    deltas = new_deltas()
+    sign = 1 if action == 'post_add' else -1
+    if action == 'post_clear':
+        cleared = getattr(instance, '_cleared_links', [])
+        students = {(student_id, current_class) for student_id, current_class, _ in cleared}
+        for _, current_class, _ in cleared:
+            add_links(deltas, current_class, -1)
+    elif reverse:
+        # instance is a Parent; pk_set holds student ids
+        students = list(Student.objects.filter(pk__in=pk_set).values_list('pk', 'current_class'))
+        for _, current_class in students:
+            add_links(deltas, current_class, sign)
+    else:
+        students = [(instance.pk, instance.current_class)] if pk_set else []
+        add_links(deltas, instance.current_class, sign * len(pk_set or ()))
+    apply_roster_deltas(deltas)
+    _touch_students([pk for pk, _ in students])
+
+
+def _touch_students(pks):
+    """
+    Bump ``updated_at`` on students whose parents changed: ``parent_users``
+    is part of their API representation and ETags (api/conditional.py).
+    """
+    if pks:
+        Student.objects.filter(pk__in=pks).update(updated_at=timezone.now())
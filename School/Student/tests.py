@@ -1,3 +1,161 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import SyncTombstone
+from Student.admin import StudentAdmin
+from Student.archive import archive_students, restore_students
+from Student.models import ArchivedStudent, ClassRoster, Student
+from Student.roster import add_links, apply_roster_deltas, check_roster, new_deltas
+from Student.sequences import BlockAllocator
+from Student.signals import batch_deletes
+from Users.models import User
+
+
+class ClassRosterTests(TestCase):
+    def setUp(self):
+        self.parent = User.objects.create_user(
+            "ama@example.com", "Test-Passw0rd!", "Ama", "Mensah", phone_number="0241234567"
+        ).parent_profile
+
+    def test_new_class_is_one_upsert(self):
+        deltas = new_deltas()
+        add_links(deltas, "p 1", 2)
+        add_links(deltas, "P2", 1)
+        with CaptureQueriesContext(connection) as queries:
+            apply_roster_deltas(deltas)
+            apply_roster_deltas(deltas)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            list(ClassRoster.objects.values_list("name", "parent_links")), [("P 1", 4), ("P2", 2)]
+        )
+
+    def test_signals_keep_roster_consistent(self):
+        student = Student.objects.create(first_name="Kofi", last_name="Boateng", current_class="P1")
+        student.parents.add(self.parent)
+        student = Student.objects.prefetch_related("parents").get(pk=student.pk)
+        student.current_class = "P2"
+        with CaptureQueriesContext(connection) as queries:
+            student.save()
+        # UPDATE and one roster upsert; the link count comes from the prefetch
+        self.assertEqual(len(queries), 2)
+        student.is_active = False
+        student.save()
+        student.parents.remove(self.parent)
+        self.assertEqual(check_roster(), [])
+        self.assertEqual(
+            ClassRoster.objects.filter(name="P2").values_list("inactive_students", "parent_links").get(),
+            (1, 0),
+        )
+
+
+
+class StudentAdminSearchTests(TestCase):
+    def test_student_id_matches_anywhere(self):
+        students = [
+            Student.objects.create(first_name=name, last_name="Boateng", current_class="P1")
+            for name in ("Kofi", "Yaw")
+        ]
+        admin = StudentAdmin(Student, site)
+        request = RequestFactory().get("/admin/Student/student/")
+        term = students[0].student_id[2:]  # the digits, without the "SA" prefix
+        queryset, _ = admin.get_search_results(request, Student.objects.all(), term)
+        self.assertEqual(list(queryset), [students[0]])
+
+class ArchiveTests(TestCase):
+    def test_archive_and_restore_round_trip(self):
+        parent = User.objects.create_user(
+            "ama@example.com", "Test-Passw0rd!", "Ama", "Mensah", phone_number="0241234567"
+        ).parent_profile
+        student = Student.objects.create(first_name="Kofi", last_name="Boateng", current_class="P1")
+        student.parents.add(parent)
+        student.is_active = False
+        student.save()
+        Student.objects.filter(pk=student.pk).update(updated_at=timezone.now() - timedelta(days=400))
+
+        self.assertEqual(archive_students(), 1)
+        self.assertFalse(Student.objects.filter(pk=student.pk).exists())
+        self.assertFalse(Student.parents.through.objects.filter(student_id=student.pk).exists())
+        # Recorded once by the batch, not again by the muted delete receivers
+        self.assertEqual(
+            list(SyncTombstone.objects.values_list("parent_id", "student_id")), [(parent.pk, student.pk)]
+        )
+        self.assertEqual(list(ArchivedStudent.objects.get(pk=student.pk).parents.all()), [parent])
+        self.assertEqual(check_roster(), [])
+
+        self.assertEqual(restore_students([student.pk]), 1)
+        self.assertEqual(list(Student.objects.get(pk=student.pk).parents.all()), [parent])
+        self.assertFalse(ArchivedStudent.objects.exists())
+        self.assertEqual(check_roster(), [])
+
+    def test_receivers_run_again_after_the_batch(self):
+        parent = User.objects.create_user(
+            "ama@example.com", "Test-Passw0rd!", "Ama", "Mensah", phone_number="0241234567"
+        ).parent_profile
+        student = Student.objects.create(first_name="Kofi", last_name="Boateng", current_class="P1")
+        student.parents.add(parent)
+        with batch_deletes():
+            pass
+        student.delete()
+        self.assertEqual(SyncTombstone.objects.count(), 1)
+        self.assertEqual(check_roster(), [])
+
+
+class Rollback(Exception):
+    pass
+
+
+class BlockAllocatorTests(TestCase):
+    def allocator(self, block_size=5):
+        allocator = BlockAllocator("test", block_size)
+        allocator.ensure_counter()
+        return allocator
+
+    def test_block_is_one_counter_update(self):
+        allocator = self.allocator()
+        with CaptureQueriesContext(connection) as queries:
+            allocator.allocate(1)
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"next_value" + 5', updates[0])
+
+    def test_numbers_unique_across_allocators(self):
+        first, second = self.allocator(3), self.allocator(3)
+        numbers = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(4):
+                numbers += first.allocate(2) + second.allocate(1)
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+    def test_surplus_kept_after_commit(self):
+        allocator = self.allocator()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = allocator.allocate(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(allocator.allocate(4), list(range(first[0] + 1, first[0] + 5)))
+
+    def test_surplus_dropped_after_rollback(self):
+        allocator = self.allocator()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    rolled_back = allocator.allocate(1)
+                    raise Rollback
+            except Rollback:
+                pass
+        self.assertEqual(callbacks, [])
+        # The counter reverted with the transaction, so the numbers come round again
+        self.assertEqual(allocator.allocate(1), rolled_back)
+
+    def test_counter_starts_after_live_and_archived_numbers(self):
+        student = Student.objects.create(first_name="Kofi", last_name="Boateng", current_class="P1")
+        self.assertEqual(self.allocator().allocate(1), [student.student_number + 1])
+        ArchivedStudent.objects.create(
+            id=student.pk + 1000, student_number=student.student_number + 100, first_name="Yaw",
+            last_name="Asante", current_class="P6", created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        self.assertEqual(BlockAllocator("archive-test", 5).allocate(1), [student.student_number + 101])
@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from api.admin_utils import EstimatedCountPaginator
 from .models import User
 
 
@@ -30,6 +31,17 @@ class CustomUserAdmin(BaseUserAdmin):
 
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('email',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # Make sure the password form works for your custom user
     filter_horizontal = ('groups', 'user_permissions',)
+
+    actions = ['force_logout']
+
+    @admin.action(description="Force logout (revoke all tokens)")
+    def force_logout(self, request, queryset):
+        from api.tokens import revoke_tokens
+
+        revoked = revoke_tokens(queryset, bump_version=True)
+        self.message_user(request, f"Revoked {revoked} refresh token(s).", messages.SUCCESS)
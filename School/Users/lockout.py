@@ -0,0 +1,149 @@
+"""
+Login lockout backed by the Django cache.
+
+Failed attempts are counted per email and per client IP in a sliding window
+(current + previous fixed bucket, weighted by overlap) using atomic cache
+``incr`` calls, so a burst of bad passwords never touches the users table.
+The DB columns ``failed_login_attempts``/``locked_until`` are only written
+when a lock starts, and cleared on the next successful login after it ends
+(see ``Users/login_state.py``).
+
+Configure through ``settings.LOGIN_LOCKOUT``:
+    CACHE_ALIAS      cache used for counters and lock markers
+    MAX_ATTEMPTS     failures per email before the account is locked
+    IP_MAX_ATTEMPTS  failures per IP (across all emails) before the IP is locked
+    WINDOW           sliding window length in seconds
+    LOCK_DURATION    lock length in seconds
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCKOUT_SETTINGS = {
+    "CACHE_ALIAS": "default",
+    "MAX_ATTEMPTS": 5,
+    "IP_MAX_ATTEMPTS": 20,
+    "WINDOW": 15 * 60,
+    "LOCK_DURATION": 15 * 60,
+}
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+class LoginLockout:
+    key_prefix = "lockout"
+
+    def __init__(self, cache_alias, max_attempts, ip_max_attempts, window, lock_duration):
+        self.cache_alias = cache_alias
+        self.max_attempts = int(max_attempts)
+        self.ip_max_attempts = int(ip_max_attempts)
+        self.window = int(window)
+        self.lock_duration = int(lock_duration)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    # ----- keys -----
+    def _scopes(self, email, ip):
+        scopes = []
+        if email:
+            scopes.append(("email", _digest(email.strip().lower()), self.max_attempts))
+        if ip:
+            scopes.append(("ip", _digest(ip), self.ip_max_attempts))
+        return scopes
+
+    def _bucket_key(self, scope, ident, bucket):
+        return f"{self.key_prefix}:{scope}:{ident}:{bucket}"
+
+    def _lock_key(self, scope, ident):
+        return f"{self.key_prefix}:lock:{scope}:{ident}"
+
+    # ----- window -----
+    def _incr(self, key):
+        self.cache.add(key, 0, timeout=self.window * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr(); start the bucket again.
+            self.cache.set(key, 1, timeout=self.window * 2)
+            return 1
+
+    def _record(self, scope, ident, now):
+        bucket, offset = divmod(now, self.window)
+        current = self._incr(self._bucket_key(scope, ident, int(bucket)))
+        previous = self.cache.get(self._bucket_key(scope, ident, int(bucket) - 1), 0)
+        weight = 1 - (offset / self.window)
+        return int(current + previous * weight)
+
+    # ----- public API -----
+    def locked_until(self, email=None, ip=None):
+        """Return the latest lock expiry for the email/IP, or None. Cache only."""
+        keys = [self._lock_key(scope, ident) for scope, ident, _ in self._scopes(email, ip)]
+        expiries = [ts for ts in self.cache.get_many(keys).values() if ts and ts > time.time()]
+        if not expiries:
+            return None
+        return datetime.fromtimestamp(max(expiries), tz=dt_timezone.utc)
+
+    def is_locked(self, email=None, ip=None):
+        return self.locked_until(email, ip) is not None
+
+    def register_failure(self, email=None, ip=None):
+        """
+        Count one failed attempt. Returns the lock expiry when this failure
+        started a lock, otherwise None.
+        """
+        now = time.time()
+        started = None
+        for scope, ident, limit in self._scopes(email, ip):
+            attempts = self._record(scope, ident, now)
+            if attempts < limit:
+                continue
+            expiry = now + self.lock_duration
+            if self.cache.add(self._lock_key(scope, ident), expiry, timeout=self.lock_duration):
+                started = datetime.fromtimestamp(expiry, tz=dt_timezone.utc)
+                logger.warning("Login lock started for %s %s after %s failures", scope, ident, attempts)
+                if scope == "email":
+                    self._write_lock(email, attempts, started)
+        return started
+
+    def register_success(self, user):
+        """
+        Clear the email failure window. The DB lock columns are cleared by
+        ``Users.login_state.record_login`` together with last_login.
+        """
+        scopes = self._scopes(user.email, None)
+        now = int(time.time()) // self.window
+        keys = []
+        for scope, ident, _ in scopes:
+            keys += [self._bucket_key(scope, ident, now), self._bucket_key(scope, ident, now - 1)]
+        self.cache.delete_many(keys)
+
+    def _write_lock(self, email, attempts, until):
+        User = apps.get_model(settings.AUTH_USER_MODEL)
+        User.objects.filter(email=email.strip().lower()).update(
+            failed_login_attempts=attempts, locked_until=until
+        )
+
+
+_lockout = None
+
+
+def get_lockout():
+    global _lockout
+    if _lockout is None:
+        conf = {**DEFAULT_LOCKOUT_SETTINGS, **getattr(settings, "LOGIN_LOCKOUT", {})}
+        _lockout = LoginLockout(
+            conf["CACHE_ALIAS"], conf["MAX_ATTEMPTS"], conf["IP_MAX_ATTEMPTS"],
+            conf["WINDOW"], conf["LOCK_DURATION"],
+        )
+    return _lockout
@@ -0,0 +1,114 @@
+"""
+Login-state writer.
+
+A successful login used to cost up to three UPDATEs on the users row
+(reset failed attempts, last_login, simplejwt's UPDATE_LAST_LOGIN).
+``record_login`` folds them into one UPDATE and only touches the lockout
+columns when they are not already clear. With BUFFER_LAST_LOGIN enabled,
+logins that have nothing to clear only buffer ``last_login`` in-process;
+the buffer is written with one bulk UPDATE every FLUSH_INTERVAL seconds or
+FLUSH_SIZE users, and at interpreter exit.
+
+Configure through ``settings.LOGIN_STATE``:
+    BUFFER_LAST_LOGIN  buffer last_login timestamps instead of writing them
+    FLUSH_INTERVAL     seconds between buffer flushes
+    FLUSH_SIZE         buffered users that force a flush
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOGIN_STATE_SETTINGS = {
+    "BUFFER_LAST_LOGIN": False,
+    "FLUSH_INTERVAL": 30,
+    "FLUSH_SIZE": 500,
+}
+
+
+def login_state_setting(name):
+    return {**DEFAULT_LOGIN_STATE_SETTINGS, **getattr(settings, "LOGIN_STATE", {})}[name]
+
+
+class LastLoginBuffer:
+    """Per-process buffer of ``user_id -> last_login`` flushed in bulk."""
+
+    def __init__(self, flush_interval, flush_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, user_id, when):
+        with self._lock:
+            current = self._pending.get(user_id)
+            if current is None or when > current:
+                self._pending[user_id] = when
+            due = (
+                len(self._pending) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        try:
+            User.objects.bulk_update(
+                [User(pk=pk, last_login=when) for pk, when in batch.items()],
+                ["last_login"],
+                batch_size=500,
+            )
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} buffered last_login values: {e}")
+            return 0
+        return len(batch)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_last_login_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LastLoginBuffer(
+                    login_state_setting("FLUSH_INTERVAL"), login_state_setting("FLUSH_SIZE")
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record_login(user, when=None):
+    """
+    Apply every side effect of a successful login to ``user`` with at most
+    one UPDATE: last_login, plus clearing the lockout columns if set.
+    """
+    when = when or timezone.now()
+    user.last_login = when
+    fields = {"last_login": when}
+    if user.failed_login_attempts or user.locked_until is not None:
+        fields.update(failed_login_attempts=0, locked_until=None)
+        user.failed_login_attempts = 0
+        user.locked_until = None
+    elif login_state_setting("BUFFER_LAST_LOGIN"):
+        get_last_login_buffer().add(user.pk, when)
+        return
+    User.objects.filter(pk=user.pk).update(**fields)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Users', '0003_add_security_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text="Embedded in issued JWTs; bump to revoke the user's access tokens."),
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 
+from .phone import canonical_phone, phone_lookup_value
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, first_name=None, last_name=None, role='parent', **extra_fields):
@@ -38,6 +40,16 @@ class UserManager(BaseUserManager):
 
         return self.create_user(email, password, first_name, last_name, **extra_fields)
 
+    def find_by_phone(self, phone):
+        """The user with ``phone`` (any Ghana format), or None. One unique-index probe."""
+        phone = phone_lookup_value(phone)
+        if not phone:
+            return None
+        try:
+            return self.get(phone_number=phone)
+        except self.model.DoesNotExist:
+            return None
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     ROLE_CHOICES = (
@@ -64,6 +76,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     # Security fields
     failed_login_attempts = models.PositiveIntegerField(default=0)
     locked_until = models.DateTimeField(null=True, blank=True)
+    token_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Embedded in issued JWTs; bump to revoke the user's access tokens."
+    )
 
     # Permissions
     is_active = models.BooleanField(default=True)
@@ -73,9 +89,37 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    # Fields the Parent profile depends on (see Users/signals.py)
+    PROFILE_SYNC_FIELDS = ('role', 'phone_number')
+    # Fields embedded in the serialized Parent profile; changing one touches
+    # Parent.updated_at so delta syncs pick it up (see Users/signals.py)
+    PARENT_VIEW_FIELDS = ('email', 'first_name', 'last_name', 'is_active', 'is_superuser', 'role')
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.role})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._profile_sync_state = instance.profile_sync_state()
+        instance._parent_view_state = instance.parent_view_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.phone_number and (update_fields is None or 'phone_number' in update_fields):
+            # One stored form per number (see Users/phone.py)
+            self.phone_number = canonical_phone(self.phone_number)
+        super().save(*args, **kwargs)
+
+    def profile_sync_state(self):
+        """Current values of PROFILE_SYNC_FIELDS (deferred fields read as None)."""
+        return tuple(self.__dict__.get(field) for field in self.PROFILE_SYNC_FIELDS)
+
+    def parent_view_state(self):
+        """Current values of PARENT_VIEW_FIELDS (deferred fields read as None)."""
+        return tuple(self.__dict__.get(field) for field in self.PARENT_VIEW_FIELDS)
+
     @property
     def is_staff(self):
         """Grant admin access for Django admin."""
@@ -87,15 +131,26 @@ class User(AbstractBaseUser, PermissionsMixin):
             return True
         return False
 
+    def bump_token_version(self):
+        """Invalidate every access token issued so far (saved with the next save())."""
+        self.token_version += 1
+
     def reset_failed_attempts(self):
-        """Reset failed login attempts counter."""
+        """Reset failed login attempts counter. Skips the write when already clear."""
+        if not self.failed_login_attempts and self.locked_until is None:
+            return
         self.failed_login_attempts = 0
         self.locked_until = None
         self.save(update_fields=['failed_login_attempts', 'locked_until'])
 
-    def increment_failed_attempts(self):
-        """Increment failed login attempts and lock account if necessary."""
-        self.failed_login_attempts += 1
-        if self.failed_login_attempts >= 5:  # Lock after 5 failed attempts
-            self.locked_until = timezone.now() + timezone.timedelta(minutes=15)  # Lock for 15 minutes
-        self.save(update_fields=['failed_login_attempts', 'locked_until'])
+    def increment_failed_attempts(self, ip=None):
+        """
+        Record a failed login in the cache-backed lockout window.
+        The row is only updated when this failure starts a lock.
+        """
+        from .lockout import get_lockout
+
+        locked_until = get_lockout().register_failure(self.email, ip)
+        if locked_until:
+            self.locked_until = locked_until
+        return locked_until
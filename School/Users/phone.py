@@ -0,0 +1,110 @@
+"""
+Ghana phone numbers, shared by ``User`` and ``Parent``.
+
+Both models store numbers in E.164 (+233XXXXXXXXX), so every way a client
+may write a number (024XXXXXXX, 233 24 XXX XXXX, +233-24-...) is one value
+with one entry in the column's unique index. ``find_by_phone`` on either
+model normalises its argument the same way, so a lookup is a single index
+probe. ``renormalize_phones`` rewrites rows stored before normalisation;
+run it with ``manage.py normalize_phone_numbers``.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+DEFAULT_MOBILE_PREFIXES = ['024', '054', '055', '059', '020', '050', '026', '056', '027', '057', '028', '058']
+
+
+def format_phone(phone):
+    """E.164 form of a Ghana number in local or international format."""
+    if not phone:
+        return phone
+
+    digits = ''.join(filter(str.isdigit, phone))
+
+    # Local format: 0xxxxxxxxx → +233xxxxxxxxx
+    if digits.startswith('0') and len(digits) == 10:
+        return f"+233{digits[1:]}"
+
+    # 233xxxxxxxxx, with or without the plus
+    if digits.startswith('233') and len(digits) == 12:
+        return f"+{digits}"
+
+    raise ValidationError({'phone_number': 'Invalid Ghana phone number format.'})
+
+
+def normalize_phone(phone):
+    """
+    Return ``phone`` in E.164 form, raising ValidationError unless it is a
+    Ghana mobile number. Needs no database access.
+    """
+    phone = format_phone(phone)
+    valid_prefixes = getattr(settings, "GHANA_MOBILE_PREFIXES", DEFAULT_MOBILE_PREFIXES)
+    local_prefix = "0" + phone[4:6]  # e.g. +23324xxxxxxx → 024
+    if local_prefix not in valid_prefixes:
+        raise ValidationError({
+            'phone_number': 'Phone number must start with a valid Ghana mobile prefix.'
+        })
+    return phone
+
+
+def canonical_phone(phone):
+    """The stored form of ``phone``: E.164 if it is a Ghana number, else unchanged."""
+    try:
+        return format_phone(phone)
+    except ValidationError:
+        return phone
+
+
+def phone_lookup_value(phone):
+    """The stored form to look ``phone`` up by, or None if it cannot match a row."""
+    phone = (phone or "").strip()
+    return canonical_phone(phone) if phone else None
+
+
+def renormalize_phones(model, batch_size=1000, dry_run=False):
+    """
+    Rewrite ``model.phone_number`` into canonical form in primary-key
+    batches: one SELECT and one bulk UPDATE per batch, plus one SELECT for
+    batches with changes. A number whose canonical form another row already
+    holds is left alone and reported, since the column is unique.
+    Returns ``{"checked", "changed", "conflicts": [(pk, old, new)]}``.
+    """
+    has_updated_at = any(field.name == 'updated_at' for field in model._meta.fields)
+    stats = {"checked": 0, "changed": 0, "conflicts": []}
+    last_pk = 0
+    while True:
+        rows = list(
+            model.objects.filter(pk__gt=last_pk, phone_number__isnull=False)
+            .order_by('pk')
+            .values_list('pk', 'phone_number')[:batch_size]
+        )
+        if not rows:
+            return stats
+        last_pk = rows[-1][0]
+        stats["checked"] += len(rows)
+
+        old = dict(rows)
+        changes = {pk: canonical_phone(phone) for pk, phone in rows if phone}
+        changes = {pk: phone for pk, phone in changes.items() if phone != old[pk]}
+        if not changes:
+            continue
+        taken = set(
+            model.objects.filter(phone_number__in=set(changes.values()))
+            .exclude(pk__in=list(changes))
+            .values_list('phone_number', flat=True)
+        )
+        updates = []
+        now = timezone.now()
+        for pk, phone in changes.items():
+            if phone in taken:
+                stats["conflicts"].append((pk, old[pk], phone))
+                continue
+            taken.add(phone)
+            row = model(pk=pk, phone_number=phone)
+            if has_updated_at:
+                row.updated_at = now
+            updates.append(row)
+        stats["changed"] += len(updates)
+        if updates and not dry_run:
+            model.objects.bulk_update(updates, ['phone_number', 'updated_at'] if has_updated_at else ['phone_number'])
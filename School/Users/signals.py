@@ -1,31 +1,123 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from .models import User
+from .phone import canonical_phone
 from Parent.models import Parent
 
+logger = logging.getLogger(__name__)
 
-@receiver(post_save, sender=User)
-def create_parent_profile(sender, instance, created, **kwargs):
-    """Automatically create Parent profile for users with role='parent'."""
-    if instance.role == 'parent':
-        # Check if Parent profile already exists
-        if not hasattr(instance, 'parent_profile'):
-            # Create Parent profile if user has phone_number
-            if instance.phone_number:
-                Parent.objects.get_or_create(
-                    user=instance,
-                    defaults={
-                        'phone_number': instance.phone_number,
-                        'is_primary': True
-                    }
-                )
+_deferred = threading.local()
 
 
 @receiver(post_save, sender=User)
-def update_parent_profile(sender, instance, created, **kwargs):
-    """Update Parent profile phone number when User phone_number changes."""
-    if instance.role == 'parent' and hasattr(instance, 'parent_profile'):
+def sync_parent_profile(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Create the Parent profile for parent users with a phone number, and keep
+    its phone number in step with the user's.
+
+    Saves that cannot affect the profile return before any query: narrow
+    saves whose ``update_fields`` skip role/phone_number (login, lockout),
+    and full saves where neither field changed since the user was loaded.
+    """
+    if update_fields is not None and not set(update_fields) & set(User.PROFILE_SYNC_FIELDS):
+        return
+    state = instance.profile_sync_state()
+    if not created and state == getattr(instance, '_profile_sync_state', None):
+        return
+    instance._profile_sync_state = state
+
+    if instance.role != 'parent' or not instance.phone_number:
+        return
+
+    pending = getattr(_deferred, 'users', None)
+    if pending is not None:
+        pending[instance.pk] = instance
+        return
+
+    try:
         parent_profile = instance.parent_profile
-        if parent_profile.phone_number != instance.phone_number and instance.phone_number:
-            parent_profile.phone_number = instance.phone_number
-            parent_profile.save(update_fields=['phone_number', 'updated_at'])
\ No newline at end of file
+    except Parent.DoesNotExist:
+        Parent.objects.create(user=instance, phone_number=instance.phone_number, is_primary=True)
+        return
+
+    if parent_profile.phone_number != canonical_phone(instance.phone_number):
+        parent_profile.phone_number = instance.phone_number
+        parent_profile.save(update_fields=['phone_number', 'updated_at'])
+
+
+@receiver(post_save, sender=User)
+def touch_parent_profile(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Bump ``Parent.updated_at`` when a field the Parent serializer embeds
+    changes, so delta syncs (api/sync.py) resend the profile. Same early
+    returns as sync_parent_profile; new users have no profile yet.
+    """
+    if update_fields is not None and not set(update_fields) & set(User.PARENT_VIEW_FIELDS):
+        return
+    state = instance.parent_view_state()
+    if state == getattr(instance, '_parent_view_state', None):
+        return
+    instance._parent_view_state = state
+    if created:
+        return
+    Parent.objects.filter(user=instance).update(updated_at=timezone.now())
+
+
+def sync_parent_profiles(users):
+    """
+    Batched profile sync: one SELECT, one bulk INSERT and one bulk UPDATE.
+    Users whose phone number is not a valid Ghana mobile are skipped rather
+    than failing the batch; returns them as ``[(user, message)]``.
+    """
+    users = [u for u in users if u.role == 'parent' and u.phone_number]
+    if not users:
+        return []
+    existing = {p.user_id: p for p in Parent.objects.filter(user__in=users)}
+    to_create, to_update, skipped = [], [], []
+    now = timezone.now()
+    for user in users:
+        try:
+            phone = Parent.normalize_phone_number(user.phone_number)
+        except ValidationError as e:
+            skipped.append((user, e.message_dict['phone_number'][0]))
+            continue
+        profile = existing.get(user.pk)
+        if profile is None:
+            to_create.append(Parent(user=user, phone_number=phone, is_primary=True))
+        elif profile.phone_number != phone:
+            profile.phone_number = phone
+            profile.updated_at = now
+            to_update.append(profile)
+    with transaction.atomic():
+        Parent.objects.bulk_create(to_create)
+        Parent.objects.bulk_update(to_update, ['phone_number', 'updated_at'])
+    for user, message in skipped:
+        logger.warning(f"Parent profile not synced for user {user.pk} ({user.phone_number!r}): {message}")
+    return skipped
+
+
+@contextmanager
+def defer_profile_sync():
+    """
+    Collect profile syncs for users saved inside the block and apply them in
+    one batch on exit (bulk imports, admin actions). Yields a list that, on
+    exit, holds the ``(user, message)`` pairs skipped for invalid numbers.
+    """
+    skipped = []
+    if getattr(_deferred, 'users', None) is not None:
+        yield skipped  # already deferring; the outer block flushes and reports
+        return
+    _deferred.users = {}
+    try:
+        yield skipped
+        users = list(_deferred.users.values())
+    finally:
+        _deferred.users = None
+    skipped.extend(sync_parent_profiles(users))
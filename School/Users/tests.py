@@ -1,3 +1,158 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.testing import QueryBudgetMixin, SampleData
+from Parent.models import Parent
+from Users.lockout import LoginLockout
+from Users.login_state import LastLoginBuffer, record_login
+from Users.models import User
+from Users.signals import defer_profile_sync
+
+
+class DeferredProfileSyncTests(TestCase):
+    def make_user(self, email, phone):
+        return User.objects.create_user(email, "Test-Passw0rd!", "Ama", "Mensah", phone_number=phone)
+
+    def test_invalid_number_is_skipped_not_fatal(self):
+        with defer_profile_sync() as skipped:
+            good = self.make_user("good@example.com", "0241234567")
+            bad = self.make_user("bad@example.com", "0311234567")  # not a mobile prefix
+        self.assertEqual([user.pk for user, _ in skipped], [bad.pk])
+        self.assertTrue(Parent.objects.filter(user=good, phone_number="+233241234567").exists())
+        self.assertFalse(Parent.objects.filter(user=bad).exists())
+
+
+class ProfileSyncSignalTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "parent_phone_sync": 4,  # the user's UPDATE, then the profile's
+    }
+
+    def setUp(self):
+        self.data = SampleData()
+
+    def test_narrow_and_unchanged_saves_run_no_signal_queries(self):
+        user = User.objects.get(pk=self.data.make_parent().pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=["last_login"])
+            user.save()  # full save, nothing the profile depends on changed
+        self.assertEqual(len(queries), 2)  # the two UPDATEs
+
+    def test_phone_change_budget(self):
+        user = User.objects.select_related("parent_profile").get(pk=self.data.make_parent().pk)
+        user.phone_number = "0551234567"
+        self.assertQueryBudget("parent_phone_sync", user.save)
+        self.assertEqual(Parent.objects.get(user=user).phone_number, "+233551234567")
+
+
+class LoginLockoutTests(TestCase):
+    WINDOW = 60
+
+    def setUp(self):
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        # 3 failures per email, 5 per IP, in a 60s window; locks last 60s
+        self.lockout = LoginLockout("default", 3, 5, self.WINDOW, 60)
+        # The cache's expiry checks read the same clock
+        self.now = time.time()
+        patcher = mock.patch("time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            "ama@example.com", "Test-Passw0rd!", "Ama", "Mensah", phone_number="0241234567"
+        )
+
+    def fail(self, email="ama@example.com", ip="10.0.0.1", times=1):
+        return [self.lockout.register_failure(email, ip) for _ in range(times)][-1]
+
+    def test_email_locks_after_max_attempts_and_expires(self):
+        self.assertIsNone(self.fail(times=2))
+        self.assertIsNotNone(self.fail())
+        self.assertTrue(self.lockout.is_locked("ama@example.com"))
+        self.assertFalse(self.lockout.is_locked("kofi@example.com"))
+        self.now += 61
+        self.assertFalse(self.lockout.is_locked("ama@example.com"))
+
+    def test_ip_locks_across_emails(self):
+        for n in range(5):
+            self.fail(email=f"user{n}@example.com")
+        self.assertTrue(self.lockout.is_locked("kofi@example.com", "10.0.0.1"))
+        self.assertFalse(self.lockout.is_locked("kofi@example.com", "10.0.0.2"))
+
+    def test_failures_outside_the_window_do_not_count(self):
+        self.fail(times=2)
+        self.now += 2 * self.WINDOW
+        self.assertIsNone(self.fail())
+        self.assertFalse(self.lockout.is_locked("ama@example.com"))
+
+    def test_lock_columns_written_once_and_cleared_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.fail(times=4)  # the third starts the lock, the fourth is already locked
+        self.assertEqual(len(queries), 1)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.failed_login_attempts, 3)
+        self.assertIsNotNone(user.locked_until)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.lockout.is_locked("ama@example.com", "10.0.0.1"))
+            self.assertTrue(user.is_locked())
+
+        self.now += 61
+        with CaptureQueriesContext(connection) as queries:
+            record_login(user)
+            record_login(user)
+        self.assertEqual(["locked_until" in query["sql"] for query in queries], [True, False])
+        user.refresh_from_db()
+        self.assertEqual((user.failed_login_attempts, user.locked_until), (0, None))
+
+
+class LoginStateTests(TestCase):
+    def setUp(self):
+        self.data = SampleData()
+        self.user = User.objects.get(pk=self.data.make_parent().pk)
+
+    def test_clean_login_is_one_update_of_last_login(self):
+        with CaptureQueriesContext(connection) as queries:
+            record_login(self.user)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("failed_login_attempts", queries[0]["sql"])
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_lock_columns_cleared_in_the_same_update(self):
+        User.objects.filter(pk=self.user.pk).update(failed_login_attempts=3)
+        self.user.refresh_from_db()
+        with self.assertNumQueries(1):
+            record_login(self.user)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.failed_login_attempts, 0)
+
+    @override_settings(LOGIN_STATE={"BUFFER_LAST_LOGIN": True})
+    def test_buffered_logins_write_nothing_until_flushed(self):
+        buffer = LastLoginBuffer(flush_interval=3600, flush_size=100)
+        others = [User.objects.get(pk=self.data.make_parent().pk) for _ in range(2)]
+        with mock.patch("Users.login_state.get_last_login_buffer", return_value=buffer):
+            with self.assertNumQueries(0):
+                for user in [self.user, *others]:
+                    record_login(user)
+        self.assertEqual(len(buffer), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(len(buffer), 0)
+        self.assertFalse(User.objects.filter(last_login=None).exists())
+
+    def test_buffer_flushes_when_full(self):
+        buffer = LastLoginBuffer(flush_interval=3600, flush_size=2)
+        other = self.data.make_parent()
+        now = timezone.now()
+        buffer.add(self.user.pk, now)
+        with self.assertNumQueries(1):
+            buffer.add(other.pk, now)
+        self.assertEqual(len(buffer), 0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, now)
@@ -0,0 +1,41 @@
+"""
+Changelist helpers for large tables.
+
+Every admin changelist runs ``COUNT(*)`` over the whole (filtered) table for
+its paginator. ``EstimatedCountPaginator`` answers unfiltered counts from the
+PostgreSQL planner statistics once a table is past ESTIMATE_THRESHOLD rows;
+filtered and small result sets are still counted exactly. Pair it with
+``show_full_result_count = False`` to drop the second, unfiltered count.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_row_count(model, using="default"):
+    """Planner estimate of ``model``'s row count, or None if unavailable."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
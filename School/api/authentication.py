@@ -0,0 +1,90 @@
+"""
+JWT authentication that avoids a users-table SELECT on every request.
+
+Tokens minted by ``get_tokens_for_user`` carry signed ``role``, ``is_active``
+and ``tv`` (token version) claims. Inactive tokens are rejected from the
+claims alone, and the user object comes from a bounded per-process LRU/TTL
+cache that is invalidated by ``post_save``/``post_delete`` on ``Users.User``
+(see ``api/signals.py``). A version mismatch between token and cached user
+forces a reload, so bumping ``User.token_version`` revokes access tokens.
+
+Configure through ``settings.JWT_USER_CACHE``:
+    MAX_SIZE  users kept per process
+    TTL       seconds before a cached user is re-read (bounds cross-process staleness)
+"""
+import copy
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+DEFAULT_USER_CACHE_SETTINGS = {
+    "MAX_SIZE": 1024,
+    "TTL": 60,
+}
+
+
+def token_claims(user):
+    """Claims embedded in every token issued for ``user``."""
+    return {
+        "role": user.role,
+        "is_active": user.is_active,
+        "tv": user.token_version,
+    }
+
+
+class UserCache:
+    """Thread-safe LRU/TTL cache of User instances keyed by primary key."""
+
+    def __init__(self, max_size, ttl):
+        self._cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            return self._cache.get(str(user_id))
+
+    def set(self, user):
+        with self._lock:
+            self._cache[str(user.pk)] = user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._cache.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_conf = {**DEFAULT_USER_CACHE_SETTINGS, **getattr(settings, "JWT_USER_CACHE", {})}
+user_cache = UserCache(_conf["MAX_SIZE"], _conf["TTL"])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves users from claims and the process cache."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        if user_id is None:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if validated_token.get("is_active") is False:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        version = validated_token.get("tv")
+        user = user_cache.get(user_id)
+        if user is None or (version is not None and user.token_version != version):
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+
+        if version is not None and user.token_version != version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Views may mutate request.user; never hand out the shared instance.
+        return copy.copy(user)
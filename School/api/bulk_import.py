@@ -0,0 +1,383 @@
+"""
+Bulk import of students and their parents.
+
+Creating students through ``StudentViewSet.create`` costs an INSERT, a parent
+lookup and a link INSERT per student. ``StudentImporter`` reads rows lazily
+(CSV, JSON Lines or a JSON array) and imports them in chunks of CHUNK_SIZE
+with a fixed number of queries per chunk: one or two lookups for
+referenced parents, then ``bulk_create`` of new parent users, their Parent
+profiles, the students (numbered in one allocator call) and the M2M rows.
+Invalid rows are reported with their errors and skipped; the rest of the
+chunk is still imported, as is a JSON Lines line that is not valid JSON.
+Input that cannot be read past some point (a CSV error, or a JSON array
+that does not parse) stops the import there: rows read before it are still
+imported, and the report's ``stopped`` says at which row and why.
+
+Row format (JSON; CSV columns in brackets):
+    first_name, last_name, current_class, is_active
+    parent_users  existing parent *User* IDs [";"-separated]
+    parents       [{email, first_name, last_name, phone_number}, ...]
+                  [parent_email, parent_first_name, ..., parent2_email, ...]
+
+Parents are matched to existing accounts by email; new ones are created with
+an unusable password and set one through the password reset flow.
+
+Configure through ``settings.STUDENT_IMPORT``:
+    CHUNK_SIZE           rows validated and written per transaction
+    MAX_REPORTED_ERRORS  row errors kept in the report (the count is exact)
+"""
+import csv
+import json
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from Parent.models import Parent
+from Student import roster
+from Student.models import Student
+from Student.sequences import assign_student_ids
+from Users.models import User
+from .search import get_student_index
+from .utils import validate_email_format
+
+DEFAULT_IMPORT_SETTINGS = {
+    "CHUNK_SIZE": 500,
+    "MAX_REPORTED_ERRORS": 1000,
+}
+
+FORMATS = ("csv", "jsonl", "json")
+NAME_RE = re.compile(r"^[a-zA-Z\s\-'\.]+$")
+PARENT_FIELDS = ("email", "first_name", "last_name", "phone_number")
+PARENT_PREFIXES = ("parent", "parent2", "parent3", "parent4")
+MAX_PARENTS = 4
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "n", "f"}
+
+
+def import_setting(name):
+    return {**DEFAULT_IMPORT_SETTINGS, **getattr(settings, "STUDENT_IMPORT", {})}[name]
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class MalformedRow:
+    """Placeholder for an input row that could not be parsed; fails validation."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+# ============================
+# Reading
+# ============================
+def read_rows(stream, fmt):
+    """Yield row dicts from a text stream without loading CSV/JSONL input whole."""
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield _from_csv(row)
+    elif fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield MalformedRow(f"Invalid JSON: {e}")
+    elif fmt == "json":
+        data = json.load(stream)
+        yield from data.get("students", []) if isinstance(data, dict) else data
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _from_csv(row):
+    row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+    parents = []
+    for prefix in PARENT_PREFIXES:
+        spec = {field: row.pop(f"{prefix}_{field}", "") for field in PARENT_FIELDS}
+        if any(spec.values()):
+            parents.append(spec)
+    ids = row.pop("parent_users", "")
+    row["parent_users"] = [value for value in re.split(r"[;,\s]+", ids) if value]
+    row["parents"] = parents
+    return row
+
+
+def format_for(filename, default="csv"):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return extension if extension in FORMATS else default
+
+
+# ============================
+# Validation
+# ============================
+def _clean_name(value, label, max_length):
+    value = str(value or "").strip()
+    if not value:
+        raise DjangoValidationError(f"{label} is required.")
+    if len(value) > max_length:
+        raise DjangoValidationError(f"{label} cannot be longer than {max_length} characters.")
+    if NAME_RE.match(value) is None:
+        raise DjangoValidationError(
+            f"{label} can only contain letters, spaces, hyphens, apostrophes, and periods."
+        )
+    return value.title()
+
+
+def _clean_bool(value):
+    if isinstance(value, bool) or value is None:
+        return True if value is None else value
+    value = str(value).strip().lower()
+    if not value or value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise DjangoValidationError("Must be true or false.")
+
+
+def _clean_parent(spec):
+    email = str(spec.get("email") or "").strip().lower()
+    if not validate_email_format(email):
+        raise DjangoValidationError("Invalid email format.")
+    cleaned = {"email": email}
+    for field, label in (("first_name", "First name"), ("last_name", "Last name")):
+        cleaned[field] = _clean_name(spec.get(field), f"Parent {label.lower()}", 100)
+    phone = str(spec.get("phone_number") or "").strip()
+    if not phone:
+        raise DjangoValidationError("Phone number is required.")
+    try:
+        cleaned["phone_number"] = Parent.normalize_phone_number(phone)
+    except DjangoValidationError as e:
+        raise DjangoValidationError(e.message_dict["phone_number"])
+    return cleaned
+
+
+def clean_row(raw):
+    """Return ``(student_fields, parent_user_ids, parent_specs)`` or raise RowError."""
+    if isinstance(raw, MalformedRow):
+        raise RowError({"row": [raw.error]})
+    if not isinstance(raw, dict):
+        raise RowError({"row": ["Expected an object."]})
+    errors, fields = {}, {}
+    for field, label in (("first_name", "First name"), ("last_name", "Last name")):
+        try:
+            fields[field] = _clean_name(raw.get(field), label, 50)
+        except DjangoValidationError as e:
+            errors[field] = e.messages
+    current_class = str(raw.get("current_class") or "").strip()
+    if not current_class:
+        errors["current_class"] = ["Current class is required."]
+    elif len(current_class) > 50:
+        errors["current_class"] = ["Current class cannot be longer than 50 characters."]
+    fields["current_class"] = current_class
+    try:
+        fields["is_active"] = _clean_bool(raw.get("is_active"))
+    except DjangoValidationError as e:
+        errors["is_active"] = e.messages
+
+    user_ids = []
+    for value in raw.get("parent_users") or []:
+        try:
+            user_ids.append(int(value))
+        except (TypeError, ValueError):
+            errors.setdefault("parent_users", []).append(f"Invalid parent user ID: {value}.")
+    specs = []
+    for index, spec in enumerate(raw.get("parents") or []):
+        try:
+            specs.append(_clean_parent(spec if isinstance(spec, dict) else {}))
+        except DjangoValidationError as e:
+            errors[f"parents[{index}]"] = e.messages
+
+    total = len(set(user_ids)) + len({spec["email"] for spec in specs})
+    if not errors and not total:
+        errors["parents"] = ["At least one parent must be assigned."]
+    elif total > MAX_PARENTS:
+        errors["parents"] = [f"A student cannot have more than {MAX_PARENTS} parents/guardians."]
+    if errors:
+        raise RowError(errors)
+    return fields, user_ids, specs
+
+
+# ============================
+# Import
+# ============================
+class ImportReport:
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.created_students = 0
+        self.created_parents = 0
+        self.failed = 0
+        self.errors = []
+        self.stopped = None  # {"row", "error"} when unreadable input ended the import
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created_students": self.created_students,
+            "created_parents": self.created_parents,
+            "failed": self.failed,
+            "errors": self.errors,
+            "stopped": self.stopped,
+        }
+
+
+class StudentImporter:
+    """Import rows in chunks; ``run`` returns an ImportReport."""
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or import_setting("CHUNK_SIZE")
+        self.report = ImportReport(import_setting("MAX_REPORTED_ERRORS"))
+
+    def run(self, rows):
+        chunk = []
+        try:
+            for row in rows:
+                self.report.rows += 1
+                chunk.append((self.report.rows, row))
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+        except (ValueError, csv.Error) as e:
+            # Unreadable input: import what was read, report where it stopped
+            self.report.stopped = {"row": self.report.rows + 1, "error": str(e)}
+        if chunk:
+            self.import_chunk(chunk)
+        return self.report
+
+    def import_chunk(self, chunk):
+        cleaned = []
+        for line, raw in chunk:
+            try:
+                cleaned.append((line, *clean_row(raw)))
+            except RowError as e:
+                self.report.add_error(line, e.errors)
+        if not cleaned:
+            return
+
+        known = self._lookup_parents(cleaned)
+        new_parents = {}  # email -> unsaved Parent (with unsaved user)
+        ready = []
+        for line, fields, user_ids, specs in cleaned:
+            try:
+                parents = self._resolve(user_ids, specs, known, new_parents)
+            except RowError as e:
+                self.report.add_error(line, e.errors)
+                continue
+            ready.append((line, Student(**fields), parents))
+
+        if not ready:
+            return
+        assign_student_ids([student for _, student, _ in ready])
+        try:
+            self._write(ready, new_parents)
+        except IntegrityError:
+            # A concurrent write took an email, phone or number; skip the chunk
+            for line, _, _ in ready:
+                self.report.add_error(
+                    line, {"row": ["Conflicted with a concurrent change; please retry this row."]}
+                )
+            return
+        get_student_index().invalidate()  # bulk_create sends no post_save
+        self.report.created_students += len(ready)
+        self.report.created_parents += len(new_parents)
+
+    def _lookup_parents(self, cleaned):
+        """Existing parents and taken emails/phones referenced by the chunk (1-2 queries)."""
+        user_ids = {uid for _, _, ids, _ in cleaned for uid in ids}
+        emails = {spec["email"] for *_, specs in cleaned for spec in specs}
+        phones = {spec["phone_number"] for *_, specs in cleaned for spec in specs}
+        known = {"by_user_id": {}, "by_email": {}, "by_phone": {}, "taken": set()}
+        if not (user_ids or emails):
+            return known
+
+        for parent in Parent.objects.select_related("user").filter(
+            Q(user_id__in=user_ids) | Q(user__email__in=emails) | Q(phone_number__in=phones)
+        ):
+            known["by_user_id"][parent.user_id] = parent
+            known["by_email"][parent.user.email] = parent
+            known["by_phone"][parent.phone_number] = parent
+
+        # Emails/phones held by accounts without a parent profile
+        emails -= set(known["by_email"])
+        phones -= set(known["by_phone"])
+        if emails or phones:
+            for email, phone in User.objects.filter(
+                Q(email__in=emails) | Q(phone_number__in=phones)
+            ).values_list("email", "phone_number"):
+                known["taken"].update({email, phone})
+        return known
+
+    def _resolve(self, user_ids, specs, known, new_parents):
+        parents, pending, errors = [], {}, {}
+        for uid in user_ids:
+            parent = known["by_user_id"].get(uid)
+            if parent is None:
+                errors.setdefault("parent_users", []).append(f"Invalid parent user ID: {uid}.")
+            elif parent not in parents:
+                parents.append(parent)
+
+        for index, spec in enumerate(specs):
+            email, phone = spec["email"], spec["phone_number"]
+            parent = known["by_email"].get(email) or new_parents.get(email) or pending.get(email)
+            if parent is None:
+                if email in known["taken"]:
+                    errors[f"parents[{index}]"] = ["This email belongs to a non-parent account."]
+                    continue
+                if phone in known["taken"] or phone in known["by_phone"] or any(
+                    p.phone_number == phone for p in (*new_parents.values(), *pending.values())
+                ):
+                    errors[f"parents[{index}]"] = ["This phone number belongs to another account."]
+                    continue
+                user = User(
+                    email=email,
+                    first_name=spec["first_name"],
+                    last_name=spec["last_name"],
+                    phone_number=phone,
+                    role="parent",
+                )
+                user.set_unusable_password()
+                parent = pending[email] = Parent(user=user, phone_number=phone, is_primary=True)
+            if parent not in parents:
+                parents.append(parent)
+
+        if errors:
+            raise RowError(errors)
+        new_parents.update(pending)
+        return parents
+
+    def _write(self, ready, new_parents):
+        through = Student.parents.through
+        with transaction.atomic():
+            if new_parents:
+                users = User.objects.bulk_create([p.user for p in new_parents.values()])
+                for parent, user in zip(new_parents.values(), users):
+                    parent.user = user
+                Parent.objects.bulk_create(new_parents.values())
+            Student.objects.bulk_create([student for _, student, _ in ready])
+            through.objects.bulk_create([
+                through(student_id=student.pk, parent_id=parent.pk)
+                for _, student, parents in ready
+                for parent in parents
+            ])
+            # bulk_create sends no signals; one roster UPDATE per class instead
+            deltas = roster.new_deltas()
+            for _, student, parents in ready:
+                roster.add_student(deltas, student.roster_state(), links=len(parents))
+            roster.apply_roster_deltas(deltas)
+
+
+def import_students(stream, fmt, chunk_size=None):
+    """Import students from a text stream; returns the report as a dict."""
+    return StudentImporter(chunk_size).run(read_rows(stream, fmt)).as_dict()
@@ -0,0 +1,93 @@
+"""
+Conditional GET for list and detail endpoints.
+
+``ConditionalGetMixin`` computes validators for ``list`` and ``retrieve``
+with one aggregate query over the view's (filtered) queryset: the maximum of
+each of ``validator_fields`` plus the row count. They are hashed, with the
+URL and the caller, into a weak ETag. Requests whose ``If-None-Match`` (or,
+for detail views, ``If-Modified-Since``) still matches get a 304 before the
+page is fetched or anything is serialised.
+
+Lists send no ``Last-Modified``: a deleted row lowers the count without
+moving the newest timestamp, so a date alone cannot tell a list is stale.
+Anything a response shows must move one of the validators; Student link
+changes touch ``Student.updated_at`` for that reason (Student/signals.py).
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    # Columns (may span relations) whose maximum, with the row count,
+    # changes whenever the response would, or aggregate expressions. The
+    # first must be a timestamp.
+    validator_fields = ('updated_at',)
+    # Relations whose distinct row counts also belong in the validator
+    validator_counts = ()
+    # Send Last-Modified (and honour If-Modified-Since) on detail responses;
+    # only safe when every change to the object moves validator_fields[0]
+    detail_last_modified = True
+
+    def get_validators(self, queryset):
+        """``(etag, last_modified)`` for ``queryset``, or ``(None, None)`` if it is empty."""
+        aggregates = {
+            f'v{i}': Max(field) if isinstance(field, str) else field
+            for i, field in enumerate(self.validator_fields)
+        }
+        aggregates.update({f'c{i}': Count(field, distinct=True) for i, field in enumerate(self.validator_counts)})
+        values = queryset.order_by().aggregate(rows=Count('pk', distinct=True), **aggregates)
+        if not values['rows']:
+            return None, None
+        request = self.request
+        parts = [
+            type(self).__name__,
+            self.action,
+            str(request.user.pk),
+            request.get_full_path(),
+            getattr(request.accepted_renderer, 'format', ''),
+            str(values['rows']),
+        ]
+        parts += [str(value) for key, value in sorted(values.items()) if key != 'rows']
+        digest = hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+        last_modified = values['v0']
+        # HTTP dates have whole seconds
+        return f'W/"{digest}"', int(last_modified.timestamp()) if last_modified else None
+
+    def _conditional(self, queryset, use_last_modified, respond):
+        etag, last_modified = self.get_validators(queryset)
+        if not use_last_modified:
+            last_modified = None
+        response = None
+        if etag is not None:
+            response = get_conditional_response(self.request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = respond()
+        if etag is not None and response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep a copy but must revalidate it; it is per-user
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        respond = super().list
+        return self._conditional(queryset, False, lambda: respond(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        respond = super().retrieve
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Malformed lookup; let get_object() answer 404
+            return respond(request, *args, **kwargs)
+        return self._conditional(queryset, self.detail_last_modified, lambda: respond(request, *args, **kwargs))
@@ -0,0 +1,247 @@
+"""
+Google ID-token verification with cached signing certificates.
+
+``id_token.verify_oauth2_token`` builds a new transport and downloads Google's
+certificates on every call. ``GoogleIdTokenVerifier`` keeps the certificates
+in-process for as long as Google's ``Cache-Control: max-age`` allows, refreshes
+them in a background thread shortly before they expire, and verifies token
+signatures locally. An unknown key id (Google rotated keys early) triggers
+one synchronous refresh, at most once per ``unknown_key_interval`` seconds,
+so tokens with made-up key ids cannot force a fetch on every request.
+
+Certificates come from a pluggable key source configured through
+``settings.GOOGLE_ID_TOKEN``:
+    KEY_SOURCE  dotted path of a key source class
+    OPTIONS     keyword arguments for the key source
+    AUDIENCE    expected ``aud`` (defaults to settings.GOOGLE_CLIENT_ID)
+
+``LocalIssuer`` signs tokens with a throwaway key and doubles as a key source,
+so tests and benchmarks can run with no network access.
+"""
+import datetime
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from google.auth import crypt, jwt
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+
+# ============================
+# Key sources
+# ============================
+class GoogleCertsSource:
+    """Google's published x509 certificates, fetched over one pooled session."""
+
+    default_max_age = 3600
+
+    def __init__(self, url=GOOGLE_CERTS_URL, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self):
+        """Return ``(certs, max_age_seconds)``."""
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        return response.json(), max_age
+
+
+class StaticKeySource:
+    """Fixed ``{key_id: pem_certificate}`` mapping."""
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = dict(certs)
+        self.max_age = max_age
+
+    def fetch(self):
+        return self.certs, self.max_age
+
+
+class LocalIssuer(StaticKeySource):
+    """Fake Google issuer: signs ID tokens with a generated RSA key."""
+
+    def __init__(self, key_id="local-test-key", issuer=GOOGLE_ISSUERS[1], max_age=3600):
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.x509.oid import NameOID
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "local-issuer")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        self.key_id = key_id
+        self.issuer = issuer
+        self.signer = crypt.RSASigner.from_string(private_pem, key_id=key_id)
+        super().__init__(
+            {key_id: cert.public_bytes(serialization.Encoding.PEM).decode()}, max_age
+        )
+
+    def issue(self, audience, email, lifetime=3600, **claims):
+        """Return a signed ID token for ``email``."""
+        now = int(time.time())
+        payload = {
+            "iss": self.issuer,
+            "aud": audience,
+            "sub": claims.pop("sub", email),
+            "email": email,
+            "email_verified": True,
+            "iat": now,
+            "exp": now + lifetime,
+            **claims,
+        }
+        return jwt.encode(self.signer, payload).decode()
+
+
+# ============================
+# Certificate cache
+# ============================
+class CachedCerts:
+    """
+    Certificates from ``source`` cached until their advertised expiry.
+    Within ``refresh_margin`` seconds of expiry a background thread refreshes
+    them while callers keep using the current set; if a refresh fails the old
+    certificates are served for up to ``stale_grace`` more seconds.
+    """
+
+    def __init__(self, source, refresh_margin=300, stale_grace=3600, unknown_key_interval=60):
+        self.source = source
+        self.refresh_margin = refresh_margin
+        self.stale_grace = stale_grace
+        self.unknown_key_interval = unknown_key_interval
+        self._certs = None
+        self._expires_at = 0.0
+        self._unknown_key_refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        now = time.time()
+        if self._certs is None or now >= self._expires_at + self.stale_grace:
+            return self.refresh()
+        if now >= self._expires_at:
+            try:
+                return self.refresh()
+            except Exception as e:
+                logger.warning(f"Google cert refresh failed, serving stale certs: {e}")
+                return self._certs
+        if now >= self._expires_at - self.refresh_margin:
+            self._refresh_in_background()
+        return self._certs
+
+    def refresh(self):
+        with self._lock:
+            certs, max_age = self.source.fetch()
+            self._certs = certs
+            self._expires_at = time.time() + max_age
+            return certs
+
+    def refresh_for_unknown_key(self):
+        """
+        Refresh because a token named a key id we do not have, unless that
+        already happened in the last ``unknown_key_interval`` seconds.
+        Returns the certificates to verify against.
+        """
+        with self._lock:
+            now = time.time()
+            if now - self._unknown_key_refreshed_at < self.unknown_key_interval:
+                return self._certs
+            self._unknown_key_refreshed_at = now
+        try:
+            return self.refresh()
+        except Exception as e:
+            logger.warning(f"Google cert refresh for unknown key id failed: {e}")
+            return self._certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Background Google cert refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="google-certs-refresh", daemon=True).start()
+
+
+# ============================
+# Verifier
+# ============================
+class GoogleIdTokenVerifier:
+    def __init__(self, key_source, audience, clock_skew=10):
+        self.certs = CachedCerts(key_source)
+        self.audience = audience
+        self.clock_skew = clock_skew
+
+    def verify(self, token):
+        """
+        Return the verified claims of a Google ID token.
+        Raises ValueError for any invalid token, like verify_oauth2_token.
+        """
+        key_id = jwt.decode_header(token).get("kid")
+        certs = self.certs.get()
+        if key_id and key_id not in certs:
+            certs = self.certs.refresh_for_unknown_key()
+        idinfo = jwt.decode(
+            token, certs=certs, audience=self.audience, clock_skew_in_seconds=self.clock_skew
+        )
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        return idinfo
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_google_verifier():
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                conf = getattr(settings, "GOOGLE_ID_TOKEN", {})
+                source_cls = import_string(conf.get("KEY_SOURCE", "api.google_auth.GoogleCertsSource"))
+                _verifier = GoogleIdTokenVerifier(
+                    source_cls(**conf.get("OPTIONS", {})),
+                    conf.get("AUDIENCE") or settings.GOOGLE_CLIENT_ID,
+                )
+    return _verifier
+
+
+def set_google_key_source(source, audience=None):
+    """Swap the key source (e.g. a LocalIssuer) for tests and benchmarks."""
+    global _verifier
+    with _verifier_lock:
+        _verifier = GoogleIdTokenVerifier(source, audience or settings.GOOGLE_CLIENT_ID)
+    return _verifier
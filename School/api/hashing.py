@@ -0,0 +1,223 @@
+"""
+Bounded worker pool for password hashing.
+
+PBKDF2 is deliberately slow, so running it on the request thread lets a login
+rush starve every other endpoint. Hashing and verification are submitted to a
+small process pool instead; when the pool and its queue are full, callers get
+``HashingPoolBusy`` (HTTP 503) straight away rather than queueing behind it.
+Results that take longer than TIMEOUT also give a 503, and so does a job
+whose worker died (OOM kill, segfault): the broken pool is dropped and the
+next call starts a fresh one.
+
+Configure through ``settings.PASSWORD_HASHING_POOL``:
+    WORKERS     number of worker processes (0 hashes inline on the caller)
+    QUEUE_SIZE  jobs allowed to wait once all workers are busy
+    TIMEOUT     seconds to wait for a result before giving up
+"""
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    "WORKERS": 2,
+    "QUEUE_SIZE": 16,
+    "TIMEOUT": 5.0,
+}
+
+
+class HashingPoolBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Authentication service is busy. Please try again shortly."
+    default_code = "hashing_pool_busy"
+
+
+# ============================
+# Worker-side functions
+# ============================
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _make_password(raw_password):
+    return hashers.make_password(raw_password)
+
+
+def _verify_password(raw_password, encoded):
+    return hashers.verify_password(raw_password, encoded)
+
+
+# ============================
+# Executor
+# ============================
+class HashingExecutor:
+    """Process pool with a bounded number of in-flight jobs and basic metrics."""
+
+    def __init__(self, workers, queue_size, timeout):
+        self.workers = max(int(workers), 0)
+        self.queue_size = max(int(queue_size), 0)
+        self.timeout = float(timeout)
+        self._capacity = max(self.workers, 1) + self.queue_size
+        self._slots = threading.BoundedSemaphore(self._capacity)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._in_flight = 0
+        self._peak = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._restarts = 0
+
+    def _get_pool(self):
+        # Pools do not survive a fork, so each gunicorn worker builds its own.
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            self._pid = os.getpid()
+        return self._pool
+
+    def _drop_pool(self, pool):
+        # Every pending job of a broken pool fails, so several callers may
+        # get here for the same pool; only the first replaces it.
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self._restarts += 1
+        logger.error("Password hashing pool broken; starting a new one on next use")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            logger.warning("Password hashing pool saturated (%s jobs in flight)", self._capacity)
+            raise HashingPoolBusy()
+        with self._lock:
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+
+    def _release(self, *args):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool, raising HashingPoolBusy when saturated."""
+        self._acquire()
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        pool = self._get_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenExecutor:
+            self._release()
+            self._drop_pool(pool)
+            raise HashingPoolBusy()
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise HashingPoolBusy()
+        except BrokenExecutor:
+            self._drop_pool(pool)
+            raise HashingPoolBusy()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self._capacity,
+                "queue_depth": max(self._in_flight - max(self.workers, 1), 0),
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "restarts": self._restarts,
+            }
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_dummy_hash = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                conf = {**DEFAULT_POOL_SETTINGS, **getattr(settings, "PASSWORD_HASHING_POOL", {})}
+                _executor = HashingExecutor(conf["WORKERS"], conf["QUEUE_SIZE"], conf["TIMEOUT"])
+    return _executor
+
+
+# ============================
+# Public helpers
+# ============================
+def hash_password(raw_password):
+    """Return the encoded hash for ``raw_password`` using the default hasher."""
+    return get_executor().run(_make_password, raw_password)
+
+
+def set_user_password(user, raw_password):
+    """Pool-backed equivalent of ``user.set_password``."""
+    user.password = hash_password(raw_password)
+    user._password = raw_password
+
+
+def check_user_password(user, raw_password):
+    """
+    Pool-backed equivalent of ``user.check_password``.
+    Re-hashes and saves the password when the stored hash is outdated.
+    """
+    is_correct, must_update = get_executor().run(_verify_password, raw_password, user.password)
+    if is_correct and must_update:
+        set_user_password(user, raw_password)
+        user._password = None
+        user.save(update_fields=["password"])
+    return is_correct
+
+
+def get_dummy_hash():
+    """Encoded hash of a random secret, computed once per process."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_urlsafe(32))
+    return _dummy_hash
+
+
+def dummy_check_password(raw_password):
+    """Spend the same work as a real check so unknown emails cannot be timed."""
+    get_executor().run(_verify_password, raw_password, get_dummy_hash())
+    return False
@@ -0,0 +1,34 @@
+from api.management.periodic import PeriodicCommand
+from Student.archive import archive_candidates, archive_students, restore_students
+
+
+class Command(PeriodicCommand):
+    help = (
+        "Move students inactive for STUDENT_ARCHIVE['INACTIVE_DAYS'] days, with "
+        "their parent links, to the archive table. --restore moves students back."
+    )
+    every_help = "Keep running and archive every N seconds (for a scheduled worker)."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--days", type=int, default=None, help="Archive students inactive this many days.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Students moved per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many would be archived.")
+        parser.add_argument(
+            "--restore", type=int, nargs="+", metavar="ID",
+            help="Restore these archived students (by primary key) instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options["restore"]:
+            restored = restore_students(options["restore"])
+            self.stdout.write(f"Restored {restored} student(s).")
+            return
+        if options["dry_run"]:
+            self.stdout.write(f"{archive_candidates(options['days']).count()} student(s) would be archived.")
+            return
+        super().handle(*args, **options)
+
+    def run_once(self, options):
+        moved = archive_students(days=options["days"], batch_size=options["batch_size"])
+        self.stdout.write(f"Archived {moved} student(s).")
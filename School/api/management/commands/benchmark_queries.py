@@ -0,0 +1,263 @@
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.utils import timezone
+
+from api.google_auth import LocalIssuer, set_google_key_source
+from api.serializers import ParentSerializer
+from api.sync import make_token
+from api.testing import SampleData
+from api.utils import QueryCounter
+from api.views import get_tokens_for_user
+from Parent.models import Parent
+from Student.models import Student
+from Student.sequences import get_allocator
+from Users.models import User
+
+PASSWORD = "Bench-Passw0rd!"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Report per-request query counts (and with --sql, the statements) for "
+        "hot API paths at a chosen list size. Each scenario runs inside a "
+        "transaction that is rolled back, so no data is kept. The query budgets "
+        "are enforced by the test suite (QueryBudgetMixin in api/testing.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="*", help="Scenarios to run (default: all).")
+        parser.add_argument("--sql", action="store_true", help="Print the statements of the last run.")
+        parser.add_argument("--size", type=int, default=20, help="Items per list scenario (default: 20).")
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        names = options["scenarios"] or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        for name in names:
+            counter = self.run(scenarios[name], options["size"])
+            self.stdout.write(f"{name:<28} {counter.count:>4} queries")
+            if options["sql"]:
+                for sql in counter.statements:
+                    self.stdout.write(f"    {sql[:110]}")
+
+    def run(self, scenario, size):
+        # A random start keeps sample emails and phones clear of earlier runs
+        self.data = SampleData(prefix="bench-", start=uuid.uuid4().int % 10**7)
+        try:
+            with transaction.atomic():
+                counter = scenario(size)
+                raise Rollback
+        except Rollback:
+            pass
+        return counter
+
+    # ============================
+    # Helpers
+    # ============================
+    def scenarios(self):
+        return {
+            "login": self.bench_login,
+            "google_login": self.bench_google_login,
+            "register": self.bench_register,
+            "students_list": self.bench_students_list,
+            "students_cursor": self.bench_students_cursor,
+            "student_detail": self.bench_student_detail,
+            "parents_list": self.bench_parents_list,
+            "student_create": self.bench_student_create,
+            "student_update": self.bench_student_update,
+            "students_not_modified": self.bench_students_not_modified,
+            "student_detail_not_modified": self.bench_student_detail_not_modified,
+            "parents_not_modified": self.bench_parents_not_modified,
+            "sync_full": self.bench_sync_full,
+            "sync_quiet": self.bench_sync_quiet,
+            "parents_batch": self.bench_parents_batch,
+            "parent_create": self.bench_parent_create,
+            "parent_save": self.bench_parent_save,
+            "parent_verify": self.bench_parent_verify,
+            "parent_phone_sync": self.bench_parent_phone_sync,
+            "parent_find_by_phone": self.bench_parent_find_by_phone,
+        }
+
+    def client(self):
+        # A fresh client address per request keeps the throttles out of the way
+        return Client(SERVER_NAME="localhost", REMOTE_ADDR=f"10.{uuid.uuid4().int % 250}.0.1")
+
+    def authed_client(self, user):
+        token = get_tokens_for_user(user)["access"]
+        return Client(SERVER_NAME="localhost", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def revalidate(self, client, url):
+        """Measure a GET of ``url`` that sends back the ETag of a first, unmeasured one."""
+        etag = client.get(url)["ETag"]
+        return self.measure(lambda: client.get(url, HTTP_IF_NONE_MATCH=etag))
+
+    def measure(self, fn):
+        with RecordingCounter() as counter:
+            fn()
+        return counter
+
+    # ============================
+    # Scenarios
+    # ============================
+    def bench_login(self, size):
+        user = self.data.make_parent(PASSWORD)
+        client = self.client()
+        return self.measure(lambda: client.post(
+            "/api/v1/login/", {"email": user.email, "password": PASSWORD},
+            content_type="application/json",
+        ))
+
+    def bench_google_login(self, size):
+        # Signed and verified offline; the first login creates the user
+        issuer = LocalIssuer()
+        set_google_key_source(issuer, audience="bench-client")
+        token = issuer.issue("bench-client", f"bench-{uuid.uuid4().int}@example.com")
+        client = self.client()
+        return self.measure(lambda: client.post(
+            "/api/v1/login/", {"token": token}, content_type="application/json",
+        ))
+
+    def bench_register(self, size):
+        suffix = uuid.uuid4().int
+        client = self.client()
+        return self.measure(lambda: client.post(
+            "/api/v1/register/",
+            {
+                "email": f"bench-{suffix}@example.com",
+                "password": PASSWORD,
+                "confirm_password": PASSWORD,
+                "first_name": "Bench",
+                "last_name": "User",
+                "phone_number": f"024{suffix % 10**7:07d}",
+            },
+            content_type="application/json",
+        ))
+
+    def bench_students_list(self, size):
+        user = self.data.make_parent()
+        self.data.make_students(user, size)
+        client = self.authed_client(user)
+        return self.measure(lambda: client.get("/api/v1/students/"))
+
+    def bench_students_cursor(self, size):
+        user = self.data.make_parent()
+        self.data.make_students(user, size)
+        client = self.authed_client(user)
+        return self.measure(lambda: client.get("/api/v1/students/?pagination=cursor"))
+
+    def bench_student_detail(self, size):
+        user = self.data.make_parent()
+        student = self.data.make_students(user, 1)[0]
+        client = self.authed_client(user)
+        return self.measure(lambda: client.get(f"/api/v1/students/{student.pk}/"))
+
+    def bench_parents_list(self, size):
+        user = self.data.make_parent()
+        self.data.make_students(user, size)
+        client = self.authed_client(user)
+        return self.measure(lambda: client.get("/api/v1/parents/"))
+
+    def bench_student_create(self, size):
+        # Creating the counter is a one-off per database, not per request
+        get_allocator().ensure_counter()
+        user = self.data.make_parent()
+        guardians = [user.pk] + self.data.make_guardians(size)
+        client = self.authed_client(user)
+        return self.measure(lambda: client.post(
+            "/api/v1/students/",
+            {"first_name": "Bench", "last_name": "Student", "current_class": "P1", "parent_users": guardians},
+            content_type="application/json",
+        ))
+
+    def bench_student_update(self, size):
+        user = self.data.make_parent()
+        student = self.data.make_students(user, 1, co_parent=False)[0]
+        guardians = [user.pk] + self.data.make_guardians(size)
+        client = self.authed_client(user)
+        return self.measure(lambda: client.patch(
+            f"/api/v1/students/{student.pk}/", {"parent_users": guardians}, content_type="application/json",
+        ))
+
+    def bench_students_not_modified(self, size):
+        user = self.data.make_parent()
+        self.data.make_students(user, size)
+        return self.revalidate(self.authed_client(user), "/api/v1/students/")
+
+    def bench_student_detail_not_modified(self, size):
+        user = self.data.make_parent()
+        student = self.data.make_students(user, 1)[0]
+        return self.revalidate(self.authed_client(user), f"/api/v1/students/{student.pk}/")
+
+    def bench_parents_not_modified(self, size):
+        user = self.data.make_parent()
+        self.data.make_students(user, size)
+        return self.revalidate(self.authed_client(user), "/api/v1/parents/")
+
+    def bench_sync_full(self, size):
+        user = self.data.make_parent()
+        self.data.make_students(user, size)
+        client = self.authed_client(user)
+        return self.measure(lambda: client.get("/api/v1/sync/"))
+
+    def bench_sync_quiet(self, size):
+        user = self.data.make_parent()
+        students = self.data.make_students(user, size)
+        client = self.authed_client(user)
+        # Written an hour ago, so nothing changed since a token from now
+        earlier = timezone.now() - timedelta(hours=1)
+        Student.objects.filter(pk__in=[student.pk for student in students]).update(updated_at=earlier)
+        Parent.objects.filter(students__in=students).update(updated_at=earlier)
+        token = make_token(timezone.now())
+        return self.measure(lambda: client.get(f"/api/v1/sync/?since={token}"))
+
+    def bench_parents_batch(self, size):
+        users = [self.data.make_parent() for _ in range(size)]
+        for user in users:
+            self.data.make_students(user, 2, co_parent=False)
+        parents = Parent.objects.filter(user__in=users).with_stats()
+        return self.measure(lambda: ParentSerializer(parents, many=True).data)
+
+    def bench_parent_create(self, size):
+        user = self.data.make_parent(phone_number=None)
+        return self.measure(lambda: Parent.objects.create(user=user, phone_number="0241234567"))
+
+    def bench_parent_save(self, size):
+        parent = Parent.objects.get(user=self.data.make_parent())
+        parent.is_primary = False
+        return self.measure(parent.save)
+
+    def bench_parent_verify(self, size):
+        parent = Parent.objects.get(user=self.data.make_parent())
+        return self.measure(parent.verify_phone)
+
+    def bench_parent_phone_sync(self, size):
+        user = User.objects.select_related("parent_profile").get(pk=self.data.make_parent().pk)
+        user.phone_number = "0551234567"
+        return self.measure(user.save)
+
+    def bench_parent_find_by_phone(self, size):
+        phone = self.data.make_parent().phone_number  # stored as +233...
+        return self.measure(lambda: Parent.objects.find_by_phone("0" + phone[4:]))
+
+
+class RecordingCounter(QueryCounter):
+    """QueryCounter that also keeps the SQL it saw."""
+
+    def __init__(self, using="default"):
+        super().__init__(using)
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        return super().__call__(execute, sql, params, many, context)
@@ -0,0 +1,29 @@
+from django.core.management.base import CommandError
+
+from api.management.periodic import PeriodicCommand
+from Student.roster import check_roster, rebuild_roster
+
+
+class Command(PeriodicCommand):
+    help = (
+        "Compare the ClassRoster summary with the Student table and report "
+        "mismatched classes. With --fix, rebuild the summary from scratch."
+    )
+    every_help = "Keep running and check every N seconds (implies --fix)."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--fix", action="store_true", help="Rebuild the summary when it has drifted.")
+
+    def run_once(self, options):
+        fix = options["fix"] or bool(options["every"])
+        mismatches = check_roster()
+        for name, stored, actual in mismatches:
+            self.stdout.write(f"{name or '(blank)'}: stored {stored}, actual {actual}")
+        if not mismatches:
+            self.stdout.write("Class roster is consistent.")
+        elif fix:
+            classes = rebuild_roster()
+            self.stdout.write(f"Rebuilt class roster ({classes} classes).")
+        else:
+            raise CommandError(f"{len(mismatches)} class(es) out of date; rerun with --fix.")
@@ -0,0 +1,45 @@
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_import import FORMATS, StudentImporter, format_for, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import students and their parents from a CSV, JSON Lines or JSON file "
+        "('-' for stdin). Rows are streamed and written in chunks; invalid rows "
+        "are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or '-' for stdin.")
+        parser.add_argument("--format", dest="fmt", choices=FORMATS, help="Input format (default: from the extension, else csv).")
+        parser.add_argument("--chunk-size", type=int, help="Rows per transaction (default: STUDENT_IMPORT['CHUNK_SIZE']).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["fmt"] or format_for(path)
+        importer = StudentImporter(options["chunk_size"])
+        try:
+            if path == "-":
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+                importer.run(read_rows(stream, fmt))
+            else:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    importer.run(read_rows(stream, fmt))
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        report = importer.report
+        if report.stopped:
+            self.stderr.write(f"Stopped at malformed input at row {report.stopped['row']}: {report.stopped['error']}")
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f"... {report.failed - len(report.errors)} more failed rows")
+        self.stdout.write(
+            f"{report.rows} rows: {report.created_students} students and "
+            f"{report.created_parents} parents created, {report.failed} failed"
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.utils.text import capfirst
+
+from Parent.models import Parent
+from Users.models import User
+from Users.phone import renormalize_phones
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite user and parent phone numbers stored before normalisation into "
+        "E.164, in batches. Numbers whose normalised form another row already "
+        "holds are reported and left for manual review."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows read per batch.")
+        parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them.")
+
+    def handle(self, *args, **options):
+        for model in (User, Parent):
+            stats = renormalize_phones(model, options["batch_size"], options["dry_run"])
+            verb = "would change" if options["dry_run"] else "changed"
+            self.stdout.write(
+                f"{capfirst(model._meta.verbose_name_plural)}: {stats['checked']} checked, "
+                f"{stats['changed']} {verb}, {len(stats['conflicts'])} conflict(s)"
+            )
+            for pk, old, new in stats["conflicts"]:
+                self.stdout.write(f"  {model.__name__} {pk}: {old!r} -> {new!r} is already taken")
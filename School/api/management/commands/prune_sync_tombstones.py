@@ -0,0 +1,19 @@
+from api.management.periodic import PeriodicCommand
+from api.sync import prune_tombstones
+
+
+class Command(PeriodicCommand):
+    help = (
+        "Delete sync tombstones older than SYNC['TOMBSTONE_DAYS'] in batches. "
+        "Clients whose token predates the cutoff get a full sync instead."
+    )
+    every_help = "Keep running and prune every N seconds (for a scheduled worker)."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--days", type=int, default=None, help="Keep tombstones this many days.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Tombstones deleted per statement.")
+
+    def run_once(self, options):
+        deleted = prune_tombstones(days=options["days"], batch_size=options["batch_size"])
+        self.stdout.write(f"Pruned {deleted} sync tombstone(s).")
@@ -0,0 +1,37 @@
+from api.management.periodic import PeriodicCommand
+from api.tokens import purge_expired_tokens, rebuild_jti_index, token_table_sizes
+
+
+class Command(PeriodicCommand):
+    help = "Delete expired JWT outstanding/blacklisted tokens in bounded batches."
+    every_help = "Keep running and purge every N seconds (for a scheduled worker)."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=None, help="Tokens deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=None, help="Seconds to sleep between batches.")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument(
+            "--rebuild-index", action="store_true",
+            help="Rebuild the hashed-jti index from the blacklist after purging.",
+        )
+
+    def run_once(self, options):
+        before = token_table_sizes()
+        stats = purge_expired_tokens(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_batches=options["max_batches"],
+        )
+        if options["rebuild_index"]:
+            indexed = rebuild_jti_index()
+            self.stdout.write(f"Rebuilt jti index with {indexed} digests.")
+        after = token_table_sizes()
+
+        self.stdout.write(
+            f"Purged {stats['deleted']} tokens in {stats['batches']} batches "
+            f"({stats['seconds']}s, {stats['rows_per_second']} rows/s); "
+            f"{stats['index_deleted']} index digests expired."
+        )
+        for table in before:
+            self.stdout.write(f"  {table}: {before[table]} -> {after[table]}")
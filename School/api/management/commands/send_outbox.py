@@ -0,0 +1,30 @@
+from api.management.periodic import PeriodicCommand
+from api.outbox import drain_outbox, outbox_counts, purge_outbox
+
+
+class Command(PeriodicCommand):
+    help = (
+        "Deliver queued emails from the outbox in batches over one connection, "
+        "then purge old sent and dead-lettered rows. In production run it with "
+        "--every as a separate process; nothing else sends queued mail."
+    )
+    every_help = "Keep running and drain every N seconds (background worker mode)."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=None, help="Messages claimed per batch.")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches.")
+
+    def run_once(self, options):
+        stats = drain_outbox(batch_size=options["batch_size"], max_batches=options["max_batches"])
+        if stats["batches"] or not options["every"]:
+            self.stdout.write(
+                f"Sent {stats['sent']}, retried {stats['retried']}, dead-lettered {stats['dead']} "
+                f"in {stats['batches']} batches ({stats['seconds']}s, {stats['per_second']} msg/s)."
+            )
+        purged = purge_outbox()
+        if purged:
+            self.stdout.write(f"Purged {purged} old sent/dead-lettered emails.")
+        if not options["every"]:
+            counts = ", ".join(f"{status}: {n}" for status, n in outbox_counts().items())
+            self.stdout.write(f"Outbox: {counts}")
@@ -0,0 +1,42 @@
+"""
+Base class for management commands that double as scheduled workers.
+
+``PeriodicCommand`` runs ``run_once(options)`` once, or with ``--every N``
+keeps running it every N seconds as a long-lived process (send_outbox,
+purge_tokens, check_class_roster, prune_sync_tombstones, archive_students).
+Database connections are recycled around each run like around a request
+(``close_old_connections``), and an exception in one run is logged rather
+than ending the worker, so a transient database error or a dropped
+connection costs one run, not the process.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicCommand(BaseCommand):
+    every_help = "Keep running and repeat every N seconds (for a scheduled worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=None, help=self.every_help)
+
+    def handle(self, *args, **options):
+        if not options["every"]:
+            self.run_once(options)
+            return
+        while True:
+            close_old_connections()
+            try:
+                self.run_once(options)
+            except Exception:
+                logger.exception(f"{self.__module__.rsplit('.', 1)[-1]} run failed; retrying in {options['every']}s")
+            finally:
+                close_old_connections()
+            time.sleep(options["every"])
+
+    def run_once(self, options):
+        raise NotImplementedError("subclasses of PeriodicCommand must provide a run_once() method")
@@ -0,0 +1,14 @@
+class RateLimitHeadersMiddleware:
+    """Expose the tightest token bucket hit by a request as X-RateLimit-* headers."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, "rate_limit", None)
+        if rate_limit:
+            response["X-RateLimit-Limit"] = str(rate_limit["limit"])
+            response["X-RateLimit-Remaining"] = str(rate_limit["remaining"])
+            response["X-RateLimit-Reset"] = str(rate_limit["reset"])
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedJti',
+            fields=[
+                ('digest', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Revoked token digest',
+                'verbose_name_plural': 'Revoked token digests',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parent_id', models.BigIntegerField()),
+                ('student_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Sync tombstone',
+                'verbose_name_plural': 'Sync tombstones',
+                'indexes': [models.Index(fields=['parent_id', 'created_at'], name='api_synctom_parent__f626c4_idx'), models.Index(fields=['created_at'], name='api_synctom_created_30d61d_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,84 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class RevokedJti(models.Model):
+    """
+    Compact index of blacklisted refresh tokens keyed by a 64-bit digest of
+    the jti, so blacklist checks are a primary-key probe on a narrow table
+    instead of a join over the full token history. Only maintained when
+    TOKEN_LIFECYCLE["JTI_INDEX"] is enabled.
+    """
+    digest = models.BigIntegerField(primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Revoked token digest"
+        verbose_name_plural = "Revoked token digests"
+
+    def __str__(self):
+        return f"{self.digest:x} (expires {self.expires_at:%Y-%m-%d})"
+
+
+class OutboundEmail(models.Model):
+    """
+    Durable email outbox. Views enqueue rows and return immediately; the
+    ``send_outbox`` worker delivers them in batches over one SMTP connection.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead letter'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(help_text="List of recipient addresses.")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        help_text="Earliest time the row may be (re)claimed by a worker."
+    )
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Outbound email"
+        verbose_name_plural = "Outbound emails"
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class SyncTombstone(models.Model):
+    """
+    A student leaving a parent's view, because it was deleted or unlinked.
+    ``/sync/`` returns these so clients can drop local copies; rows older
+    than SYNC["TOMBSTONE_DAYS"] are pruned by ``prune_sync_tombstones``.
+    Plain ids rather than foreign keys: both sides may already be gone.
+    """
+    parent_id = models.BigIntegerField()
+    student_id = models.BigIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Sync tombstone"
+        verbose_name_plural = "Sync tombstones"
+        indexes = [
+            models.Index(fields=['parent_id', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"student {self.student_id} left parent {self.parent_id} at {self.created_at:%Y-%m-%d %H:%M}"
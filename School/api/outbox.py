@@ -0,0 +1,192 @@
+"""
+Email outbox: enqueue in the request, deliver from a worker.
+
+``enqueue_mail`` inserts an ``OutboundEmail`` row. ``drain_outbox`` claims a
+batch of due rows (pushing ``next_attempt_at`` forward as a lease, so a
+crashed worker's rows become due again), sends them over a single backend
+connection and records the outcome: sent, retried with exponential backoff,
+or dead-lettered after MAX_ATTEMPTS. Bodies can hold password-reset links,
+so a message's body is cleared as it is marked sent, and ``purge_outbox``
+deletes sent and dead-lettered rows after RETENTION_DAYS.
+
+Nothing else sends queued mail: production needs
+``manage.py send_outbox --every 5`` running as its own long-lived process
+next to the web workers. It drains and purges on every pass.
+
+Configure through ``settings.EMAIL_OUTBOX``:
+    BATCH_SIZE         rows claimed per batch
+    MAX_ATTEMPTS       attempts before a message is dead-lettered
+    BACKOFF_BASE       seconds before the first retry (doubles per attempt)
+    BACKOFF_MAX        cap on the retry delay
+    LEASE              seconds a claimed row is hidden from other workers
+    RETENTION_DAYS     days sent and dead-lettered rows are kept
+    BACKGROUND_THREAD  also drain from a daemon thread after each enqueue
+                       (for runserver with the console/locmem backends)
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_SETTINGS = {
+    "BATCH_SIZE": 50,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_BASE": 30,
+    "BACKOFF_MAX": 3600,
+    "LEASE": 300,
+    "RETENTION_DAYS": 30,
+    "BACKGROUND_THREAD": False,
+}
+
+
+def outbox_setting(name):
+    return {**DEFAULT_OUTBOX_SETTINGS, **getattr(settings, "EMAIL_OUTBOX", {})}[name]
+
+
+def enqueue_mail(subject, message, recipient_list, from_email=None):
+    """Queue an email for delivery. Returns the OutboundEmail row."""
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+        next_attempt_at=timezone.now(),
+    )
+    if outbox_setting("BACKGROUND_THREAD"):
+        transaction.on_commit(_drain_in_background)
+    return email
+
+
+def _claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if rows:
+            OutboundEmail.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_attempt_at=now + timedelta(seconds=outbox_setting("LEASE"))
+            )
+    return rows
+
+
+def _record_failure(row, error):
+    row.attempts += 1
+    row.last_error = str(error)[:2000]
+    if row.attempts >= outbox_setting("MAX_ATTEMPTS"):
+        row.status = OutboundEmail.STATUS_DEAD
+        logger.error(f"Outbound email {row.pk} dead-lettered after {row.attempts} attempts: {error}")
+    else:
+        delay = min(
+            outbox_setting("BACKOFF_BASE") * 2 ** (row.attempts - 1), outbox_setting("BACKOFF_MAX")
+        )
+        row.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    row.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def drain_outbox(batch_size=None, max_batches=None):
+    """
+    Deliver due messages until the queue is empty (or ``max_batches``).
+    Returns delivery statistics.
+    """
+    batch_size = batch_size or outbox_setting("BATCH_SIZE")
+    stats = {"sent": 0, "retried": 0, "dead": 0, "batches": 0}
+    started = time.monotonic()
+    connection = None
+
+    try:
+        while max_batches is None or stats["batches"] < max_batches:
+            rows = _claim_batch(batch_size)
+            if not rows:
+                break
+            stats["batches"] += 1
+            if connection is None:
+                try:
+                    connection = get_connection(fail_silently=False)
+                    connection.open()
+                except Exception as e:
+                    # Mail server unreachable: count the attempt and back off
+                    for row in rows:
+                        _record_failure(row, e)
+                    stats["retried"] += len(rows)
+                    connection = None
+                    break
+
+            sent_ids = []
+            for row in rows:
+                message = EmailMessage(
+                    row.subject, row.body, row.from_email, row.recipients, connection=connection
+                )
+                try:
+                    message.send()
+                    sent_ids.append(row.pk)
+                except Exception as e:
+                    _record_failure(row, e)
+                    if row.status == OutboundEmail.STATUS_DEAD:
+                        stats["dead"] += 1
+                    else:
+                        stats["retried"] += 1
+            if sent_ids:
+                OutboundEmail.objects.filter(pk__in=sent_ids).update(
+                    status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), last_error="", body=""
+                )
+                stats["sent"] += len(sent_ids)
+    finally:
+        if connection is not None:
+            connection.close()
+
+    elapsed = time.monotonic() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["per_second"] = round(stats["sent"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def purge_outbox(days=None):
+    """Delete sent and dead-lettered rows older than ``days``; returns the count."""
+    cutoff = timezone.now() - timedelta(days=days or outbox_setting("RETENTION_DAYS"))
+    # next_attempt_at is the last claim (or retry) time of a finished row,
+    # and the (status, next_attempt_at) index covers this filter
+    return OutboundEmail.objects.filter(
+        status__in=[OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_DEAD], next_attempt_at__lt=cutoff
+    ).delete()[0]
+
+
+def outbox_counts():
+    """Rows per status, plus how many pending rows are already due."""
+    counts = {status: 0 for status, _ in OutboundEmail.STATUS_CHOICES}
+    for row in OutboundEmail.objects.values("status").annotate(n=Count("pk")).order_by():
+        counts[row["status"]] = row["n"]
+    counts["due"] = OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=timezone.now()
+    ).count()
+    return counts
+
+
+_drain_lock = threading.Lock()
+
+
+def _drain_in_background():
+    def run():
+        if not _drain_lock.acquire(blocking=False):
+            return  # a drain is already running; the row stays queued for the next one
+        try:
+            drain_outbox()
+        except Exception as e:
+            logger.error(f"Background outbox drain failed: {e}")
+        finally:
+            _drain_lock.release()
+            connections.close_all()
+
+    threading.Thread(target=run, name="email-outbox", daemon=True).start()
@@ -0,0 +1,59 @@
+"""
+Page-number pagination with an opt-in keyset (cursor) mode.
+
+Page numbers cost a ``COUNT(*)`` plus an OFFSET scan per page, so deep pages
+get linearly slower. Clients that send ``?pagination=cursor`` (or follow a
+``cursor`` link) get keyset pages instead: ``WHERE key > last_seen ORDER BY
+key LIMIT n`` on the view's ``cursor_ordering``, which must be an indexed,
+unique and stable column (``student_number``, ``id``). Cursor pages carry
+opaque ``next``/``previous`` links and skip the count unless ``?count=true``
+is passed.
+"""
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "id"
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "cursor_ordering", self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get("count", "").lower() in TRUE_VALUES:
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        body = OrderedDict([("next", self.get_next_link()), ("previous", self.get_previous_link())])
+        if self.count is not None:
+            body["count"] = self.count
+        body["results"] = data
+        return Response(body)
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """PageNumberPagination unless the request asks for keyset pages."""
+
+    cursor_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        params = request.query_params
+        if params.get("pagination") == "cursor" or self.cursor_class.cursor_query_param in params:
+            self.cursor = self.cursor_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,318 @@
+"""
+Substring search support.
+
+Django's ``icontains`` compiles to ``UPPER(col) LIKE UPPER('%term%')``, which a
+b-tree index cannot serve. On PostgreSQL, a GIN trigram index on ``UPPER(col)``
+can, so the ``*_trigram_search_indexes`` migrations create those (enabling
+``pg_trgm`` when the role is allowed to). On other databases, and when the
+extension is unavailable, they do nothing and searches fall back to a plain
+LIKE scan, which is fine at SQLite's scale.
+
+``search_students`` backs ``/students/search/``. It matches against the
+generated, lower-case ``Student.search_text`` column. On PostgreSQL it uses
+the trigram index (substring match plus word similarity for typos). Elsewhere
+it uses ``StudentSearchIndex``, an in-process trigram index kept current by
+Student signals and rebuilt every INDEX_TTL seconds to pick up other
+processes' writes. Either way results are ranked exact word > word prefix >
+substring > fuzzy, and limited to the caller's queryset.
+
+Configure through ``settings.STUDENT_SEARCH``:
+    INDEX_TTL       seconds before the in-process index is rebuilt
+    MIN_SCORE       lowest fuzzy score that still counts as a match
+    MAX_RESULTS     cap on the ``limit`` a client may ask for
+    CANDIDATES      index matches checked against the caller's scope
+"""
+import bisect
+import itertools
+import logging
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_SETTINGS = {
+    "INDEX_TTL": 60,
+    "MIN_SCORE": 0.3,
+    "MAX_RESULTS": 50,
+    "CANDIDATES": 1000,
+}
+
+SCORE_EXACT, SCORE_PREFIX, SCORE_SUBSTRING = 1.0, 0.8, 0.6
+
+
+def search_setting(name):
+    return {**DEFAULT_SEARCH_SETTINGS, **getattr(settings, "STUDENT_SEARCH", {})}[name]
+
+
+def trigram_available(connection):
+    """True if ``pg_trgm`` is installed on ``connection``'s database."""
+    if connection.vendor != "postgresql":
+        return False
+    cached = getattr(connection, "_pg_trgm_available", None)
+    if cached is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            cached = connection._pg_trgm_available = cursor.fetchone() is not None
+    return cached
+
+
+# ============================
+# Student search
+# ============================
+def normalize_query(term):
+    """Lower-case words of ``term``, as they appear in ``search_text``."""
+    return re.findall(r"[\w'.-]+", (term or "").lower())
+
+
+def student_search_text(student):
+    """Python twin of the ``Student.search_text`` expression (for signals)."""
+    parts = (student.student_id or "", student.first_name, student.last_name, student.current_class)
+    return " ".join(parts).lower()
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _word_score(query_word, words):
+    """Best match of ``query_word`` against a document's words (0 to 1)."""
+    best = 0.0
+    query_grams = None
+    for word in words:
+        if word == query_word:
+            return SCORE_EXACT
+        if word.startswith(query_word):
+            best = max(best, SCORE_PREFIX)
+        elif query_word in word:
+            best = max(best, SCORE_SUBSTRING)
+        elif best < SCORE_SUBSTRING:
+            query_grams = query_grams or _trigrams(query_word)
+            grams = _trigrams(word)
+            best = max(best, len(query_grams & grams) / len(query_grams | grams) * SCORE_SUBSTRING)
+    return best
+
+
+def score_text(query_words, text):
+    """Average best-word score; 0 unless every query word matches something."""
+    words = text.split()
+    scores = [_word_score(query_word, words) for query_word in query_words]
+    minimum = search_setting("MIN_SCORE") * SCORE_SUBSTRING
+    if not scores or min(scores) < minimum:
+        return 0.0
+    return sum(scores) / len(scores)
+
+
+class StudentSearchIndex:
+    """
+    In-process index over ``Student.search_text``: word -> students, a
+    sorted word list for exact/prefix lookups, and trigram -> words for
+    substring and typo matches on alphabetic words.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._docs = {}  # pk -> search_text
+        self._word_docs = {}  # word -> set of pks
+        self._gram_words = {}  # trigram -> set of words
+        self._sorted_words = []
+        self._sorted = True
+        self._built_at = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    # -- maintenance --
+    def _add(self, pk, text):
+        self._docs[pk] = text
+        for word in set(text.split()):
+            pks = self._word_docs.get(word)
+            if pks is None:
+                pks = self._word_docs[word] = set()
+                self._sorted = False
+                if word.isalpha():
+                    for gram in _trigrams(word):
+                        self._gram_words.setdefault(gram, set()).add(word)
+            pks.add(pk)
+
+    def _remove(self, pk):
+        text = self._docs.pop(pk, None)
+        for word in set((text or "").split()):
+            pks = self._word_docs.get(word)
+            if pks is not None:
+                pks.discard(pk)  # empty words stay until the next rebuild
+
+    def build(self):
+        from Student.models import Student
+
+        fresh = StudentSearchIndex(self.ttl)
+        for pk, text in Student.objects.values_list("pk", "search_text").iterator(chunk_size=5000):
+            fresh._add(pk, text or "")
+        fresh._sorted_words = sorted(fresh._word_docs)
+        with self._lock:
+            self._docs, self._word_docs, self._gram_words = fresh._docs, fresh._word_docs, fresh._gram_words
+            self._sorted_words, self._sorted = fresh._sorted_words, True
+            self._built_at = time.monotonic()
+        return len(fresh._docs)
+
+    def update(self, pk, text):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(pk)
+                self._add(pk, text or "")
+
+    def delete(self, pk):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(pk)
+
+    def invalidate(self):
+        """Force a rebuild on next use (after writes that skip signals)."""
+        with self._lock:
+            if self._built_at is not None:
+                self._built_at = 0.0
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.build()
+        elif time.monotonic() - self._built_at >= self.ttl:
+            self._rebuild_in_background()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.warning(f"Student search index rebuild failed: {e}")
+            finally:
+                self._rebuilding = False
+                connections.close_all()
+
+        threading.Thread(target=run, name="student-search-index", daemon=True).start()
+
+    # -- lookup --
+    def _word_matches(self, query_word, limit):
+        """``{word: score}`` for indexed words matching ``query_word``."""
+        if not self._sorted:
+            self._sorted_words, self._sorted = sorted(self._word_docs), True
+        words = self._sorted_words
+        matches = {}
+        start = bisect.bisect_left(words, query_word)
+        for word in itertools.islice(words, start, start + limit):
+            if not word.startswith(query_word):
+                break
+            matches[word] = SCORE_EXACT if word == query_word else SCORE_PREFIX
+        if not query_word.isalpha():
+            return matches  # student IDs and classes: exact/prefix only
+
+        # Words sharing at least ceil(MIN_SCORE * G) of the query's G trigrams
+        # must share one of its G - ceil(MIN_SCORE * G) + 1 rarest trigrams
+        grams = _trigrams(query_word)
+        needed = max(1, math.ceil(search_setting("MIN_SCORE") * len(grams)))
+        rarest = sorted(grams, key=lambda gram: len(self._gram_words.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:len(grams) - needed + 1]:
+            candidates |= self._gram_words.get(gram, set())
+        for word in candidates:
+            if word not in matches:
+                score = _word_score(query_word, [word])
+                if score >= search_setting("MIN_SCORE") * SCORE_SUBSTRING:
+                    matches[word] = score
+        return matches
+
+    def search(self, query_words, limit, within=None):
+        """Return ``[(pk, score)]``, best first, optionally only pks in ``within``."""
+        self._ensure_fresh()
+        if within is not None:
+            # A small scope is scored document by document: the word lists
+            # below are capped, and their cap would apply to the whole index
+            with self._lock:
+                scored = [(pk, score_text(query_words, self._docs[pk])) for pk in within if pk in self._docs]
+            ranked = sorted((item for item in scored if item[1]), key=lambda item: -item[1])
+            return ranked[:limit]
+        totals = None
+        with self._lock:
+            for query_word in query_words:
+                best = {}
+                for word, score in self._word_matches(query_word, limit).items():
+                    for pk in self._word_docs.get(word, ()):
+                        if score > best.get(pk, 0.0):
+                            best[pk] = score
+                if totals is None:
+                    totals = best
+                else:
+                    # Every query word must match
+                    totals = {pk: total + best[pk] for pk, total in totals.items() if pk in best}
+        ranked = sorted(totals.items(), key=lambda item: -item[1])[:limit]
+        return [(pk, total / len(query_words)) for pk, total in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_student_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = StudentSearchIndex(search_setting("INDEX_TTL"))
+    return _index
+
+
+def search_students(queryset, term, limit):
+    """
+    Students in ``queryset`` matching ``term``, best first, each with a
+    ``search_score`` attribute.
+    """
+    query_words = normalize_query(term)
+    if not query_words:
+        return []
+    limit = min(limit, search_setting("MAX_RESULTS"))
+
+    if trigram_available(connections[queryset.db]):
+        return _search_postgres(queryset, query_words, limit)
+
+    # Small scopes (a parent's children) are scored directly; large ones
+    # are filtered after ranking, among the top CANDIDATES
+    candidates = search_setting("CANDIDATES")
+    scope = set(queryset.values_list("pk", flat=True)[:candidates + 1])
+    within = scope if len(scope) <= candidates else None
+    ranked = get_student_index().search(query_words, limit if within else candidates, within)
+    scores = dict(ranked)
+    students = list(queryset.filter(pk__in=list(scores)))
+    for student in students:
+        student.search_score = scores[student.pk]
+    students.sort(key=lambda student: (-student.search_score, student.student_number or 0))
+    return students[:limit]
+
+
+def _search_postgres(queryset, query_words, limit):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    from django.db.models import Q
+
+    phrase = " ".join(query_words)
+    matches = Q()
+    for word in query_words:
+        # LIKE '%word%' is served by the trigram index on search_text
+        matches &= Q(search_text__contains=word)
+    candidates = queryset.annotate(
+        search_similarity=TrigramWordSimilarity(phrase, "search_text")
+    ).filter(matches | Q(search_similarity__gte=search_setting("MIN_SCORE")))
+
+    students = list(candidates.order_by("-search_similarity", "student_number")[:limit * 4])
+    for student in students:
+        student.search_score = max(
+            score_text(query_words, student.search_text), student.search_similarity * SCORE_SUBSTRING
+        )
+    students.sort(key=lambda student: (-student.search_score, student.student_number or 0))
+    return students[:limit]
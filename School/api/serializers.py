@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError as DjangoValidationError
@@ -9,12 +10,53 @@ import re
 
 from Users.models import User
 from Parent.models import Parent
+from Student import roster
 from Student.models import Student
+from .hashing import set_user_password
+from .sync import record_tombstones
+from .utils import unique_violation_fields, validate_email_format
 
 
 # ====================
 # Custom Related Field
 # ====================
+class ParentUserListField(serializers.ManyRelatedField):
+    """
+    List side of ParentUserPKRelatedField: resolves every ID in one
+    ``user_id__in`` query and reports bad IDs by their list index.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        user_ids, errors = {}, {}  # list index -> user id
+        for index, item in enumerate(data):
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                user_ids[index] = int(item)
+            except (TypeError, ValueError):
+                errors[index] = [f"Invalid parent user ID: {item}."]
+        found = {
+            parent.user_id: parent
+            for parent in self.child_relation.get_queryset().filter(
+                user_id__in=user_ids.values()
+            ).order_by()
+        }
+        parents = []
+        for index, user_id in user_ids.items():
+            parent = found.get(user_id)
+            if parent is None:
+                errors[index] = [f"Invalid parent user ID: {user_id}."]
+            elif parent not in parents:
+                parents.append(parent)
+        if errors:
+            raise serializers.ValidationError(dict(sorted(errors.items())))
+        return parents
+
+
 class ParentUserPKRelatedField(serializers.PrimaryKeyRelatedField):
     """
     Accept a list of *User* IDs (role='parent') from the client,
@@ -22,15 +64,25 @@ class ParentUserPKRelatedField(serializers.PrimaryKeyRelatedField):
     Also represent them back to the client as User IDs.
     """
     def __init__(self, **kwargs):
-        kwargs.setdefault('many', True)
         # Internally we relate to Parent, not User
-        kwargs.setdefault('queryset', Parent.objects.select_related('user').all())
+        kwargs.setdefault('queryset', Parent.objects.all())
         super().__init__(**kwargs)
 
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ParentUserListField(**list_kwargs)
+
+    def use_pk_only_optimization(self):
+        return False  # representation needs user_id, not just the pk
+
     def to_internal_value(self, data):
         try:
-            parent = Parent.objects.select_related('user').get(user_id=data)
-        except Parent.DoesNotExist:
+            parent = self.get_queryset().get(user_id=data)
+        except (Parent.DoesNotExist, TypeError, ValueError):
             raise serializers.ValidationError("Invalid parent user ID.")
         return parent
 
@@ -139,7 +191,9 @@ class UserSerializer(serializers.ModelSerializer):
 # STUDENT SERIALIZER
 # ====================
 class StudentSerializer(serializers.ModelSerializer):
+    # many=True must be passed here: RelatedField.__new__ reads it before __init__
     parent_users = ParentUserPKRelatedField(
+        many=True,
         source='parents',
         help_text="List of parent *User* IDs"
     )
@@ -195,7 +249,7 @@ class StudentSerializer(serializers.ModelSerializer):
             with transaction.atomic():
                 parents = validated_data.pop('parents', [])
                 student = Student.objects.create(**validated_data)
-                student.parents.set(parents)
+                self._link_parents(student, parents, current=set())
                 return student
         except IntegrityError:
             raise serializers.ValidationError({
@@ -206,11 +260,49 @@ class StudentSerializer(serializers.ModelSerializer):
         parents = validated_data.pop('parents', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        if parents is not None:
-            instance.parents.set(parents)
-        instance.save()
+        with transaction.atomic():
+            instance.save()
+            if parents is not None:
+                self._link_parents(instance, parents)
         return instance
 
+    def _link_parents(self, student, parents, current=None):
+        """
+        Make ``parents`` the student's parents, writing only the difference:
+        one DELETE for dropped links and one INSERT for new ones. Current
+        links come from the prefetch cache when the viewset loaded it.
+        """
+        through = Student.parents.through
+        cache = getattr(student, '_prefetched_objects_cache', {})
+        if current is None:
+            if 'parents' in cache:
+                current = {parent.pk for parent in cache['parents']}
+            else:
+                current = set(through.objects.filter(student=student).values_list('parent_id', flat=True))
+        wanted = {parent.pk for parent in parents}
+
+        if current - wanted:
+            through.objects.filter(student=student, parent_id__in=current - wanted).delete()
+        if wanted - current:
+            through.objects.bulk_create([
+                through(student_id=student.pk, parent_id=parent_id) for parent_id in wanted - current
+            ])
+        if current != wanted:
+            # Through-table writes send no m2m_changed; update the roster
+            # and the sync tombstones here
+            deltas = roster.new_deltas()
+            roster.add_links(deltas, student.current_class, len(wanted - current) - len(current - wanted))
+            roster.apply_roster_deltas(deltas)
+            record_tombstones((parent_id, student.pk) for parent_id in current - wanted)
+
+        # Prime the prefetch cache so the response does not re-read the links
+        cache.pop('parents', None)
+        queryset = student.parents.all()
+        queryset._result_cache = list(parents)
+        queryset._prefetch_done = True
+        cache['parents'] = queryset
+        student._prefetched_objects_cache = cache
+
 
 # ====================
 # REGISTER SERIALIZER
@@ -219,7 +311,18 @@ class RegisterSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration with role-based creation.
     Handles user creation with password validation and confirmation.
+
+    Uniqueness of email and phone number is not pre-checked with queries:
+    the user (and parent profile) are inserted optimistically and unique
+    constraint violations are mapped back to the same field errors.
     """
+    unique_errors = {
+        'email': "A user with this email already exists.",
+        'phone_number': "A user with this phone number already exists.",
+    }
+    # Plain CharField: format is checked once in validate_email, uniqueness by the DB
+    email = serializers.CharField(max_length=254)
+
     password = serializers.CharField(
         write_only=True,
         min_length=8,
@@ -238,10 +341,9 @@ class RegisterSerializer(serializers.ModelSerializer):
             'password', 'confirm_password'
         ]
         extra_kwargs = {
-            'email': {'required': True, 'max_length': 254},
             'first_name': {'required': True, 'max_length': 100},
             'last_name': {'required': True, 'max_length': 100},
-            'phone_number': {'required': False, 'max_length': 15},
+            'phone_number': {'required': False, 'max_length': 15, 'validators': []},
         }
 
     def validate_email(self, value):
@@ -249,13 +351,8 @@ class RegisterSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError("Email is required.")
         value = escape(value.strip().lower())
-        try:
-            validate_email(value)
-        except DjangoValidationError:
+        if not validate_email_format(value):
             raise serializers.ValidationError("Invalid email format.")
-
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
         return value
 
     def validate_password(self, value):
@@ -297,8 +394,6 @@ class RegisterSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Phone number must have at least 10 digits.")
             if len(digits_only) > 15:
                 raise serializers.ValidationError("Phone number cannot have more than 15 digits.")
-            if User.objects.filter(phone_number=value).exists():
-                raise serializers.ValidationError("A user with this phone number already exists.")
         return value
 
     def validate(self, attrs):
@@ -311,29 +406,48 @@ class RegisterSerializer(serializers.ModelSerializer):
                 'confirm_password': 'Passwords do not match.'
             })
 
+        # Registration only creates parents (role is not a field here), and
+        # parent profiles require a Ghana mobile number, stored in E.164 so
+        # the unique index sees one form per number
+        if attrs.get('phone_number'):
+            try:
+                attrs['phone_number'] = Parent.normalize_phone_number(attrs['phone_number'])
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({'phone_number': e.message_dict['phone_number']})
+
         return attrs
 
     def create(self, validated_data):
-        """Create a new user with the validated data."""
-        try:
-            with transaction.atomic():
-                # Remove confirm_password as it's not needed for user creation
-                validated_data.pop('confirm_password', None)
-
-                # Extract password for separate handling
-                password = validated_data.pop('password')
+        """Create the user and parent profile in one transaction, no pre-checks."""
+        validated_data.pop('confirm_password', None)
+        password = validated_data.pop('password')
 
-               
-                # Create user instance
-                user = User(**validated_data)
-                user.set_password(password)
-                user.save()
+        # Hash before opening the transaction (runs on the bounded pool)
+        user = User(**validated_data)
+        set_user_password(user, password)
 
-                return user
-        except IntegrityError:
+        try:
+            with transaction.atomic():
+                # bulk_create inserts without the post_save profile-sync
+                # queries, and skips User.save(), which would canonicalise
+                # the phone: validate() has already stored it in E.164
+                User.objects.bulk_create([user])
+                if user.role == 'parent' and user.phone_number:
+                    Parent.objects.bulk_create([Parent(
+                        user=user,
+                        phone_number=user.phone_number,  # normalised in validate()
+                        is_primary=True,
+                    )])
+        except IntegrityError as e:
+            fields = unique_violation_fields(e, list(self.unique_errors))
+            if fields:
+                raise serializers.ValidationError(
+                    {field: [self.unique_errors[field]] for field in fields}
+                )
             raise serializers.ValidationError({
                 "error": "User registration failed. Please try again."
             })
+        return user
 
 
 # ====================
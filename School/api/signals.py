@@ -0,0 +1,58 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from Student.models import Student
+from Student.signals import in_batch_delete
+from Users.models import User
+from .authentication import user_cache
+from .search import get_student_index, student_search_text
+from .sync import record_tombstones
+from .tokens import index_revoked, lifecycle_setting
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the user from the per-process JWT user cache."""
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def index_blacklisted_token(sender, instance, created, **kwargs):
+    """Mirror single blacklist inserts (logout, rotation) into the jti index."""
+    if created and lifecycle_setting("JTI_INDEX"):
+        index_revoked([(instance.token.jti, instance.token.expires_at)])
+
+
+@receiver(post_save, sender=Student)
+def index_student(sender, instance, **kwargs):
+    """Keep this process's student search index current."""
+    get_student_index().update(instance.pk, student_search_text(instance))
+
+
+@receiver(post_delete, sender=Student)
+def unindex_student(sender, instance, **kwargs):
+    if not in_batch_delete():
+        get_student_index().delete(instance.pk)
+
+
+@receiver(post_delete, sender=Student)
+def tombstone_deleted_student(sender, instance, **kwargs):
+    """Tell each former parent's next /sync/ that the student is gone."""
+    if in_batch_delete():
+        return
+    # _parent_ids is read in Student/signals.py's pre_delete
+    record_tombstones((parent_id, instance.pk) for parent_id in getattr(instance, '_parent_ids', ()))
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def tombstone_unlinked_students(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_remove':
+        links = [(instance.pk, pk) for pk in pk_set] if reverse else [(pk, instance.pk) for pk in pk_set]
+    elif action == 'post_clear':
+        # _cleared_links is read in Student/signals.py's pre_clear
+        links = [(parent_id, student_id) for student_id, _, parent_id in getattr(instance, '_cleared_links', ())]
+    else:
+        return
+    record_tombstones(links)
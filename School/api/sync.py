@@ -0,0 +1,116 @@
+"""
+Delta sync for the mobile client.
+
+``GET /sync/?since=<token>`` returns the caller's students and parent
+profile changed since the token, plus tombstones: ids of students deleted
+or unlinked from the caller since then. Changes are found through the
+indexed ``updated_at`` columns (link changes touch ``Student.updated_at``,
+see Student/signals.py; user fields embedded in the parent profile touch
+``Parent.updated_at``, see Users/signals.py). Tombstones are ``SyncTombstone`` rows written by
+api/signals.py on Student delete and m2m remove/clear, and by code that
+deletes through rows directly (``record_tombstones``).
+
+Tokens are opaque to clients: the server time, in microseconds, at which
+the previous sync started. Each sync re-reads OVERLAP seconds before the
+token, so rows saved just before it by a transaction that committed just
+after are not missed. Clients apply records by id, so the repeats are
+harmless. Without a token, with one older than the tombstone retention, or
+when the caller has no parent profile, the response is a full snapshot
+(``"full": true``) that replaces the client's copy. A token more than
+OVERLAP seconds in the future was not issued by this server and is rejected
+(400), since honouring it would silently drop changes.
+
+Configure through ``settings.SYNC``:
+    OVERLAP         seconds re-read before each token
+    TOMBSTONE_DAYS  days tombstones are kept; older tokens get a full sync
+    PRUNE_BATCH     tombstones deleted per statement by prune_tombstones
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SyncTombstone
+
+DEFAULT_SYNC_SETTINGS = {
+    "OVERLAP": 5,
+    "TOMBSTONE_DAYS": 30,
+    "PRUNE_BATCH": 5000,
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def sync_setting(name):
+    return {**DEFAULT_SYNC_SETTINGS, **getattr(settings, "SYNC", {})}[name]
+
+
+def make_token(moment):
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def parse_token(token):
+    """The moment encoded in ``token``; raises ValueError if it is malformed."""
+    micros = int(token)
+    if micros <= 0:
+        raise ValueError(f"Invalid sync token: {token!r}")
+    try:
+        return EPOCH + timedelta(microseconds=micros)
+    except OverflowError:
+        raise ValueError(f"Invalid sync token: {token!r}") from None
+
+
+def sync_window(token, now):
+    """
+    Lower bound for changes to return for ``token``, or None when the
+    client needs a full sync. Raises ValueError for malformed tokens and for
+    tokens from the future (beyond clock skew of OVERLAP seconds): taken at
+    face value, those would skip every change up to the moment they name.
+    """
+    if not token:
+        return None
+    since = parse_token(token)
+    if since > now + timedelta(seconds=sync_setting("OVERLAP")):
+        raise ValueError(f"Sync token is in the future: {token!r}")
+    if since < now - timedelta(days=sync_setting("TOMBSTONE_DAYS")):
+        return None  # tombstones from then may already be pruned
+    return since - timedelta(seconds=sync_setting("OVERLAP"))
+
+
+def record_tombstones(links):
+    """Record ``(parent_id, student_id)`` links as removed."""
+    links = set(links)
+    if not links:
+        return
+    now = timezone.now()
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(parent_id=parent_id, student_id=student_id, created_at=now)
+        for parent_id, student_id in links
+    ])
+
+
+def removed_student_ids(parents, students, since):
+    """
+    Ids of students that left any of ``parents`` (a queryset) since
+    ``since`` and are not in ``students`` (the caller's current students).
+    One query.
+    """
+    return list(
+        SyncTombstone.objects.filter(parent_id__in=parents.values('pk'), created_at__gte=since)
+        .exclude(student_id__in=students.values('pk'))
+        .order_by('student_id')
+        .values_list('student_id', flat=True)
+        .distinct()
+    )
+
+
+def prune_tombstones(days=None, batch_size=None):
+    """Delete tombstones older than ``days`` in batches; returns the count."""
+    cutoff = timezone.now() - timedelta(days=days or sync_setting("TOMBSTONE_DAYS"))
+    batch_size = batch_size or sync_setting("PRUNE_BATCH")
+    deleted = 0
+    while True:
+        pks = list(SyncTombstone.objects.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += SyncTombstone.objects.filter(pk__in=pks).delete()[0]
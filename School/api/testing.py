@@ -0,0 +1,87 @@
+"""
+Helpers shared by the test suite and ``manage.py benchmark_queries``.
+
+``SampleData`` builds parents and students the way the query-budget tests
+and the benchmark scenarios need them. ``QueryBudgetMixin`` gives a TestCase
+``assertQueryBudget`` / ``assertScales`` against its ``query_budgets``.
+"""
+import itertools
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from Student.models import Student
+from Student.sequences import assign_student_ids
+from Users.models import User
+
+MAX_GUARDIANS = 4
+PAGE = 20
+
+
+class SampleData:
+    """
+    Factories for parent users and their students. Emails and phone numbers
+    come from a counter starting at ``start``; pick a random start when the
+    database may already hold earlier samples.
+    """
+
+    def __init__(self, prefix="parent", start=1):
+        self.prefix = prefix
+        self.serial = itertools.count(start)
+
+    def make_parent(self, password=None, **extra):
+        n = next(self.serial)
+        extra.setdefault("phone_number", f"024{n % 10**7:07d}")
+        email = f"{self.prefix}{n}@example.com"
+        if password:
+            return User.objects.create_user(email, password, "Ama", "Mensah", **extra)
+        # Hashing a password takes ~0.5s; only login scenarios need one
+        user = User(email=email, first_name="Ama", last_name="Mensah", **extra)
+        user.set_unusable_password()
+        user.save()
+        return user
+
+    def make_students(self, user, count, co_parent=True):
+        """``count`` students, each linked to ``user`` and (optionally) a co-parent."""
+        parents = [user, self.make_parent()] if co_parent else [user]
+        students = assign_student_ids([
+            Student(first_name="Kofi", last_name="Boateng", current_class="P1") for _ in range(count)
+        ])
+        Student.objects.bulk_create(students)
+        through = Student.parents.through
+        through.objects.bulk_create([
+            through(student_id=student.pk, parent_id=parent.parent_profile.pk)
+            for student in students
+            for parent in parents
+        ])
+        return students
+
+    def make_guardians(self, size):
+        """User IDs of 1-3 extra parents, so a student ends up with at most MAX_GUARDIANS."""
+        return [self.make_parent().pk for _ in range(max(1, min(size, MAX_GUARDIANS) - 1))]
+
+
+class QueryBudgetMixin:
+    """
+    ``query_budgets`` maps a path name to the most queries it may run.
+    Atomic blocks run as savepoints inside the test transaction, so
+    SAVEPOINT/RELEASE pairs count (under autocommit they are BEGIN/COMMIT,
+    which the database driver does not log).
+    """
+
+    query_budgets = {}
+
+    def assertQueryBudget(self, name, fn):
+        with CaptureQueriesContext(connection) as queries:
+            response = fn()
+        if hasattr(response, "status_code"):
+            self.assertLess(response.status_code, 400, getattr(response, "data", response))
+        budget = self.query_budgets[name]
+        sql = "\n".join(query["sql"][:120] for query in queries)
+        self.assertLessEqual(len(queries), budget, f"{name}: {len(queries)} queries, budget {budget}\n{sql}")
+        return len(queries)
+
+    def assertScales(self, name, scenario):
+        """Within budget, and the same count for one item as for a PAGE of them."""
+        counts = [self.assertQueryBudget(name, scenario(size)) for size in (1, PAGE)]
+        self.assertEqual(counts[0], counts[1], f"{name}: {counts[0]} queries for 1 item, {counts[1]} for {PAGE}")
@@ -1,3 +1,756 @@
-from django.test import TestCase
+import io
+import json
+import os
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from api import google_auth, hashing, search, throttling
+from api.authentication import ClaimsJWTAuthentication, user_cache
+from api.bulk_import import StudentImporter, read_rows
+from api.models import OutboundEmail, RevokedJti
+from api.outbox import drain_outbox, enqueue_mail, purge_outbox
+from api.serializers import ParentSerializer
+from api.sync import make_token, sync_setting
+from api.testing import QueryBudgetMixin, SampleData
+from api.tokens import (
+    IndexedRefreshToken,
+    force_logout_class,
+    jti_digest,
+    purge_expired_tokens,
+    rebuild_jti_index,
+    revoke_tokens,
+)
+from api.views import AuthRateThrottle, get_tokens_for_user
+from Parent.models import Parent
+from Student.models import Student
+from Student.sequences import assign_student_ids, get_allocator
+from Users.models import User
+
+PASSWORD = "Test-Passw0rd!"
+
+
+def use_local_bucket_store(test):
+    """Give ``test`` fresh in-process throttle buckets instead of the shared file."""
+    patcher = mock.patch.object(throttling, "_store", throttling.LocalBucketStore())
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+def authed_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(user)['access']}")
+    return client
+
+
+class AuthThrottleTests(SimpleTestCase):
+    """AuthRateThrottle: 5/min per client and 5/min per submitted email."""
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        self.factory = APIRequestFactory()
+
+    def attempt(self, email, ip="10.0.0.1"):
+        request = Request(
+            self.factory.post("/api/v1/login/", {"email": email}, format="json", REMOTE_ADDR=ip),
+            parsers=[JSONParser()],
+        )
+        request.user = AnonymousUser()
+        return AuthRateThrottle().allow_request(request, None)
+
+    def test_rotating_emails_does_not_lift_the_client_limit(self):
+        results = [self.attempt(f"user{i}@example.com") for i in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+
+    def test_one_email_is_limited_across_clients(self):
+        results = [self.attempt("victim@example.com", ip=f"10.0.0.{i}") for i in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+
+    def test_denied_client_does_not_drain_email_bucket(self):
+        for i in range(5):
+            self.attempt(f"user{i}@example.com")
+        self.assertFalse(self.attempt("victim@example.com"))
+        self.assertTrue(self.attempt("victim@example.com", ip="10.0.0.2"))
+
+
+
+class HashingPoolTests(TestCase):
+    def setUp(self):
+        use_local_bucket_store(self)
+        self.client = APIClient()
+
+    def use_executor(self, *args):
+        executor = hashing.HashingExecutor(*args)
+        self.addCleanup(executor.shutdown)
+        patcher = mock.patch.object(hashing, "_executor", executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return executor
+
+    def login(self):
+        return self.client.post(
+            "/api/v1/login/", {"email": "nobody@example.com", "password": PASSWORD}, format="json"
+        )
+
+    def test_saturated_pool_answers_503_at_once(self):
+        executor = self.use_executor(0, 0, 5)
+        executor._acquire()  # the only slot
+        response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+    def test_slow_result_answers_503(self):
+        # The first job also waits for the worker to start and set up Django
+        executor = self.use_executor(1, 0, 0.01)
+        self.assertEqual(self.login().status_code, 503)
+        self.assertEqual(executor.stats()["timeouts"], 1)
+
+    def test_pool_recovers_after_a_worker_dies(self):
+        executor = self.use_executor(1, 2, 10)
+        with self.assertRaises(hashing.HashingPoolBusy):
+            executor.run(os._exit, 1)
+        self.assertEqual(executor.run(pow, 2, 3), 8)
+        self.assertEqual(executor.stats()["restarts"], 1)
+
+    def test_no_workers_hashes_inline(self):
+        executor = self.use_executor(0, 0, 5)
+        self.assertEqual(executor.run(os.getpid), os.getpid())
+        self.assertIsNone(executor._pool)
+        self.assertEqual(self.login().status_code, 401)
+
+    def test_stats_are_admin_only(self):
+        self.assertNotIn("password_hashing", self.client.get("/api/v1/healthz/").json())
+        self.assertEqual(self.client.get("/api/v1/healthz/hashing/").status_code, 401)
+        admin = User(email="admin@example.com", first_name="Ama", last_name="Mensah", role="admin")
+        admin.set_unusable_password()
+        admin.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(admin)['access']}")
+        response = self.client.get("/api/v1/healthz/hashing/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("rejected", response.json()["password_hashing"])
+
+
+
+class GoogleLoginTests(TestCase):
+    AUDIENCE = "test-client.apps.googleusercontent.com"
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        patcher = mock.patch.object(google_auth, "_verifier", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.issuer = google_auth.LocalIssuer()
+        self.verifier = google_auth.set_google_key_source(self.issuer, audience=self.AUDIENCE)
+        self.client = APIClient()
+
+    def login(self, token):
+        return self.client.post("/api/v1/login/", {"token": token}, format="json")
+
+    def test_valid_token_logs_in(self):
+        token = self.issuer.issue(self.AUDIENCE, "Ama@Example.com", given_name="Ama", family_name="Mensah")
+        response = self.login(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["email"], "ama@example.com")
+        self.assertEqual(User.objects.get(email="ama@example.com").first_name, "Ama")
+
+    def test_invalid_tokens_are_rejected(self):
+        tokens = {
+            "audience": self.issuer.issue("someone-else", "ama@example.com"),
+            "issuer": self.issuer.issue(self.AUDIENCE, "ama@example.com", iss="https://evil.example.com"),
+            "expired": self.issuer.issue(self.AUDIENCE, "ama@example.com", lifetime=-3600),
+            "key id": google_auth.LocalIssuer(key_id="other-key").issue(self.AUDIENCE, "ama@example.com"),
+        }
+        for case, token in tokens.items():
+            with self.subTest(case):
+                self.assertEqual(self.login(token).status_code, 400)
+        self.assertFalse(User.objects.exists())
+
+    def test_unknown_key_refresh_is_rate_limited(self):
+        stranger = google_auth.LocalIssuer(key_id="other-key")
+        with mock.patch.object(self.issuer, "fetch", wraps=self.issuer.fetch) as fetch:
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    self.verifier.verify(stranger.issue(self.AUDIENCE, "ama@example.com"))
+        # The first token loads the certs and refreshes once for its key id;
+        # the second, inside unknown_key_interval, fetches nothing
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_stale_certs_are_served_when_refresh_fails(self):
+        certs = google_auth.CachedCerts(self.issuer)
+        current = certs.get()
+        certs._expires_at = time.time() - 1  # expired, within stale_grace
+        with mock.patch.object(self.issuer, "fetch", side_effect=ConnectionError):
+            self.assertEqual(certs.get(), current)
+
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        self.user = SampleData().make_parent()
+        self.access = get_tokens_for_user(self.user)["access"]
+
+    def authenticate(self):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_cached_user_needs_no_queries(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().pk, self.user.pk)
+
+    def test_version_bump_revokes_access_tokens(self):
+        self.authenticate()
+        revoke_tokens(User.objects.filter(pk=self.user.pk), bump_version=True)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        response = APIClient().get("/api/v1/profile/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_drops_the_cached_user(self):
+        self.authenticate()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()  # post_save invalidates the cached copy
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+
+@override_settings(TOKEN_LIFECYCLE={"JTI_INDEX": True})
+class TokenLifecycleTests(TestCase):
+    def setUp(self):
+        self.user = SampleData().make_parent()
+        refresh = [get_tokens_for_user(self.user)["refresh"] for _ in range(5)]
+        self.expired_ids = list(OutstandingToken.objects.order_by("pk").values_list("pk", flat=True)[:3])
+        OutstandingToken.objects.filter(pk__in=self.expired_ids).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        self.live_token = refresh[-1]
+
+    def index(self):
+        return set(RevokedJti.objects.values_list("digest", flat=True))
+
+    def blacklist_digests(self):
+        return {jti_digest(jti) for jti in BlacklistedToken.objects.values_list("token__jti", flat=True)}
+
+    def test_purge_deletes_expired_rows_in_batches(self):
+        for token in OutstandingToken.objects.filter(pk__in=self.expired_ids[:2]):
+            BlacklistedToken.objects.create(token=token)  # indexed by the post_save receiver
+        revoke_tokens([self.user])  # the two live tokens; indexes them itself
+        self.assertEqual(self.index(), self.blacklist_digests())
+
+        stats = purge_expired_tokens(batch_size=2, pause=0)
+
+        self.assertEqual((stats["deleted"], stats["batches"], stats["index_deleted"]), (3, 2, 2))
+        self.assertFalse(OutstandingToken.objects.filter(pk__in=self.expired_ids).exists())
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+        self.assertEqual(self.index(), self.blacklist_digests())
+        with self.assertRaises(TokenError):
+            IndexedRefreshToken(self.live_token)
+
+    def test_rebuild_matches_the_blacklist(self):
+        revoke_tokens([self.user])
+        RevokedJti.objects.all().delete()
+        self.assertEqual(rebuild_jti_index(), 2)
+        self.assertEqual(self.index(), self.blacklist_digests())
+
+
+class OutboxTests(TestCase):
+    def test_body_is_cleared_once_sent(self):
+        email = enqueue_mail("Reset", "https://example.com/reset/uid/token/", ["a@example.com"])
+        self.assertEqual(drain_outbox()["sent"], 1)
+        self.assertEqual(mail.outbox[0].body, "https://example.com/reset/uid/token/")
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body), (OutboundEmail.STATUS_SENT, ""))
+
+    def test_purge_keeps_pending_and_recent_rows(self):
+        old = timezone.now() - timedelta(days=31)
+        pending = enqueue_mail("Pending", "body", ["a@example.com"])
+        sent = enqueue_mail("Sent", "", ["a@example.com"])
+        recent = enqueue_mail("Recent", "", ["a@example.com"])
+        OutboundEmail.objects.filter(pk__in=[pending.pk, sent.pk]).update(next_attempt_at=old)
+        OutboundEmail.objects.filter(pk__in=[sent.pk, recent.pk]).update(status=OutboundEmail.STATUS_SENT)
+        self.assertEqual(purge_outbox(), 1)
+        self.assertQuerySetEqual(
+            OutboundEmail.objects.order_by("pk").values_list("subject", flat=True), ["Pending", "Recent"]
+        )
+
+
+
+class PeriodicCommandTests(TestCase):
+    """The --every loop shared by send_outbox, purge_tokens and the other worker commands."""
+
+    class Stop(BaseException):
+        pass
+
+    def run_worker(self, runs, *args):
+        """Run send_outbox --every until ``runs`` runs are done; returns close_old_connections calls."""
+        sleeps = mock.patch("time.sleep", side_effect=[None] * (runs - 1) + [self.Stop()])
+        with sleeps, mock.patch("api.management.periodic.close_old_connections") as close:
+            with self.assertRaises(self.Stop):
+                call_command("send_outbox", "--every", "5", *args, stdout=io.StringIO())
+        return close.call_count
+
+    def test_one_shot_run_raises(self):
+        with mock.patch("api.management.commands.send_outbox.drain_outbox", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                call_command("send_outbox", stdout=io.StringIO())
+
+    def test_worker_logs_failed_run_and_keeps_going(self):
+        enqueue_mail("Reset", "body", ["a@example.com"])
+        failures = iter([RuntimeError("db down")])
+
+        def flaky_drain(**kwargs):
+            error = next(failures, None)
+            if error:
+                raise error
+            return drain_outbox(**kwargs)
+
+        with mock.patch("api.management.commands.send_outbox.drain_outbox", side_effect=flaky_drain):
+            with self.assertLogs("api.management.periodic", "ERROR") as logs:
+                closes = self.run_worker(2)
+        self.assertIn("db down", "\n".join(logs.output))
+        self.assertEqual(len(mail.outbox), 1)
+        # Connections are recycled before and after every run, failed or not
+        self.assertEqual(closes, 4)
+
+class RegisterTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"register": 5}
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        self.client = APIClient()
+
+    def register(self, **data):
+        payload = {
+            "email": "new@example.com",
+            "password": PASSWORD,
+            "confirm_password": PASSWORD,
+            "first_name": "Ama",
+            "last_name": "Mensah",
+            **data,
+        }
+        return self.client.post("/api/v1/register/", payload, format="json")
+
+    def test_parent_phone_is_stored_normalised(self):
+        response = self.register(phone_number="024 123 4567")
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email="new@example.com")
+        self.assertEqual(user.phone_number, "+233241234567")
+        self.assertEqual(user.parent_profile.phone_number, "+233241234567")
+
+    def test_parent_phone_must_be_a_ghana_mobile(self):
+        response = self.register(phone_number="0311234567")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("phone_number", response.json()["errors"])
+
+    def test_role_cannot_be_chosen(self):
+        response = self.register(role="teacher", phone_number="024 123 4567")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(User.objects.get(email="new@example.com").role, "parent")
+
+    def test_query_budget(self):
+        self.assertQueryBudget("register", lambda: self.register(phone_number="0249999999"))
+
+    def test_invalid_email_message(self):
+        response = self.register(email="not-an-email")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["message"], "Invalid email format")
+
+
+def import_row(n):
+    return {
+        "first_name": "Kofi",
+        "last_name": "Boateng",
+        "current_class": "P1",
+        "parents": [{
+            "email": f"parent{n}@example.com",
+            "first_name": "Akua",
+            "last_name": "Boateng",
+            "phone_number": f"024{n:07d}",
+        }],
+    }
+
+
+class StudentImportTests(TestCase):
+    def test_malformed_jsonl_line_fails_only_that_row(self):
+        lines = [json.dumps(import_row(1)), "{not json", json.dumps(import_row(2))]
+        report = StudentImporter(chunk_size=1).run(read_rows(io.StringIO("\n".join(lines)), "jsonl"))
+        self.assertEqual((report.created_students, report.failed, report.stopped), (2, 1, None))
+        self.assertEqual(report.errors[0]["row"], 2)
+
+    def test_unreadable_input_imports_rows_read_before_it(self):
+        def rows():
+            yield import_row(1)
+            yield import_row(2)
+            raise ValueError("truncated input")
+
+        report = StudentImporter(chunk_size=10).run(rows())
+        self.assertEqual(report.created_students, 2)
+        self.assertEqual(report.stopped, {"row": 3, "error": "truncated input"})
+        self.assertEqual(Student.objects.count(), 2)
+
+
+class StudentSearchTests(TestCase):
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        # A fresh in-process index, built from this test's data on first use
+        patcher = mock.patch.object(search, "_index", search.StudentSearchIndex(ttl=3600))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.parent = User.objects.create_user(
+            "ama@example.com", PASSWORD, "Ama", "Mensah", phone_number="0241234567"
+        )
+        other = User.objects.create_user(
+            "kofi@example.com", PASSWORD, "Kofi", "Boateng", phone_number="0241234568"
+        )
+        students = assign_student_ids([
+            Student(first_name="Yaw", last_name="Asante", current_class="P1") for _ in range(301)
+        ])
+        Student.objects.bulk_create(students)
+        through = Student.parents.through
+        through.objects.bulk_create(
+            [through(student_id=student.pk, parent_id=other.parent_profile.pk) for student in students[:-1]]
+            + [through(student_id=students[-1].pk, parent_id=self.parent.parent_profile.pk)]
+        )
+        self.child = students[-1]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.parent)['access']}")
+
+    def test_scoped_prefix_search_finds_child_behind_other_students(self):
+        # 300 other students' IDs sort before the child's under "sa"
+        response = self.client.get("/api/v1/students/search/", {"q": "sa"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["student_id"] for row in response.json()["results"]], [self.child.student_id])
+
+    def test_scoped_search_ranks_and_filters(self):
+        response = self.client.get("/api/v1/students/search/", {"q": "asnte"})  # typo
+        self.assertEqual(response.json()["count"], 1)
+        response = self.client.get("/api/v1/students/search/", {"q": "mensah"})
+        self.assertEqual(response.json()["count"], 0)
+
+
+class SyncTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "sync_full": 4,
+        "sync_quiet": 4,  # nothing changed: user, parents, students, tombstones
+    }
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        get_allocator().ensure_counter()
+        self.data = SampleData()
+        self.user = self.data.make_parent()
+        self.client = authed_client(self.user)
+
+    def test_out_of_range_token_is_rejected(self):
+        response = self.client.get("/api/v1/sync/", {"since": "300000000000000000"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_future_token_is_rejected(self):
+        self.data.make_students(self.user, 1)
+        token = make_token(timezone.now() + timedelta(seconds=sync_setting("OVERLAP") + 60))
+        response = self.client.get("/api/v1/sync/", {"since": token})
+        self.assertEqual(response.status_code, 400)
+        # Within clock skew of OVERLAP seconds it is still accepted
+        token = make_token(timezone.now() + timedelta(seconds=sync_setting("OVERLAP") - 1))
+        self.assertEqual(self.client.get("/api/v1/sync/", {"since": token}).status_code, 200)
+
+    def test_sync_full(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            self.data.make_students(user, size)
+            client = authed_client(user)
+            return lambda: client.get("/api/v1/sync/")
+        self.assertScales("sync_full", scenario)
+
+    def test_sync_quiet(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            students = self.data.make_students(user, size)
+            # Written an hour ago, so nothing changed since a token from now
+            earlier = timezone.now() - timedelta(hours=1)
+            Student.objects.filter(pk__in=[student.pk for student in students]).update(updated_at=earlier)
+            Parent.objects.filter(students__in=students).update(updated_at=earlier)
+            token = make_token(timezone.now())
+            client = authed_client(user)
+            return lambda: client.get("/api/v1/sync/", {"since": token})
+        self.assertScales("sync_quiet", scenario)
+
+    def test_user_change_resends_parent_profile(self):
+        token = self.client.get("/api/v1/sync/").json()["token"]
+        Parent.objects.filter(user=self.user).update(updated_at=timezone.now() - timedelta(hours=1))
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Akosua"
+        user.save()
+        response = self.client.get("/api/v1/sync/", {"since": token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["user"]["first_name"] for p in response.json()["parents"]], ["Akosua"])
+
+
+class ForceLogoutClassTests(TestCase):
+    def test_only_parents_of_active_students_are_logged_out(self):
+        users = []
+        for n, is_active in enumerate([True, False]):
+            user = User(email=f"parent{n}@example.com", first_name="Ama", last_name="Mensah",
+                        phone_number=f"024123456{n}")
+            user.set_unusable_password()
+            user.save()
+            student = Student.objects.create(
+                first_name="Kofi", last_name="Boateng", current_class="P1", is_active=is_active
+            )
+            student.parents.add(user.parent_profile)
+            get_tokens_for_user(user)
+            users.append(user)
+        self.assertEqual(force_logout_class("P1"), 1)
+        self.assertEqual(
+            [User.objects.get(pk=user.pk).token_version for user in users],
+            [users[0].token_version + 1, users[1].token_version],
+        )
+
+
+class LoginTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "login": 3,  # the user SELECT, one login-state UPDATE, the token INSERT
+    }
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        self.data = SampleData()
+
+    def test_query_budget(self):
+        user = self.data.make_parent(password=PASSWORD)
+        client = APIClient()
+        self.assertQueryBudget("login", lambda: client.post(
+            "/api/v1/login/", {"email": user.email, "password": PASSWORD}, format="json"
+        ))
+
+
+class StudentWriteTests(QueryBudgetMixin, TestCase):
+    """Creating and updating students with their guardians, at fixed query cost."""
+
+    query_budgets = {
+        # Includes reserving a block of student numbers (SAVEPOINT, UPDATE,
+        # SELECT, RELEASE): the test transaction never commits, so the rest of
+        # each block is never reused
+        "student_create": 13,
+        "student_update": 10,
+    }
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        get_allocator().ensure_counter()
+        self.data = SampleData()
+
+    def test_student_create(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            guardians = [user.pk] + self.data.make_guardians(size)
+            client = authed_client(user)
+            return lambda: client.post("/api/v1/students/", {
+                "first_name": "Kofi", "last_name": "Boateng", "current_class": "P1", "parent_users": guardians,
+            }, format="json")
+        self.assertScales("student_create", scenario)
+
+    def test_student_update(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            student = self.data.make_students(user, 1, co_parent=False)[0]
+            guardians = [user.pk] + self.data.make_guardians(size)
+            client = authed_client(user)
+            return lambda: client.patch(
+                f"/api/v1/students/{student.pk}/", {"parent_users": guardians}, format="json"
+            )
+        self.assertScales("student_update", scenario)
+
+
+class CursorPaginationTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "students_cursor": 4,  # no COUNT(*)
+    }
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        self.data = SampleData()
+
+    def test_pages_cover_every_student_once(self):
+        user = self.data.make_parent()
+        students = self.data.make_students(user, 5)
+        client = authed_client(user)
+        seen, url = [], "/api/v1/students/?pagination=cursor&page_size=2"
+        while url:
+            body = client.get(url).json()
+            self.assertNotIn("count", body)
+            seen += [row["student_id"] for row in body["results"]]
+            url = body["next"]
+        # Ordered by student_number, which follows student_id
+        self.assertEqual(seen, [student.student_id for student in students])
+
+    def test_query_budget(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            self.data.make_students(user, size)
+            client = authed_client(user)
+            return lambda: client.get("/api/v1/students/?pagination=cursor")
+        self.assertScales("students_cursor", scenario)
+
+
+class ConditionalGetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        # Revalidation answered with 304: the validator aggregate only
+        "students_not_modified": 1,
+        "student_detail_not_modified": 1,
+        "parents_not_modified": 1,
+    }
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        self.data = SampleData()
+
+    def revalidate(self, user, url):
+        """A GET of ``url`` sending back the ETag of a first, unmeasured one."""
+        client = authed_client(user)
+        etag = client.get(url)["ETag"]
+
+        def fetch():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            return response
+        return fetch
+
+    def test_changed_student_gets_a_new_etag(self):
+        user = self.data.make_parent()
+        student = self.data.make_students(user, 1)[0]
+        client = authed_client(user)
+        url = f"/api/v1/students/{student.pk}/"
+        etag = client.get(url)["ETag"]
+        student.current_class = "P2"
+        student.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_students_not_modified(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            self.data.make_students(user, size)
+            return self.revalidate(user, "/api/v1/students/")
+        self.assertScales("students_not_modified", scenario)
+
+    def test_student_detail_not_modified(self):
+        user = self.data.make_parent()
+        student = self.data.make_students(user, 1)[0]
+        self.assertQueryBudget(
+            "student_detail_not_modified", self.revalidate(user, f"/api/v1/students/{student.pk}/")
+        )
+
+    def test_parents_not_modified(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            self.data.make_students(user, size)
+            return self.revalidate(user, "/api/v1/parents/")
+        self.assertScales("parents_not_modified", scenario)
+
+
+class ParentReadModelTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "parents_batch": 1,  # ParentSerializer over with_stats()
+    }
+
+    def setUp(self):
+        self.data = SampleData()
+
+    def test_with_stats_counts_active_children_only(self):
+        user = self.data.make_parent()
+        students = self.data.make_students(user, 3, co_parent=False)
+        students[0].is_active = False
+        students[0].save()
+        parent = Parent.objects.filter(user=user).with_stats().get()
+        with self.assertNumQueries(0):
+            data = ParentSerializer(parent).data
+        self.assertEqual(data["full_name"], "Ama Mensah")
+        self.assertEqual(data["display_phone"], "0" + user.phone_number[4:])
+        self.assertEqual(data["total_children"], 2)
+
+    def test_query_budget(self):
+        def scenario(size):
+            users = [self.data.make_parent() for _ in range(size)]
+            for user in users:
+                self.data.make_students(user, 2, co_parent=False)
+            parents = Parent.objects.filter(user__in=users).with_stats()
+            return lambda: ParentSerializer(parents, many=True).data
+        self.assertScales("parents_batch", scenario)
+
+
+# Most queries each hot path may run. GETs of lists and details include the
+# conditional-GET validator aggregate.
+QUERY_BUDGETS = {
+    "students_list": 5,
+    "student_detail": 4,
+    "parents_list": 4,
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Query counts of the hot API paths. List paths are measured with one item
+    and with a full page, and must cost the same for both.
+    """
+
+    query_budgets = QUERY_BUDGETS
+
+    def setUp(self):
+        use_local_bucket_store(self)
+        user_cache.clear()
+        get_allocator().ensure_counter()
+        self.data = SampleData()
+
+    # ============================
+    # Helpers
+    # ============================
+    def get(self, user, url):
+        client = authed_client(user)
+        return lambda: client.get(url)
+
+    # ============================
+    # Students and parents
+    # ============================
+    def test_students_list(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            self.data.make_students(user, size)
+            return self.get(user, "/api/v1/students/")
+        self.assertScales("students_list", scenario)
+
+    def test_student_detail(self):
+        user = self.data.make_parent()
+        student = self.data.make_students(user, 1)[0]
+        self.assertQueryBudget("student_detail", self.get(user, f"/api/v1/students/{student.pk}/"))
+
+    def test_parents_list(self):
+        def scenario(size):
+            user = self.data.make_parent()
+            self.data.make_students(user, size)
+            return self.get(user, "/api/v1/parents/")
+        self.assertScales("parents_list", scenario)
@@ -0,0 +1,216 @@
+"""
+Token-bucket throttling shared across worker processes.
+
+DRF's SimpleRateThrottle keeps a list of request timestamps per client in the
+cache and rewrites the whole list on every check; with the default LocMemCache
+each gunicorn worker also keeps its own copy, so limits scale with the worker
+count. Here each client has a single (tokens, updated_at) bucket in a store
+shared by all workers on the host, refilled continuously at ``rate``.
+
+Configure the store through ``settings.THROTTLE_STORE``:
+    BACKEND  dotted path of a BucketStore class
+    OPTIONS  keyword arguments for the backend
+"""
+import abc
+import hashlib
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+BucketState = namedtuple("BucketState", ["allowed", "remaining", "retry_after", "reset"])
+
+
+# ============================
+# Stores
+# ============================
+class BucketStore(abc.ABC):
+    """Atomically refill and take one token from the bucket stored under ``key``."""
+
+    @abc.abstractmethod
+    def take(self, key, capacity, refill_rate):
+        """Return the BucketState after taking one token (if one was available)."""
+
+    @staticmethod
+    def _apply(tokens, updated_at, capacity, refill_rate, now):
+        if tokens is None:
+            tokens = float(capacity)
+        else:
+            tokens = min(float(capacity), tokens + (now - updated_at) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        retry_after = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+        reset = (capacity - tokens) / refill_rate
+        return tokens, BucketState(allowed, int(tokens), retry_after, reset)
+
+
+class LocalBucketStore(BucketStore):
+    """In-process store. Limits are per worker; meant for tests and runserver."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (None, now))
+            tokens, state = self._apply(tokens, updated_at, capacity, refill_rate, now)
+            self._buckets[key] = (tokens, now)
+        return state
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Buckets in a local SQLite file (WAL mode), shared by every process on the
+    host. Each check is one primary-key read and one upsert inside a
+    ``BEGIN IMMEDIATE`` transaction.
+    """
+
+    prune_probability = 0.001
+
+    def __init__(self, path, timeout=0.5):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, capacity, refill_rate):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, state = self._apply(
+                row[0] if row else None, row[1] if row else now, capacity, refill_rate, now
+            )
+            conn.execute(
+                "INSERT INTO token_bucket (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, "
+                "updated_at = excluded.updated_at, full_at = excluded.full_at",
+                (key, tokens, now, now + state.reset),
+            )
+            if random.random() < self.prune_probability:
+                # A full bucket is indistinguishable from a missing one.
+                conn.execute("DELETE FROM token_bucket WHERE full_at < ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                conf = getattr(settings, "THROTTLE_STORE", {})
+                backend = import_string(conf.get("BACKEND", "api.throttling.LocalBucketStore"))
+                _store = backend(**conf.get("OPTIONS", {}))
+    return _store
+
+
+# ============================
+# Throttle classes
+# ============================
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Drop-in replacement for UserRateThrottle using a shared token bucket.
+    Authenticated users are keyed by id, anonymous clients by IP. Set
+    ``include_email = True`` to also give each submitted email its own
+    bucket: a request must then pass both, so rotating emails does not
+    lift the per-client limit and spreading one email over many clients
+    does not lift the per-email one.
+    """
+
+    scope = None
+    rate = None
+    include_email = False
+
+    def __init__(self):
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.refill_rate = self.num_requests / self.duration
+        self.state = None
+
+    def parse_rate(self, rate):
+        num, period = rate.split("/")
+        duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+        return int(num), duration
+
+    def get_keys(self, request, view):
+        """Bucket keys the request draws from, client first."""
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        keys = [f"throttle:{self.scope}:{ident}"]
+        if self.include_email:
+            email = str(request.data.get("email", "")).strip().lower() if hasattr(request.data, "get") else ""
+            if email:
+                keys.append(f"throttle:{self.scope}:email:" + hashlib.sha256(email.encode()).hexdigest()[:16])
+        return keys
+
+    def allow_request(self, request, view):
+        store = get_bucket_store()
+        for key in self.get_keys(request, view):
+            try:
+                self.state = store.take(key, self.num_requests, self.refill_rate)
+            except Exception as e:
+                # Fail open: a throttle store problem should not take the API down.
+                logger.error(f"Throttle store unavailable: {e}")
+                return True
+            record_rate_limit(request, self.num_requests, self.state)
+            if not self.state.allowed:
+                # Later buckets keep their tokens: a client over its own
+                # limit cannot drain another email's bucket
+                return False
+        return True
+
+    def wait(self):
+        if self.state is None:
+            return None
+        return self.state.retry_after
+
+
+def record_rate_limit(request, limit, state):
+    """Keep the most restrictive bucket seen for this request for the headers."""
+    http_request = getattr(request, "_request", request)
+    current = getattr(http_request, "rate_limit", None)
+    if current is None or state.remaining < current["remaining"]:
+        http_request.rate_limit = {
+            "limit": limit,
+            "remaining": state.remaining,
+            "reset": math.ceil(state.reset),
+        }
@@ -0,0 +1,197 @@
+"""
+Refresh token revocation and lifecycle.
+
+Blacklisting a user's tokens used to be a get_or_create per OutstandingToken
+(2N queries). ``revoke_tokens`` blacklists every live, not-yet-blacklisted
+token for any number of users in a single INSERT ... SELECT.
+
+Nothing else ever removes rows from the simplejwt token tables, so
+``purge_expired_tokens`` deletes expired ones in short batches (see the
+``purge_tokens`` management command). With TOKEN_LIFECYCLE["JTI_INDEX"] on,
+blacklisted jtis are also kept as 64-bit digests in ``RevokedJti`` and
+``IndexedRefreshToken`` checks that table instead of joining the history.
+
+Configure through ``settings.TOKEN_LIFECYCLE``:
+    PURGE_BATCH_SIZE  tokens deleted per batch/transaction
+    PURGE_PAUSE       seconds to sleep between batches
+    JTI_INDEX         maintain and use the RevokedJti digest index
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import user_cache
+from .models import RevokedJti
+
+DEFAULT_LIFECYCLE_SETTINGS = {
+    "PURGE_BATCH_SIZE": 1000,
+    "PURGE_PAUSE": 0.05,
+    "JTI_INDEX": False,
+}
+
+
+def lifecycle_setting(name):
+    return {**DEFAULT_LIFECYCLE_SETTINGS, **getattr(settings, "TOKEN_LIFECYCLE", {})}[name]
+
+
+# ============================
+# Hashed jti index
+# ============================
+def jti_digest(jti):
+    """Signed 64-bit digest of a jti, the RevokedJti primary key."""
+    return int.from_bytes(hashlib.blake2b(jti.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def index_revoked(tokens):
+    """Add ``(jti, expires_at)`` pairs to the RevokedJti index."""
+    RevokedJti.objects.bulk_create(
+        [RevokedJti(digest=jti_digest(jti), expires_at=expires_at) for jti, expires_at in tokens],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+
+def rebuild_jti_index():
+    """Re-create the index from the blacklist. Returns the number of rows indexed."""
+    with transaction.atomic():
+        RevokedJti.objects.all().delete()
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list(
+            "token__jti", "token__expires_at"
+        )
+        index_revoked(live.iterator(chunk_size=2000))
+        return RevokedJti.objects.count()
+
+
+class IndexedRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check uses the RevokedJti index when enabled."""
+
+    def check_blacklist(self):
+        if not lifecycle_setting("JTI_INDEX"):
+            return super().check_blacklist()
+        jti = self.payload[jwt_settings.JTI_CLAIM]
+        if RevokedJti.objects.filter(pk=jti_digest(jti)).exists():
+            raise TokenError(_("Token is blacklisted"))
+
+
+# ============================
+# Revocation
+# ============================
+
+
+def _user_ids(users):
+    """Queryset of user ids from a User queryset, instances or raw ids."""
+    if isinstance(users, QuerySet):
+        return users.order_by().values("pk")
+    User = get_user_model()
+    return User.objects.filter(pk__in=[getattr(u, "pk", u) for u in users]).values("pk")
+
+
+def revoke_tokens(users, bump_version=False):
+    """
+    Blacklist all live refresh tokens of ``users``; safe to call repeatedly.
+    Expired and already blacklisted tokens are skipped. With
+    ``bump_version`` the users' access tokens are revoked too (force logout).
+    Returns the number of tokens blacklisted.
+    """
+    user_ids = _user_ids(users)
+    user_sql, user_params = user_ids.query.sql_with_params()
+    now = timezone.now()
+    outstanding = OutstandingToken._meta.db_table
+    blacklisted = BlacklistedToken._meta.db_table
+    sql = (
+        f"INSERT INTO {blacklisted} (token_id, blacklisted_at) "
+        f"SELECT o.id, %s FROM {outstanding} o "
+        f"WHERE o.user_id IN ({user_sql}) AND o.expires_at > %s "
+        f"AND NOT EXISTS (SELECT 1 FROM {blacklisted} b WHERE b.token_id = o.id)"
+    )
+    with transaction.atomic():
+        if lifecycle_setting("JTI_INDEX"):
+            index_revoked(
+                OutstandingToken.objects.filter(user_id__in=user_ids, expires_at__gt=now)
+                .order_by()
+                .values_list("jti", "expires_at")
+            )
+        with connection.cursor() as cursor:
+            stamp = connection.ops.adapt_datetimefield_value(now)
+            cursor.execute(sql, [stamp, *user_params, stamp])
+            revoked = cursor.rowcount
+        if bump_version:
+            User = get_user_model()
+            ids = list(user_ids.values_list("pk", flat=True))
+            User.objects.filter(pk__in=ids).update(token_version=F("token_version") + 1)
+            # update() sends no post_save, so drop this process's cached users here
+            for pk in ids:
+                user_cache.invalidate(pk)
+    return revoked
+
+
+def force_logout_class(class_name):
+    """Revoke every token of the parents of active students in ``class_name``."""
+    User = get_user_model()
+    # One join; is_active lets it use the partial index on current_class
+    users = User.objects.filter(
+        parent_profile__students__current_class=class_name,
+        parent_profile__students__is_active=True,
+    ).distinct()
+    return revoke_tokens(users, bump_version=True)
+
+
+# ============================
+# Lifecycle
+# ============================
+def token_table_sizes():
+    return {
+        "outstanding": OutstandingToken.objects.count(),
+        "blacklisted": BlacklistedToken.objects.count(),
+        "jti_index": RevokedJti.objects.count(),
+    }
+
+
+def purge_expired_tokens(batch_size=None, pause=None, max_batches=None):
+    """
+    Delete expired outstanding tokens (and their blacklist rows) in batches,
+    each in its own short transaction so no long lock is held.
+    Returns purge statistics.
+    """
+    batch_size = batch_size or lifecycle_setting("PURGE_BATCH_SIZE")
+    pause = lifecycle_setting("PURGE_PAUSE") if pause is None else pause
+    now = timezone.now()
+    started = time.monotonic()
+    deleted = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[1].get(
+                OutstandingToken._meta.label, 0
+            )
+        batches += 1
+        if pause:
+            time.sleep(pause)
+
+    index_deleted = RevokedJti.objects.filter(expires_at__lte=now).delete()[0]
+    elapsed = time.monotonic() - started
+    return {
+        "deleted": deleted,
+        "index_deleted": index_deleted,
+        "batches": batches,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(deleted / elapsed, 1) if elapsed else 0.0,
+    }
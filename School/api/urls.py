@@ -6,6 +6,7 @@ app_name = 'api'
 urlpatterns = [
     path('', views.api_root, name='api-root'),
     path('healthz/', views.health_check, name='health-check'),
+    path('healthz/hashing/', views.hashing_pool_stats, name='hashing-pool-stats'),
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.unified_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
@@ -16,8 +17,13 @@ urlpatterns = [
     path('profile/', views.user_profile, name='profile'),
     path('users/', views.UserViewSet.as_view({'get': 'list'}), name='users'),
     path('parents/', views.ParentViewSet.as_view({'get': 'list'}), name='parents'),
+    path('parents/<int:pk>/', views.ParentViewSet.as_view({'get': 'retrieve'}), name='parent-detail'),
     path('students/', views.StudentViewSet.as_view({'get': 'list', 'post': 'create'}), name='students'),
-    path('students/<int:pk>/', views.StudentViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'update', 'delete': 'destroy'}), name='student-detail'),
+    path('students/search/', views.StudentViewSet.as_view({'get': 'search'}), name='student-search'),
+    path('students/import/', views.StudentImportView.as_view(), name='student-import'),
+    path('students/<int:pk>/', views.StudentViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name='student-detail'),
+    path('classes/summary/', views.class_summary, name='class-summary'),
+    path('sync/', views.sync, name='sync'),
     # Auth endpoints for frontend compatibility
     path('auth/', include([
         path('login/', views.unified_login, name='auth-login'),
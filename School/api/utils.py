@@ -1,30 +1,67 @@
-#ifrom django.core.mail import send_mail
-from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import connections
+import re
 
 
-def send_safe_mail(subject, message, recipient_list):
-    """
-    Send an email safely using Django's email backend.
+EMAIL_RE = re.compile(
+    r"^[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?"
+    r"(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$"
+)
 
-    Args:
-        subject (str): Email subject
-        message (str): Email message body
-        recipient_list (list): List of recipient email addresses
 
-    Returns:
-        int: Number of successfully sent emails
+def validate_email_format(email: str) -> bool:
+    """
+    Validate email format using Django's validator and a more comprehensive regex.
     """
+    if not email or len(email) > 254:  # RFC 5321 limit
+        return False
+    # Cheap precompiled regex first; most bad input never reaches the validator
+    if EMAIL_RE.match(email) is None:
+        return False
     try:
-        return send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            fail_silently=False,
-        )
-    except Exception as e:
-        # Log the error but don't raise it to avoid breaking the application
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Failed to send email: {e}")
-        return 0
\ No newline at end of file
+        validate_email(email)
+    except DjangoValidationError:
+        return False
+    return True
+
+
+def unique_violation_fields(exc, fields):
+    """
+    Return the subset of ``fields`` (column names) named in a unique-constraint
+    IntegrityError, for both PostgreSQL and SQLite error messages.
+    """
+    cause = getattr(exc, "__cause__", None)
+    diag = getattr(cause, "diag", None)
+    text = f"{exc} {getattr(diag, 'constraint_name', '') or ''}"
+    return [
+        field for field in fields
+        if f"({field})" in text or f".{field}" in text or f"_{field}_" in text
+    ]
+
+
+class QueryCounter:
+    """
+    Count queries run on a connection. Uses an execute wrapper, so it works
+    with DEBUG off and adds no per-query logging.
+
+        with QueryCounter() as counter:
+            ...
+        counter.count
+    """
+
+    def __init__(self, using="default"):
+        self.using = using
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
@@ -1,36 +1,52 @@
+import io
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.tokens import PasswordResetTokenGenerator, default_token_generator
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.core.validators import validate_email
+from django.db.models import IntegerField, Max, Prefetch
+from django.db.models.functions import Cast
 from django.utils import timezone
 from django.utils.encoding import force_str, force_bytes, DjangoUnicodeDecodeError
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
-from django.db import transaction
 
 from rest_framework import status, viewsets, generics, permissions, throttling
-from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from django.views.decorators.csrf import csrf_exempt
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-
-import re
 
 from Parent.models import Parent 
-from Student.models import Student
+from Student.models import ClassRoster, Student
+from Users.lockout import get_lockout
+from Users.login_state import record_login
 from .serializers import (
     UserSerializer,
     ParentSerializer,
     StudentSerializer,
     RegisterSerializer,
 )
-from .utils import send_safe_mail
+from .conditional import ConditionalGetMixin
+from .bulk_import import FORMATS, StudentImporter, format_for, read_rows
+from .outbox import enqueue_mail
+from .search import search_students
+from .sync import make_token, removed_student_ids, sync_window
+from .utils import QueryCounter, validate_email_format
+from .authentication import token_claims
+from .google_auth import get_google_verifier
+from .throttling import TokenBucketThrottle
+from .tokens import IndexedRefreshToken, revoke_tokens
+from .hashing import (
+    HashingPoolBusy,
+    check_user_password,
+    dummy_check_password,
+    get_executor,
+    set_user_password,
+)
 
 
 User = get_user_model()
@@ -40,7 +56,10 @@ User = get_user_model()
 # Helpers
 # ============================
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = IndexedRefreshToken.for_user(user)
+    # Signed claims let ClaimsJWTAuthentication skip the user lookup
+    for claim, value in token_claims(user).items():
+        refresh[claim] = value
     return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
 
@@ -48,57 +67,78 @@ def normalize_email(email: str) -> str:
     return email.strip().lower()
 
 
-def validate_email_format(email: str) -> bool:
-    """
-    Validate email format using Django's validator and a more comprehensive regex.
-    """
-    if not email or len(email) > 254:  # RFC 5321 limit
-        return False
-    try:
-        validate_email(email)
-        # More comprehensive regex that handles international domains and special characters
-        return re.match(r"^[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$", email) is not None
-    except DjangoValidationError:
-        return False
-
-
 def blacklist_all_user_refresh_tokens(user):
     """
     Blacklist all outstanding refresh tokens for the given user.
     Safe to call multiple times.
     """
-    for outstanding in OutstandingToken.objects.filter(user=user):
-        BlacklistedToken.objects.get_or_create(token=outstanding)
+    return revoke_tokens([user])
+
+
+def parents_for(user):
+    """The user's parent profile, shaped for ParentSerializer."""
+    # ParentSerializer reads the nested user, full_name and total_children
+    return Parent.objects.filter(user=user).with_stats()
+
+
+def students_for(user):
+    """Students the user is a parent of, shaped for StudentSerializer."""
+    # Joined through the user id so the Parent profile needs no query of
+    # its own; parent_users only needs each parent's user_id
+    return Student.objects.filter(parents__user=user).prefetch_related(
+        Prefetch('parents', queryset=Parent.objects.only('id', 'user_id').order_by())
+    )
+
+
+def hashing_busy_response():
+    """Fast 503 returned when the password hashing pool is saturated."""
+    return Response(
+        {"success": False, "message": HashingPoolBusy.default_detail},
+        status=503,
+        headers={"Retry-After": "1"},
+    )
 
 
 # ============================
 # Throttling
 # ============================
-class BurstRateThrottle(throttling.UserRateThrottle):
+class BurstRateThrottle(TokenBucketThrottle):
+    scope = "burst"
     rate = "3/min"
 
 
-class SustainedRateThrottle(throttling.UserRateThrottle):
+class SustainedRateThrottle(TokenBucketThrottle):
+    scope = "sustained"
     rate = "50/day"
 
 
-class AuthRateThrottle(throttling.UserRateThrottle):
+class AuthRateThrottle(TokenBucketThrottle):
+    scope = "auth"
     rate = "5/min"
+    include_email = True  # per-IP bucket plus one per submitted email
 
 
-class PasswordResetThrottle(throttling.UserRateThrottle):
+class PasswordResetThrottle(TokenBucketThrottle):
+    scope = "password_reset"
     rate = "2/min"
+    include_email = True
 
 
 # ============================
 # Registration
 # ============================
 class RegisterView(generics.CreateAPIView):
+    """
+    Register a parent account.
+
+    The queries each registration runs are logged at INFO and, in DEBUG,
+    returned in the ``X-Query-Count`` header. ``manage.py benchmark_queries
+    register`` measures the same count against a scratch user.
+    """
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
     throttle_classes = [AuthRateThrottle, SustainedRateThrottle]
 
-    @transaction.atomic
     def post(self, request, *args, **kwargs):
         email = request.data.get("email", "").strip()
         password = request.data.get("password", "").strip()
@@ -110,31 +150,43 @@ class RegisterView(generics.CreateAPIView):
         if not validate_email_format(email):
             return Response({"success": False, "message": "Invalid email format"}, status=400)
 
-        serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
+        with QueryCounter() as queries:
+            serializer = self.get_serializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(
+                    {"success": False, "message": "Invalid data", "errors": serializer.errors},
+                    status=400,
+                )
+            try:
+                # Uniqueness comes from the DB constraints (user + parent
+                # profile in one transaction), not pre-checks
+                user = serializer.save()
+            except HashingPoolBusy:
+                return hashing_busy_response()
+            except ValidationError as e:
+                # Unique constraint violations mapped to field errors
+                return Response(
+                    {"success": False, "message": "Invalid data", "errors": e.detail},
+                    status=400,
+                )
             tokens = get_tokens_for_user(user)
 
-            # Create related profile if applicable
-            if getattr(user, "is_parent", False):
-                Parent.objects.get_or_create(user=user)
-            if getattr(user, "is_student", False):
-                Student.objects.get_or_create(user=user)
-
-            return Response(
-                {
-                    "success": True,
-                    "message": "User registered successfully",
-                    "user": UserSerializer(user).data,
-                    "tokens": tokens,
-                },
-                status=201,
-            )
-
-        return Response(
-            {"success": False, "message": "Invalid data", "errors": serializer.errors},
-            status=400,
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.info(f"Registration completed in {queries.count} queries")
+
+        response = Response(
+            {
+                "success": True,
+                "message": "User registered successfully",
+                "user": UserSerializer(user).data,
+                "tokens": tokens,
+            },
+            status=201,
         )
+        if settings.DEBUG:
+            response["X-Query-Count"] = str(queries.count)
+        return response
 
 
 # ============================
@@ -163,9 +215,8 @@ def unified_login(request):
             if not token:
                 return Response({"success": False, "message": "Google token is required"}, status=400)
 
-            idinfo = id_token.verify_oauth2_token(
-                token, google_requests.Request(), settings.GOOGLE_CLIENT_ID
-            )
+            # Verified locally against cached Google certs
+            idinfo = get_google_verifier().verify(token)
             email = normalize_email(idinfo["email"])
 
             user, created = User.objects.get_or_create(
@@ -218,6 +269,12 @@ def unified_login(request):
 
             email = normalize_email(email)
 
+            # Lock state lives in the cache, so locked attempts never reach the DB
+            lockout = get_lockout()
+            client_ip = throttling.BaseThrottle().get_ident(request)
+            if lockout.is_locked(email, client_ip):
+                return Response({"success": False, "message": "Account is temporarily locked due to too many failed login attempts. Please try again later."}, status=429)
+
             # Prevent user enumeration via timing
             user = None
             user_exists = False
@@ -225,24 +282,25 @@ def unified_login(request):
                 candidate = User.objects.get(email=email)
                 user_exists = True
 
-                # Check if account is locked
+                # Check if account is locked (DB state survives cache restarts)
                 if candidate.is_locked():
                     return Response({"success": False, "message": "Account is temporarily locked due to too many failed login attempts. Please try again later."}, status=429)
 
-                if candidate.check_password(password):
+                if check_user_password(candidate, password):
                     user = candidate
-                    # Reset failed attempts on successful login
-                    user.reset_failed_attempts()
-                    user.last_login = timezone.now()
-                    user.save(update_fields=['last_login'])
+                    # Clear the failure window, then one UPDATE for last_login
+                    # (and the lock columns only if a lock has ended)
+                    lockout.register_success(user)
+                    record_login(user)
                 else:
-                    # Increment failed attempts on wrong password
-                    candidate.increment_failed_attempts()
+                    # Count the failure in the lockout window
+                    candidate.increment_failed_attempts(ip=client_ip)
             except User.DoesNotExist:
                 pass
             if not user_exists:
                 # perform dummy hash to keep timing similar
-                User().set_password(password)
+                dummy_check_password(password)
+                lockout.register_failure(email, client_ip)
 
             if user is None:
                 return Response({"success": False, "message": "Invalid credentials"}, status=401)
@@ -273,6 +331,8 @@ def unified_login(request):
             status=400,
         )
 
+    except HashingPoolBusy:
+        return hashing_busy_response()
     except ValueError:
         # Log the error for debugging but don't expose details to user
         import logging
@@ -327,7 +387,7 @@ def user_logout(request):
     if not refresh_token:
         return Response({"success": False, "message": "Refresh token required"}, status=400)
     try:
-        RefreshToken(refresh_token).blacklist()
+        IndexedRefreshToken(refresh_token).blacklist()
         return Response({"success": True, "message": "Logged out successfully"})
     except TokenError:
         return Response({"success": False, "message": "Invalid or expired token"}, status=400)
@@ -366,7 +426,8 @@ def request_password_reset(request):
             return Response({"success": True, "message": "If this email exists, a reset link has been sent."})
 
         reset_link = f"{frontend_url.rstrip('/')}/reset-password/{uid}/{token}/"
-        send_safe_mail(
+        # Queued; the outbox worker delivers it so the response never waits on SMTP
+        enqueue_mail(
             "Password Reset Request",
             f"""You requested a password reset for your account.
 
@@ -382,7 +443,7 @@ Your password will remain unchanged.""",
         # Log password reset attempt for security monitoring
         import logging
         logger = logging.getLogger(__name__)
-        logger.info(f"Password reset email sent to user: {user.email}")
+        logger.info(f"Password reset email queued for user: {user.email}")
 
     # Generic response to avoid enumeration
     return Response({"success": True, "message": "If this email exists, a reset link has been sent."})
@@ -417,7 +478,11 @@ def confirm_password_reset(request, uid, token):
             status=400,
         )
 
-    user.set_password(password)
+    try:
+        set_user_password(user, password)
+    except HashingPoolBusy:
+        return hashing_busy_response()
+    user.bump_token_version()
     user.save()
 
     # 🔒 Invalidate all existing refresh tokens
@@ -446,8 +511,11 @@ def change_password(request):
         return Response({"success": False, "message": "Old password is required"}, status=400)
     if not new_password:
         return Response({"success": False, "message": "New password is required"}, status=400)
-    if not user.check_password(old_password):
-        return Response({"success": False, "message": "Old password is incorrect"}, status=400)
+    try:
+        if not check_user_password(user, old_password):
+            return Response({"success": False, "message": "Old password is incorrect"}, status=400)
+    except HashingPoolBusy:
+        return hashing_busy_response()
 
     try:
         validate_password(new_password, user)
@@ -457,7 +525,11 @@ def change_password(request):
             status=400,
         )
 
-    user.set_password(new_password)
+    try:
+        set_user_password(user, new_password)
+    except HashingPoolBusy:
+        return hashing_busy_response()
+    user.bump_token_version()
     user.save()
 
     # 🔒 Invalidate all existing refresh tokens
@@ -489,6 +561,71 @@ def health_check(request):
     }, status=200 if db_status == "healthy" else 503)
 
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def hashing_pool_stats(request):
+    """Password hashing pool metrics for this process (see api/hashing.py)."""
+    return Response({"success": True, "password_hashing": get_executor().stats()})
+
+
+# ============================
+# Class Summary
+# ============================
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def class_summary(request):
+    """Per-class enrolment counts from the ClassRoster summary table."""
+    rows = list(
+        ClassRoster.objects.exclude(active_students=0, inactive_students=0)
+        .values('name', 'active_students', 'inactive_students', 'parent_links')
+    )
+    totals = {
+        field: sum(row[field] for row in rows)
+        for field in ('active_students', 'inactive_students', 'parent_links')
+    }
+    return Response({"success": True, "classes": rows, "totals": totals})
+
+
+# ============================
+# Delta Sync
+# ============================
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def sync(request):
+    """
+    Students and parent profile changed since ``?since=<token>``, ids of
+    students removed from the caller since then, and the next token.
+    Without a (usable) token, a full snapshot with ``"full": true``.
+    """
+    started = timezone.now()
+    try:
+        since = sync_window(request.query_params.get('since'), started)
+    except ValueError:
+        return Response({"success": False, "message": "Invalid sync token"}, status=400)
+
+    parents = parents_for(request.user)
+    students = students_for(request.user)
+    parent_list = list(parents)
+    if since is None or not parent_list:
+        changed, removed = list(students) if parent_list else [], []
+        since = None
+    else:
+        changed = list(students.filter(updated_at__gte=since))
+        removed = removed_student_ids(parents, students, since)
+        if not (changed or removed):
+            # total_children only moves when a student does
+            parent_list = [parent for parent in parent_list if parent.updated_at >= since]
+
+    return Response({
+        "success": True,
+        "token": make_token(started),
+        "full": since is None,
+        "parents": ParentSerializer(parent_list, many=True, context={'request': request}).data,
+        "students": StudentSerializer(changed, many=True, context={'request': request}).data,
+        "removed": {"students": removed},
+    })
+
+
 # ============================
 # API Root
 # ============================
@@ -508,6 +645,10 @@ def api_root(request):
             "users": "/api/v1/users/",
             "parents": "/api/v1/parents/",
             "students": "/api/v1/students/",
+            "students_search": "/api/v1/students/search/?q=",
+            "classes_summary": "/api/v1/classes/summary/",
+            "students_import": "/api/v1/students/import/",
+            "sync": "/api/v1/sync/?since=",
             "docs": "/swagger/",
         }
     })
@@ -526,30 +667,61 @@ def user_profile(request):
 # ViewSets
 # ============================
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
+    cursor_ordering = 'id'
 
 
-class ParentViewSet(viewsets.ModelViewSet):
+class ParentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ParentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = 'id'
+    # User has no updated_at; the nested user's fields are validators
+    # themselves (one parent per user, so MAX() is the value)
+    validator_fields = (
+        'updated_at', 'students__updated_at', 'user__email', 'user__first_name',
+        'user__last_name', 'user__role',
+        # PostgreSQL has no MAX(boolean)
+        Max(Cast('user__is_active', IntegerField())), Max(Cast('user__is_superuser', IntegerField())),
+    )
+    validator_counts = ('students',)
+    # Unlinking a child changes total_children but no timestamp here
+    detail_last_modified = False
 
     def get_queryset(self):
-        return Parent.objects.filter(user=self.request.user)
+        return parents_for(self.request.user)
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = StudentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = 'student_number'
 
     def get_queryset(self):
-        # Return students where the logged-in user's Parent profile is one of the parents
+        return students_for(self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked search over the caller's students by name, student ID or
+        class: exact words first, then prefixes, substrings and typos.
+        """
+        term = request.query_params.get('q', '').strip()
+        if len(term) < 2:
+            return Response(
+                {"success": False, "message": "Search term must be at least 2 characters"},
+                status=400,
+            )
         try:
-            parent = self.request.user.parent_profile
-            return Student.objects.filter(parents=parent)
-        except Parent.DoesNotExist:
-            return Student.objects.none()
+            limit = max(1, int(request.query_params.get('limit', 20)))
+        except ValueError:
+            limit = 20
+        students = search_students(self.get_queryset(), term, limit)
+        results = []
+        for student, data in zip(students, self.get_serializer(students, many=True).data):
+            results.append({**data, "score": round(student.search_score, 3)})
+        return Response({"success": True, "query": term, "count": len(results), "results": results})
 
     def perform_create(self, serializer):
         # Automatically link the student to the logged-in user's Parent profile
@@ -567,3 +739,52 @@ class StudentViewSet(viewsets.ModelViewSet):
 
         # Save with the updated parents
         serializer.save(parents=parents)
+
+
+# ============================
+# Bulk Import
+# ============================
+class StudentImportView(generics.GenericAPIView):
+    """
+    Import students (and new parent accounts) in bulk. Upload a CSV, JSON
+    Lines or JSON file as ``file`` (streamed in chunks), or post a JSON list
+    of rows. Invalid rows are reported and skipped; the rest are imported.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser, JSONParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is not None:
+            # ``format`` is taken by DRF's format suffixes; default from the extension
+            fmt = request.query_params.get("format_type") or format_for(upload.name)
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            rows = read_rows(stream, fmt) if fmt in FORMATS else None
+        else:
+            data = request.data
+            rows = data if isinstance(data, list) else data.get("students") if hasattr(data, "get") else None
+        if rows is None:
+            return Response(
+                {"success": False, "message": "Provide a CSV/JSON file or a list of students"},
+                status=400,
+            )
+
+        report = StudentImporter().run(rows).as_dict()
+        stopped = report["stopped"]
+        if stopped and not report["created_students"]:
+            return Response(
+                {"success": False, "message": f"Could not parse import file: {stopped['error']}", **report},
+                status=400,
+            )
+        message = f"Imported {report['created_students']} of {report['rows']} students"
+        if stopped:
+            # Rows before the unreadable input are committed, except the failed ones
+            message += (
+                f"; stopped at unreadable input at row {stopped['row']} ({stopped['error']}). "
+                f"Rows before it were imported unless listed in errors"
+            )
+        return Response({
+            "success": not report["failed"] and not stopped,
+            "message": message,
+            **report,
+        })